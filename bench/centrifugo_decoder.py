@@ -0,0 +1,179 @@
+"""
+Micro-benchmarks for providers/centrifugo.py, no network.
+
+Compares the decoder with the previous receive path (json.loads of every frame, then probing
+three nesting layouts) on pings, join/leave pushes, small and large publications, batched
+frames and protobuf frames. orjson is used automatically when installed; --backend json forces
+the standard library for comparison.
+
+    python -m bench.centrifugo_decoder
+    python -m bench.centrifugo_decoder --number 20000 --payload-bytes 2048 --json
+"""
+import argparse
+import json
+import sys
+import timeit
+
+from providers import centrifugo
+from providers.centrifugo import CentrifugoDecoder, PROTOCOL_PROTOBUF
+
+CHANNEL = "$alerts:donation_424242"
+
+
+def make_donation(seq, payload_bytes):
+    message = "https://youtu.be/dQw4w9WgXcQ"
+    if payload_bytes > len(message):
+        message += " " + "x" * (payload_bytes - len(message) - 1)
+    return {
+        "id": 10_000_000 + seq,
+        "name": "Donations",
+        "username": f"donor{seq}",
+        "message_type": "text",
+        "message": message,
+        "amount": 500,
+        "currency": "RUB",
+        "is_shown": 0,
+        "created_at": "2024-01-01 12:00:00",
+        "shown_at": None,
+    }
+
+
+def json_publication(seq, payload_bytes):
+    return json.dumps({"result": {"channel": CHANNEL, "data": {"offset": seq, "data": make_donation(seq, payload_bytes)}}})
+
+
+# --- protobuf encoding (the server side of what the decoder reads) ---
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(number, value):
+    if isinstance(value, int):
+        return _varint(number << 3) + _varint(value)
+    return _varint(number << 3 | 2) + _varint(len(value)) + value
+
+
+def protobuf_publication(seq, payload_bytes):
+    publication = _field(4, json.dumps(make_donation(seq, payload_bytes)).encode()) + _field(6, seq)
+    push = _field(2, CHANNEL.encode()) + _field(3, publication)
+    reply = _field(3, push)
+    return _varint(len(reply)) + reply
+
+
+def legacy_decode(message):
+    """The receive path before the decoder (providers/da_provider.py _on_message + _handle_notification)"""
+    if message == "{}":
+        return None
+    data = json.loads(message)
+    if not data:
+        return None
+    if "result" in data:
+        result = data["result"]
+        if "data" in result and "data" in result["data"]:
+            payload = result["data"]["data"]
+        elif "data" in result:
+            payload = result["data"]
+        elif "type" in result and result["type"] == "publish":
+            payload = result.get("data", {})
+        else:
+            return None
+        if "data" in payload and isinstance(payload["data"], dict):
+            payload = payload["data"]
+        if "info" in payload and "user" in payload["info"]:
+            return None
+        return payload
+    return None
+
+
+def legacy_decode_batch(frame):
+    # The old path had no batching support: a multi-command frame failed json.loads as a whole
+    return [legacy_decode(line) for line in frame.split("\n")]
+
+
+def build_cases(payload_bytes, batch_size):
+    small = json_publication(1, 64)
+    large = json_publication(2, payload_bytes)
+    join = json.dumps({"result": {"type": 1, "channel": CHANNEL, "data": {"info": {"user": "42", "client": "c0ffee"}}}})
+    batch = "\n".join(json_publication(seq, 64) for seq in range(batch_size))
+    return [
+        # name, frame, legacy callable (None = not supported by the old path)
+        ("ping", "{}", legacy_decode),
+        ("join push", join, legacy_decode),
+        ("publication 64 B", small, legacy_decode),
+        (f"publication {payload_bytes} B", large, legacy_decode),
+        (f"batch x{batch_size}", batch, legacy_decode_batch),
+        ("protobuf 64 B", protobuf_publication(1, 64), None),
+        (f"protobuf {payload_bytes} B", protobuf_publication(2, payload_bytes), None),
+    ]
+
+
+def measure(func, frame, number, repeat):
+    """Best-of-repeat microseconds per call"""
+    best = min(timeit.repeat(lambda: func(frame), number=number, repeat=repeat))
+    return best / number * 1e6
+
+
+def run(args):
+    loads = json.loads if args.backend == "json" else centrifugo.json_loads
+    backend = "json" if args.backend == "json" else centrifugo.JSON_BACKEND
+    json_decoder = CentrifugoDecoder(loads=loads)
+    protobuf_decoder = CentrifugoDecoder(loads=loads, protocol=PROTOCOL_PROTOBUF)
+
+    results = []
+    for name, frame, legacy in build_cases(args.payload_bytes, args.batch_size):
+        # Binary cases stand for a connection negotiated with the protobuf protocol
+        decoder = protobuf_decoder if isinstance(frame, bytes) else json_decoder
+        records = decoder.decode(frame)
+        row = {
+            "case": name,
+            "frame_bytes": len(frame),
+            "records": len(records),
+            "decoder_us": round(measure(decoder.decode, frame, args.number, args.repeat), 3),
+            "legacy_us": round(measure(legacy, frame, args.number, args.repeat), 3) if legacy else None,
+        }
+        row["speedup"] = round(row["legacy_us"] / row["decoder_us"], 2) if row["legacy_us"] else None
+        results.append(row)
+    return {"backend": backend, "number": args.number, "repeat": args.repeat, "results": results}
+
+
+def print_report(report):
+    print(f"Centrifugo decoder, JSON backend: {report['backend']} "
+          f"(best of {report['repeat']} x {report['number']} calls)")
+    print(f"  {'case':<22}{'bytes':>8}{'records':>9}{'decoder µs':>12}{'legacy µs':>11}{'speedup':>9}")
+    for row in report["results"]:
+        legacy = f"{row['legacy_us']:.3f}" if row["legacy_us"] is not None else "n/a"
+        speedup = f"{row['speedup']}x" if row["speedup"] is not None else ""
+        print(f"  {row['case']:<22}{row['frame_bytes']:>8}{row['records']:>9}"
+              f"{row['decoder_us']:>12.3f}{legacy:>11}{speedup:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=5000, help="calls per timing run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--payload-bytes", type=int, default=1024, help="size of the large donation message")
+    parser.add_argument("--batch-size", type=int, default=10, help="publications per batched frame")
+    parser.add_argument("--backend", choices=("auto", "json"), default="auto",
+                        help="auto = orjson when installed")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
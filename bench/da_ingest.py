@@ -0,0 +1,267 @@
+"""
+DonationAlerts ingest benchmark, fully offline.
+
+Starts a fake Centrifugo server and a stub DonationAlerts REST API, connects a real
+DonationAlertsProvider to them and replays donation bursts. Reports ingest latency
+(publication sent -> donation handed to the UI event bus), CPU and memory.
+
+    python -m bench.da_ingest --count 2000 --rate 500 --payload-bytes 512
+    python -m bench.da_ingest --bursts 5 --count 200 --rate 0 --validate --json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Keep the journal/queue databases away from the real user data dir
+os.environ.setdefault("STREAMPLAYER_DATA_DIR", tempfile.mkdtemp(prefix="streamplayer-bench-"))
+
+from bench.fakes import ACCESS_TOKEN, FakeCentrifugo, FakeTranscriptApi, FakeVideosApi, StubDonationAlertsApi
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies_ms):
+    values = sorted(latencies_ms)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 0.5), 3) if values else None,
+        "p90_ms": round(percentile(values, 0.9), 3) if values else None,
+        "p99_ms": round(percentile(values, 0.99), 3) if values else None,
+        "max_ms": round(values[-1], 3) if values else None,
+    }
+
+
+def max_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+
+
+def make_donation(seq, payload_bytes):
+    video_id = "".join(random.choices(string.ascii_letters + string.digits + "-_", k=11))
+    message = f"https://youtu.be/{video_id}"
+    if payload_bytes > len(message):
+        message += " " + "x" * (payload_bytes - len(message) - 1)
+    donation = {
+        "id": 10_000_000 + seq,
+        "name": "Donations",
+        "username": f"donor{seq % 97}",
+        "message_type": "text",
+        "message": message,
+        "amount": random.choice([50, 100, 250, 500, 1000]),
+        "currency": "RUB",
+        "is_shown": 0,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "shown_at": None,
+    }
+    return donation, video_id
+
+
+class IngestRecorder:
+    """Replaces the provider's UI hand-off and matches each donation with its send time"""
+
+    def __init__(self, expected, validate=None):
+        self.expected = expected
+        self.validate = validate
+        self.sent_at = {}
+        self.video_ids = {}
+        self.ingest_ms = []
+        self.validated_ms = []
+        self.done = Event()
+        self._lock = Lock()
+        self._received = 0
+        self._validated = 0
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="bench-validate") if validate else None
+
+    def on_sent(self, donation):
+        self.sent_at[donation["id"]] = time.perf_counter()
+
+    def on_ui_event(self, function_name, data):
+        if function_name != "onNewDonation":
+            return
+        now = time.perf_counter()
+        sent = self.sent_at.get(data.get("id"))
+        if sent is None:
+            return
+        with self._lock:
+            self.ingest_ms.append((now - sent) * 1000)
+            self._received += 1
+            finished = self._received >= self.expected and not self.validate
+        if self.validate:
+            self._executor.submit(self._validate, data, sent)
+        if finished:
+            self.done.set()
+
+    def _validate(self, donation, sent):
+        self.validate(self.video_ids[donation["id"]], donation)
+        with self._lock:
+            self.validated_ms.append((time.perf_counter() - sent) * 1000)
+            self._validated += 1
+            if self._validated >= self.expected:
+                self.done.set()
+
+    def reset(self, expected):
+        self.expected = expected
+        self._received = self._validated = 0
+        self.done.clear()
+
+
+def connect_provider(rest, centrifugo):
+    from providers.da_provider import DonationAlertsProvider
+    provider = DonationAlertsProvider(logger=logging.getLogger("DA_PROVIDER"), api_base=rest.url, ws_url=centrifugo.url)
+    result = provider.connect_with_token(ACCESS_TOKEN, "bench-refresh", "bench-client", "bench-secret")
+    if not result.get("success"):
+        raise RuntimeError(f"Provider failed to connect: {result}")
+    centrifugo.wait_subscribed()
+    deadline = time.monotonic() + 10
+    while not provider.is_connected:
+        if time.monotonic() > deadline:
+            raise TimeoutError("Provider did not report the subscription")
+        time.sleep(0.01)
+    return provider
+
+
+def build_validator(args):
+    """Routes validate_one to fake videos.list / transcript sources"""
+    from providers.video_metadata import video_metadata
+    from providers.video_pipeline import validation_pipeline
+    from providers.youtube_caption import caption_provider
+
+    video_metadata.data_client = FakeVideosApi(latency=args.metadata_latency / 1000)
+    caption_provider.ytt_api = FakeTranscriptApi(latency=args.transcript_latency / 1000, keyword="forbidden", keyword_every=10)
+    caption_provider.cache = None
+    filters = {"min_views": 10, "min_likes": 1, "keywords": ["forbidden"], "captions_enabled": True, "allow_duplicates": True}
+
+    def validate(video_id, donation):
+        return validation_pipeline.validate_one(video_id, donation, filters, "bench-api-key")
+    return validate
+
+
+def run(args):
+    from providers.log_setup import log_manager
+    from providers.runtime import runtime
+
+    log_manager.setup(level=logging.DEBUG if args.verbose else logging.WARNING)
+    runtime.start()
+
+    rest = StubDonationAlertsApi().start()
+    centrifugo = FakeCentrifugo().start()
+    recorder = IngestRecorder(args.count, build_validator(args) if args.validate else None)
+
+    provider = connect_provider(rest, centrifugo)
+    provider._send_to_ui = recorder.on_ui_event
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    rss_before = max_rss_kb()
+    cpu_before = time.process_time()
+    wall_before = time.perf_counter()
+
+    seq, paused = 0, 0.0
+    for burst in range(args.bursts):
+        donations = []
+        for _ in range(args.count):
+            donation, video_id = make_donation(seq, args.payload_bytes)
+            recorder.video_ids[donation["id"]] = video_id
+            donations.append(donation)
+            seq += 1
+        recorder.reset(args.count)
+        centrifugo.replay(donations, rate=args.rate, on_sent=recorder.on_sent)
+        if args.ping_every:
+            centrifugo.ping()
+        if not recorder.done.wait(args.timeout):
+            print(f"Burst {burst + 1}: timed out, {recorder._received}/{args.count} received", file=sys.stderr)
+        if args.pause and burst + 1 < args.bursts:
+            time.sleep(args.pause)
+            paused += args.pause
+
+    wall = time.perf_counter() - wall_before - paused
+    cpu = time.process_time() - cpu_before
+    rss_after = max_rss_kb()
+    traced_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+
+    report = {
+        "config": {
+            "bursts": args.bursts,
+            "count": args.count,
+            "rate": args.rate,
+            "payload_bytes": args.payload_bytes,
+            "validate": args.validate,
+        },
+        "ingest": summarize(recorder.ingest_ms),
+        "validated": summarize(recorder.validated_ms) if args.validate else None,
+        "throughput_per_s": round(len(recorder.ingest_ms) / wall, 1) if wall else None,
+        "wall_s": round(wall, 3),
+        # Process-wide: includes the fake servers running in this process
+        "cpu_s": round(cpu, 3),
+        "cpu_percent": round(cpu / wall * 100, 1) if wall else None,
+        "max_rss_mb": round(rss_after / 1024, 1),
+        "rss_growth_mb": round((rss_after - rss_before) / 1024, 1),
+        "tracemalloc_peak_mb": round(traced_peak / 1024 / 1024, 2) if traced_peak is not None else None,
+        "provider_metrics": provider.get_metrics(),
+    }
+
+    runtime.call(provider.disconnect(), timeout=5)
+    centrifugo.stop()
+    rest.stop()
+    return report
+
+
+def print_report(report):
+    config = report["config"]
+    print(f"DonationAlerts ingest: {config['bursts']} x {config['count']} donations "
+          f"@ {config['rate'] or 'max'}/s, {config['payload_bytes']} B payload")
+    for name in ("ingest", "validated"):
+        stats = report.get(name)
+        if stats:
+            print(f"  {name:<10} p50 {stats['p50_ms']} ms  p90 {stats['p90_ms']} ms  "
+                  f"p99 {stats['p99_ms']} ms  max {stats['max_ms']} ms  (n={stats['count']})")
+    print(f"  throughput {report['throughput_per_s']}/s over {report['wall_s']} s")
+    print(f"  cpu        {report['cpu_s']} s ({report['cpu_percent']}% of one core, whole process)")
+    print(f"  memory     max RSS {report['max_rss_mb']} MB (+{report['rss_growth_mb']} MB during the run)"
+          + (f", tracemalloc peak {report['tracemalloc_peak_mb']} MB" if report["tracemalloc_peak_mb"] is not None else ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1000, help="donations per burst")
+    parser.add_argument("--bursts", type=int, default=3)
+    parser.add_argument("--rate", type=float, default=200, help="donations per second within a burst, 0 = unthrottled")
+    parser.add_argument("--pause", type=float, default=1.0, help="seconds between bursts")
+    parser.add_argument("--payload-bytes", type=int, default=256, help="size of the donation message")
+    parser.add_argument("--ping-every", action="store_true", help="send a Centrifugo ping after each burst")
+    parser.add_argument("--validate", action="store_true", help="also run validate_one with fake metadata/transcripts")
+    parser.add_argument("--metadata-latency", type=float, default=20, help="fake videos.list latency, ms")
+    parser.add_argument("--transcript-latency", type=float, default=50, help="fake transcript latency, ms")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for a burst to drain")
+    parser.add_argument("--tracemalloc", action="store_true", help="track Python allocations (slower)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
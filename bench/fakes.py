@@ -0,0 +1,322 @@
+"""
+Offline stand-ins for the services DonationAlertsProvider talks to:
+a Centrifugo WebSocket server, the DonationAlerts REST endpoints and a transcript source.
+Everything listens on 127.0.0.1 with an ephemeral port.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+SOCKET_TOKEN = "bench-socket-token"
+ACCESS_TOKEN = "bench-access-token"
+USER_ID = 424242
+
+
+def encode_frame(opcode, payload):
+    """Server -> client frame (never masked)"""
+    header = bytearray([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header.append(length)
+    elif length < 1 << 16:
+        header.append(126)
+        header += struct.pack("!H", length)
+    else:
+        header.append(127)
+        header += struct.pack("!Q", length)
+    return bytes(header) + payload
+
+
+async def read_frame(reader):
+    """Client -> server frame (always masked)"""
+    head = await reader.readexactly(2)
+    opcode = head[0] & 0x0F
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if head[1] & 0x80 else b"\0\0\0\0"
+    data = await reader.readexactly(length)
+    if length:
+        data = (int.from_bytes(data, "big") ^ int.from_bytes((mask * (length // 4 + 1))[:length], "big")).to_bytes(length, "big")
+    return opcode, data
+
+
+class FakeCentrifugo:
+    """
+    Speaks the subset of the Centrifugo JSON protocol the provider uses:
+    connect (id=1, token) -> client id; subscribe (method=1, id=2) -> ok; then publications
+    in the result -> data -> data layout. Runs its own event loop on a background thread, so the
+    provider runtime loop is measured on its own.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.loop = asyncio.new_event_loop()
+        self._thread = Thread(target=self.loop.run_forever, name="fake-centrifugo", daemon=True)
+        self._server = None
+        self._clients = set()
+        self._subscribed = {}     # writer -> channel
+        self.offset = 0
+        self.stats = {"connections": 0, "published": 0, "bytes_sent": 0}
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/connection/websocket"
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+        return self
+
+    async def _start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        async def _stop():
+            for writer in list(self._clients):
+                writer.close()
+            self._server.close()
+        asyncio.run_coroutine_threadsafe(_stop(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def wait_subscribed(self, timeout=15):
+        deadline = time.monotonic() + timeout
+        while not self._subscribed:
+            if time.monotonic() > deadline:
+                raise TimeoutError("Provider did not subscribe in time")
+            time.sleep(0.01)
+
+    # --- connection ---
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+        headers = {}
+        for line in request.decode("latin-1").split("\r\n")[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        accept = base64.b64encode(hashlib.sha1((headers.get("sec-websocket-key", "") + WS_GUID).encode()).digest()).decode()
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+        )
+        self._clients.add(writer)
+        self.stats["connections"] += 1
+
+        try:
+            while True:
+                opcode, data = await read_frame(reader)
+                if opcode == OP_CLOSE:
+                    writer.write(encode_frame(OP_CLOSE, data[:2]))
+                    break
+                if opcode == OP_PING:
+                    writer.write(encode_frame(OP_PONG, data))
+                    continue
+                if opcode == OP_TEXT:
+                    self._on_command(writer, json.loads(data))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            self._subscribed.pop(writer, None)
+            writer.close()
+
+    def _on_command(self, writer, command):
+        if command.get("id") == 1 and command.get("params", {}).get("token") == SOCKET_TOKEN:
+            self._send(writer, {"id": 1, "result": {"client": str(uuid.uuid4()), "version": "bench"}})
+        elif command.get("method") == 1:
+            self._subscribed[writer] = command["params"]["channel"]
+            self._send(writer, {"id": 2, "result": {"recoverable": True, "epoch": "bench", "offset": self.offset}})
+
+    def _send(self, writer, message):
+        payload = json.dumps(message).encode()
+        writer.write(encode_frame(OP_TEXT, payload))
+        self.stats["bytes_sent"] += len(payload)
+
+    # --- publishing ---
+
+    def publication(self, channel, donation):
+        self.offset += 1
+        return {"result": {"channel": channel, "data": {"offset": self.offset, "data": donation}}}
+
+    def publish(self, donation):
+        """Thread-safe: queues one publication to every subscribed client"""
+        self.loop.call_soon_threadsafe(self._publish_now, donation)
+
+    def _publish_now(self, donation):
+        for writer, channel in list(self._subscribed.items()):
+            self._send(writer, self.publication(channel, donation))
+        self.stats["published"] += 1
+
+    def ping(self):
+        """Centrifugo keepalive: an empty JSON object"""
+        def _ping():
+            for writer in list(self._subscribed):
+                writer.write(encode_frame(OP_TEXT, b"{}"))
+        self.loop.call_soon_threadsafe(_ping)
+
+    async def _schedule(self, donations, rate, on_sent):
+        started = time.perf_counter()
+        for index, donation in enumerate(donations):
+            if rate:
+                delay = started + index / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            on_sent(donation)
+            self._publish_now(donation)
+            if index % 64 == 63:
+                # Let the socket buffer drain instead of queueing the whole burst in memory
+                for writer in list(self._subscribed):
+                    await writer.drain()
+
+    def replay(self, donations, rate=0, on_sent=lambda donation: None):
+        """Publishes donations at `rate` per second (0 = as fast as possible); blocks until sent"""
+        asyncio.run_coroutine_threadsafe(self._schedule(donations, rate, on_sent), self.loop).result()
+
+
+class _RestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def do_GET(self):
+        if self.path.startswith("/api/v1/user/oauth"):
+            if self.headers.get("Authorization") != f"Bearer {ACCESS_TOKEN}":
+                return self._reply(401, {"message": "Unauthenticated."})
+            return self._reply(200, {"data": {"id": USER_ID, "name": "bench", "socket_connection_token": SOCKET_TOKEN}})
+        self._reply(404, {"message": "Not found"})
+
+    def do_POST(self):
+        body = self._read_body()
+        if self.path.startswith("/oauth/token"):
+            return self._reply(200, {"access_token": ACCESS_TOKEN, "refresh_token": "bench-refresh", "expires_in": 3600})
+        if self.path.startswith("/api/v1/centrifuge/subscribe"):
+            channels = json.loads(body or b"{}").get("channels", [])
+            return self._reply(200, {"channels": [{"channel": c, "token": "bench-sub-token"} for c in channels]})
+        self._reply(404, {"message": "Not found"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubDonationAlertsApi:
+    """/oauth/token, /api/v1/user/oauth and /api/v1/centrifuge/subscribe with canned answers"""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), _RestHandler)
+        self.server.daemon_threads = True
+        self._thread = Thread(target=self.server.serve_forever, name="stub-da-api", daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _Snippet:
+    __slots__ = ("text", "start")
+
+    def __init__(self, text, start=0.0):
+        self.text = text
+        self.start = start
+
+
+class _FakeTranscript:
+    """One manually created track, as returned by YouTubeTranscriptApi.list"""
+    is_generated = False
+    is_translatable = False
+    translation_languages = ()
+
+    def __init__(self, api, video_id, language_code):
+        self.api = api
+        self.video_id = video_id
+        self.language_code = language_code
+
+    def fetch(self):
+        return self.api.fetch(self.video_id, languages=(self.language_code,))
+
+
+class FakeTranscriptApi:
+    """Drop-in for YouTubeTranscriptApi.list/fetch with a fixed latency and generated text"""
+
+    def __init__(self, latency=0.05, words=2000, keyword=None, keyword_every=0):
+        self.latency = latency
+        self.words = words
+        self.keyword = keyword
+        self.keyword_every = keyword_every
+        self.calls = 0
+
+    def fetch(self, video_id, languages=("ru", "en")):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        words = ["lorem"] * self.words
+        if self.keyword and self.keyword_every and self.calls % self.keyword_every == 0:
+            words[len(words) // 2] = self.keyword
+        # ~10 words per 4 seconds of speech
+        return [_Snippet(" ".join(words[i:i + 10]), start=i * 0.4) for i in range(0, len(words), 10)]
+
+    def list(self, video_id):
+        return [_FakeTranscript(self, video_id, "ru")]
+
+
+class FakeVideosApi:
+    """Drop-in for YoutubeDataClient.fetch_videos: every id exists, no network"""
+
+    def __init__(self, latency=0.02):
+        self.latency = latency
+        self.calls = 0
+
+    def fetch_videos(self, video_ids, api_key, part=None):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return {
+            video_id: {
+                "id": video_id,
+                "snippet": {"title": f"Bench video {video_id}", "channelId": "UCbenchbenchbenchbench00", "thumbnails": {}},
+                "contentDetails": {"duration": "PT3M30S"},
+                "statistics": {"viewCount": "100000", "likeCount": "5000"},
+            }
+            for video_id in video_ids
+        }
@@ -0,0 +1,138 @@
+"""
+Offline comparison of queue scheduling policies (providers/queue_scheduler.py).
+
+Replays a donation log - synthetic, a JSON-lines file or the app's donation journal - through
+fifo / priority / fair and reports waits per amount tier, the longest run of one requester and
+how much of the first hour the top requester got.
+
+    python -m bench.queue_scheduler --donations 50000 --donors 2000 --flood-every 1000
+    python -m bench.queue_scheduler --log donations.jsonl --max-per-donor 5 --json
+    python -m bench.queue_scheduler --journal ~/.local/share/StreamPlayer/journal/donations.sqlite3
+
+A JSON-lines log has one object per video: {"t": seconds, "requester": ..., "amount": ..., "duration": seconds}.
+"""
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import time
+
+from providers.queue_scheduler import DEFAULT_TIERS, POLICIES, simulate
+
+
+def synthetic_log(donations, donors, load, mean_duration, flood_every, flood_size, seed):
+    """
+    Poisson arrivals with Zipf-like donor activity and a skewed amount distribution.
+    load = arrival rate / playback rate (above 1 the queue grows without bound).
+    Every flood_every donations one donor sends a whole playlist (flood_size videos) at once.
+    """
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(donors)]
+    amounts = (50, 100, 200, 500, 1000, 5000)
+    amount_weights = (40, 30, 15, 10, 4, 1)
+    mean_gap = mean_duration / load
+
+    log, t = [], 0.0
+    for index in range(donations):
+        t += rng.expovariate(1.0 / mean_gap)
+        requester = f"donor{rng.choices(range(donors), weights)[0]}"
+        amount = rng.choices(amounts, amount_weights)[0]
+        count = flood_size if flood_every and index % flood_every == flood_every - 1 else 1
+        for _ in range(count):
+            log.append({"t": t, "requester": requester, "amount": amount,
+                        "duration": max(30.0, rng.gauss(mean_duration, mean_duration / 3))})
+    return log
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        log = [json.loads(line) for line in f if line.strip()]
+    return sorted(log, key=lambda entry: float(entry["t"]))
+
+
+def read_journal(path, mean_duration):
+    """One video per journaled donation, arrival times relative to the first one"""
+    db = sqlite3.connect(path)
+    try:
+        rows = db.execute("SELECT received_at, payload FROM donations ORDER BY offset").fetchall()
+    finally:
+        db.close()
+    if not rows:
+        return []
+    first = rows[0][0]
+    log = []
+    for received_at, payload in rows:
+        donation = json.loads(payload)
+        log.append({
+            "t": received_at - first,
+            "requester": donation.get("username") or donation.get("requester"),
+            "amount": donation.get("amount"),
+            "duration": mean_duration,
+        })
+    return log
+
+
+def run(args):
+    if args.log:
+        log = read_jsonl(args.log)
+    elif args.journal:
+        log = read_journal(args.journal, args.mean_duration)
+    else:
+        log = synthetic_log(args.donations, args.donors, args.load, args.mean_duration,
+                            args.flood_every, args.flood_size, args.seed)
+    tiers = json.loads(args.tiers) if args.tiers else DEFAULT_TIERS
+
+    results = {}
+    for policy in args.policies.split(","):
+        started = time.perf_counter()
+        result = simulate(log, policy, tiers, args.max_per_donor, args.mean_duration, args.window)
+        metrics = result["metrics"]
+        metrics["elapsed_s"] = round(time.perf_counter() - started, 3)
+        results[policy] = metrics
+    return {"videos": len(log), "max_per_donor": args.max_per_donor, "policies": results}
+
+
+def print_report(report):
+    print(f"{report['videos']} videos, max per donor: {report['max_per_donor'] or 'no cap'}")
+    for policy, m in report["policies"].items():
+        wait = m["wait"]
+        print(f"\n  {policy}: played {m['played']}, rejected {m['rejected']}, "
+              f"scheduling {m['schedule_us_per_item']} µs/video, simulated in {m['elapsed_s']} s")
+        print(f"    wait        mean {wait['mean_s']} s  p50 {wait['p50_s']} s  p95 {wait['p95_s']} s  max {wait['max_s']} s")
+        for weight, stats in m["wait_by_weight"].items():
+            print(f"    weight {weight:<4} mean {stats['mean_s']} s  p95 {stats['p95_s']} s  (n={stats['count']})")
+        print(f"    longest run of one requester: {m['longest_same_requester_streak']}")
+        print(f"    first {int(m['window_s'])} s: top requester {m['window_top_requester']} "
+              f"got {m['window_top_share']} of {m['window_requesters']} requesters' plays")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--log", help="JSON-lines donation log")
+    source.add_argument("--journal", help="donation journal database (donations.sqlite3)")
+    parser.add_argument("--policies", default=",".join(POLICIES))
+    parser.add_argument("--tiers", help='JSON, e.g. "[[0, 1], [500, 4]]" (min amount, weight)')
+    parser.add_argument("--max-per-donor", type=int, default=0, help="queued videos per donor, 0 = no cap")
+    parser.add_argument("--donations", type=int, default=20000, help="synthetic: number of donations")
+    parser.add_argument("--donors", type=int, default=1000, help="synthetic: number of distinct donors")
+    parser.add_argument("--load", type=float, default=0.95, help="synthetic: arrival rate / playback rate")
+    parser.add_argument("--mean-duration", type=float, default=240, help="video length, seconds")
+    parser.add_argument("--flood-every", type=int, default=2000, help="synthetic: a playlist flood every N donations")
+    parser.add_argument("--flood-size", type=int, default=50)
+    parser.add_argument("--window", type=float, default=3600, help="fairness window, seconds of playback")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,59 @@
-import eel
+import argparse
 import os
 import logging
 import sys
-from threading import Thread
-from providers.da_provider import da_provider
-from providers.youtube_caption import caption_provider
+from providers.startup import LazyProviders, StartupProfiler, detect_browser_modes, write_profile_on_first_page
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(name)s  %(asctime)s [%(levelname)s] %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+def parse_args():
+    parser = argparse.ArgumentParser(description="StreamPlayer")
+    parser.add_argument("--profile-startup", nargs="?", const="", default=None, metavar="REPORT",
+                        help="time startup phases and write a JSON report (default: startup_profile.json in the data dir)")
+    # PyInstaller / browsers may pass their own arguments
+    args, _ = parser.parse_known_args()
+    return args
+
+
+args = parse_args()
+profiler = StartupProfiler(enabled=args.profile_startup is not None, output=args.profile_startup or None)
+
+with profiler.phase("import:eel"):
+    import eel
+with profiler.phase("import:core"):
+    from providers.log_setup import log_manager
+    from providers.runtime import runtime
+    from providers.donation_journal import donation_journal
+    from providers.prefetch import prefetch_scheduler
+    from providers.transcript_cache import transcript_cache
+    from providers import metrics, queue_store, video_pipeline
+
+# Эти модули нужны только ради @eel.expose: эндпоинты регистрируются при импорте, до eel.start.
+# Перечислены явно, чтобы чистка неиспользуемых импортов не удалила их вместе с эндпоинтами
+EXPOSED_MODULES = (video_pipeline, queue_store, metrics)
+
+
+# Non-blocking: records go through a bounded queue to a writer thread (providers/log_setup.py)
+log_manager.setup(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 logger.info("Initializing StreamPlayer backend...")
 
-PROVIDERS = {
-    'DA': da_provider,
-    'YC': caption_provider
-}
+# Все провайдеры реализуют AsyncProvider и живут в одном event loop (providers/runtime.py)
+# DA - реестр аккаунтов DonationAlerts (providers/da_registry.py), config может содержать account_id
+# Модули провайдеров грузятся в фоне, пока инициализируется Eel; тяжелые клиенты - при первом использовании
+# Они импортируются только по строке, поэтому build:* передают их PyInstaller через --hidden-import (package.json)
+PROVIDERS = LazyProviders({
+    'DA': 'providers.da_registry:da_registry',
+    'DX': 'providers.dx_provider:dx_provider',
+    'YC': 'providers.youtube_caption:caption_provider'
+})
+providers_loading = PROVIDERS.preload(profiler)
+
+with profiler.phase("runtime_start"):
+    runtime.start()
+    donation_journal.start()
+    prefetch_scheduler.start()
+    transcript_cache.start()
 
 def get_app_path():
     """Determines the path to resources (supports both dev mode and PyInstaller)"""
@@ -34,7 +68,8 @@ logger.info(f"[*] Initializing Eel in directory: {web_dir}")
 
 
 if os.path.exists(web_dir):
-    eel.init(web_dir)
+    with profiler.phase("eel_init"):
+        eel.init(web_dir)
 else:
     logger.error(f"Dicrectory {web_dir} not found! Make sure 'npm run build' has been executed.")
 
@@ -54,22 +89,17 @@ def ping():
 @eel.expose
 def connect_provider(provider_id, config):
     """Универсальная функция подключения"""
-    if provider_id in PROVIDERS:
-        # Для DA мы вызываем connect_with_token, для DX - connect
-        # Приводим к общему виду:
-        provider = PROVIDERS[provider_id]
-        
-        if provider_id == 'DA':
-            return provider.connect_with_token(
-                config.get('token'),
-                config.get('refresh_token'),
-                config.get('client_id'),
-                config.get('client_secret')
-            )
-        elif provider_id == 'DX':
-            return provider.connect(config.get('token'))
-            
-    return {"success": False, "message": "Provider not found"}
+    provider = PROVIDERS.get(provider_id)
+    if not provider:
+        return {"success": False, "message": "Provider not found"}
+    return runtime.call(provider.connect(config or {}))
+
+@eel.expose
+def disconnect_provider(provider_id):
+    provider = PROVIDERS.get(provider_id)
+    if not provider:
+        return {"success": False, "message": "Provider not found"}
+    return runtime.call(provider.disconnect())
 
 @eel.expose
 def get_all_statuses():
@@ -82,9 +112,17 @@ try:
     # If you use 'chrome', Eel will create an app window. 
     # If 'None', open http://localhost:8080 manually.
 
-    browser_modes = ['chrome', 'edge', 'default']
+    # Lookups run in parallel and are cached between runs, unavailable modes are skipped
+    with profiler.phase("browser_detect"):
+        browser_modes = detect_browser_modes(['chrome', 'edge', 'default'])
+
+    # Eel lists exposed functions in eel.js, so every provider module must be imported before the page loads
+    with profiler.phase("providers_wait"):
+        providers_loading.join()
+    write_profile_on_first_page(profiler)
+    profiler.mark("eel_start")
 
-    # Check if mode chrome is available
+    started = False
     for mode in browser_modes:
         try:
             print(f"[*] Trying to start in mode: {mode}")
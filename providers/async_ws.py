@@ -0,0 +1,324 @@
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import ssl
+import struct
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("ASYNC_WS")
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONT = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+_CLOSED = object()  # end-of-stream marker in the message queue
+
+
+def apply_mask(data, mask):
+    """XOR with the 4-byte mask as one big integer (much faster than a per-byte loop)"""
+    length = len(data)
+    if not length:
+        return b""
+    key = (mask * (length // 4 + 1))[:length]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(length, "big")
+
+
+class WebSocketClosed(Exception):
+    def __init__(self, code=None, reason=""):
+        super().__init__(f"WebSocket closed: {code} {reason}".strip())
+        self.code = code
+        self.reason = reason
+
+
+class AsyncWebSocket:
+    """
+    Minimal RFC 6455 client on top of asyncio streams.
+    Enough for Centrifugo and SignalR JSON transports: text/binary messages, fragmentation,
+    ping/pong keepalive and a clean close handshake. No extensions (permessage-deflate).
+
+    Frames are read by a background task: control frames (ping, pong, close) are answered
+    there and complete messages are queued for recv(). A consumer that is busy between
+    recv() calls (e.g. waiting on an HTTP request) therefore cannot stall pongs or the
+    keepalive deadline.
+    """
+
+    def __init__(self, reader, writer, ping_interval=None, ping_timeout=None, close_timeout=2.0):
+        self.reader = reader
+        self.writer = writer
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.close_timeout = close_timeout
+        self.closed = False
+        self.close_code = None
+        self.close_reason = ""
+        self._close_sent = False
+        self._write_lock = asyncio.Lock()
+        self._messages = asyncio.Queue()
+        self._eof = False
+        self._last_received = None
+        self._reader_task = None
+        self._keepalive_task = None
+
+    @classmethod
+    async def connect(cls, url, headers=None, ping_interval=25, ping_timeout=10, open_timeout=15):
+        parts = urlsplit(url)
+        secure = parts.scheme in ("wss", "https")
+        host = parts.hostname
+        port = parts.port or (443 if secure else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        ssl_ctx = ssl.create_default_context() if secure else None
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=ssl_ctx, server_hostname=host if secure else None),
+            open_timeout
+        )
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        host_header = host if parts.port is None else f"{host}:{port}"
+        request = [
+            f"GET {path} HTTP/1.1",
+            f"Host: {host_header}",
+            "Upgrade: websocket",
+            "Connection: Upgrade",
+            f"Sec-WebSocket-Key: {key}",
+            "Sec-WebSocket-Version: 13",
+        ]
+        for name, value in (headers or {}).items():
+            request.append(f"{name}: {value}")
+        writer.write(("\r\n".join(request) + "\r\n\r\n").encode())
+        await writer.drain()
+
+        response = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), open_timeout)
+        lines = response.decode("latin-1").split("\r\n")
+        status_line = lines[0].split(" ", 2)
+        if len(status_line) < 2 or status_line[1] != "101":
+            writer.close()
+            raise ConnectionError(f"WebSocket handshake failed: {lines[0]}")
+
+        response_headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                response_headers[name.strip().lower()] = value.strip()
+        expected = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        if response_headers.get("sec-websocket-accept") != expected:
+            writer.close()
+            raise ConnectionError("WebSocket handshake failed: bad Sec-WebSocket-Accept")
+
+        ws = cls(reader, writer, ping_interval, ping_timeout)
+        ws.start()
+        return ws
+
+    def start(self):
+        """Starts the frame reader (and keepalive); connect() does this after the handshake"""
+        self._last_received = asyncio.get_running_loop().time()
+        self._reader_task = asyncio.ensure_future(self._read_loop())
+        if self.ping_interval:
+            self._keepalive_task = asyncio.ensure_future(self._keepalive())
+
+    # --- sending ---
+
+    async def _send_frame(self, opcode, payload):
+        header = bytearray([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header.append(0x80 | length)
+        elif length < 1 << 16:
+            header.append(0x80 | 126)
+            header += struct.pack("!H", length)
+        else:
+            header.append(0x80 | 127)
+            header += struct.pack("!Q", length)
+
+        # Client frames must be masked
+        mask = os.urandom(4)
+        header += mask
+
+        async with self._write_lock:
+            if self.writer.is_closing():
+                raise WebSocketClosed(self.close_code or 1006, "connection lost")
+            self.writer.write(bytes(header) + apply_mask(payload, mask))
+            await self.writer.drain()
+
+    async def send(self, message):
+        if self.closed:
+            raise WebSocketClosed(self.close_code, self.close_reason)
+        if isinstance(message, str):
+            await self._send_frame(OP_TEXT, message.encode("utf-8"))
+        else:
+            await self._send_frame(OP_BINARY, bytes(message))
+
+    async def ping(self, data=b""):
+        await self._send_frame(OP_PING, data)
+
+    async def _send_close(self, code, reason=""):
+        if self._close_sent:
+            return
+        self._close_sent = True
+        payload = b"" if code is None else struct.pack("!H", code) + reason.encode("utf-8")
+        try:
+            await self._send_frame(OP_CLOSE, payload)
+        except Exception:
+            pass
+
+    async def close(self, code=1000, reason=""):
+        """Close handshake: send a close frame, wait briefly for the server's, then drop the connection"""
+        if self.closed and self._close_sent:
+            return
+        self.closed = True
+        await self._send_close(code, reason)
+        if self._reader_task and not self._reader_task.done():
+            # The reader returns once the server's close frame arrives
+            await asyncio.wait({self._reader_task}, timeout=self.close_timeout)
+        self._shutdown(code)
+
+    def _shutdown(self, code=1006):
+        """Drops the connection: stops keepalive, closes the transport, wakes up recv()"""
+        self.closed = True
+        if self.close_code is None:
+            self.close_code = code
+        keepalive = self._keepalive_task
+        if keepalive and keepalive is not asyncio.current_task() and not keepalive.done():
+            keepalive.cancel()
+        if self._reader_task and self._reader_task is not asyncio.current_task() and not self._reader_task.done():
+            self._reader_task.cancel()
+        if not self.writer.is_closing():
+            self.writer.close()
+        if not self._eof:
+            self._eof = True
+            self._messages.put_nowait(_CLOSED)
+
+    # --- receiving ---
+
+    async def _read_frame(self):
+        head = await self.reader.readexactly(2)
+        fin = head[0] & 0x80
+        opcode = head[0] & 0x0F
+        length = head[1] & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await self.reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await self.reader.readexactly(8))[0]
+        if head[1] & 0x80:
+            # Servers must not mask, but tolerate it
+            mask = await self.reader.readexactly(4)
+            data = apply_mask(await self.reader.readexactly(length), mask)
+        else:
+            data = await self.reader.readexactly(length)
+        return fin, opcode, data
+
+    async def _read_loop(self):
+        loop = asyncio.get_running_loop()
+        fragments = []
+        message_opcode = None
+        code = 1006
+        try:
+            while True:
+                fin, opcode, data = await self._read_frame()
+                self._last_received = loop.time()
+
+                if opcode == OP_PING:
+                    if not self._close_sent:
+                        await self._send_frame(OP_PONG, data)
+                    continue
+                if opcode == OP_PONG:
+                    continue
+                if opcode == OP_CLOSE:
+                    code = struct.unpack("!H", data[:2])[0] if len(data) >= 2 else 1005
+                    self.close_code = code
+                    self.close_reason = data[2:].decode("utf-8", "replace")
+                    self.closed = True
+                    # Echo the status code unless we started the handshake
+                    await self._send_close(code if len(data) >= 2 else None)
+                    return
+
+                if opcode == OP_CONT:
+                    if message_opcode is None:
+                        code = await self._fail(1002, "unexpected continuation frame")
+                        return
+                elif opcode in (OP_TEXT, OP_BINARY):
+                    if message_opcode is not None:
+                        code = await self._fail(1002, "new message inside a fragmented one")
+                        return
+                    message_opcode = opcode
+                else:
+                    code = await self._fail(1002, f"unknown opcode {opcode}")
+                    return
+
+                fragments.append(data)
+                if fin:
+                    payload = b"".join(fragments)
+                    fragments = []
+                    if message_opcode == OP_TEXT:
+                        try:
+                            payload = payload.decode("utf-8")
+                        except UnicodeDecodeError:
+                            code = await self._fail(1007, "invalid UTF-8 in a text message")
+                            return
+                    message_opcode = None
+                    self._messages.put_nowait(payload)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError, WebSocketClosed):
+            if self.close_reason == "":
+                self.close_reason = "connection lost"
+        finally:
+            self._shutdown(code)
+
+    async def _fail(self, code, reason):
+        logger.warning(f"Protocol error, closing connection: {reason}")
+        self.close_code = code
+        self.close_reason = reason
+        self.closed = True
+        await self._send_close(code, reason)
+        return code
+
+    async def recv(self):
+        """Returns the next text (str) or binary (bytes) message; raises WebSocketClosed at the end"""
+        message = await self._messages.get()
+        if message is _CLOSED:
+            # Keep the marker for later calls
+            self._messages.put_nowait(_CLOSED)
+            raise WebSocketClosed(self.close_code, self.close_reason)
+        return message
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return await self.recv()
+        except WebSocketClosed:
+            raise StopAsyncIteration
+
+    async def _keepalive(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while not self.closed and not self.writer.is_closing():
+                await asyncio.sleep(self.ping_interval)
+                if self.closed or self.writer.is_closing():
+                    return
+                sent_at = loop.time()
+                await self.ping()
+                if self.ping_timeout:
+                    await asyncio.sleep(self.ping_timeout)
+                    # Any frame (pong or data) since the ping proves the server is alive
+                    if not self.closed and self._last_received < sent_at:
+                        logger.warning("No pong received, closing connection")
+                        self.close_reason = "keepalive timeout"
+                        self._shutdown(1006)
+                        return
+        except asyncio.CancelledError:
+            pass
+        except WebSocketClosed:
+            pass
+        except Exception as e:
+            logger.warning(f"Keepalive stopped: {e}")
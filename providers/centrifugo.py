@@ -0,0 +1,254 @@
+import json
+import logging
+import re
+
+logger = logging.getLogger("CENTRIFUGO")
+
+# orjson is optional: 2-4x faster loads on donation-sized frames, same results
+try:
+    import orjson
+    json_loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    json_loads = json.loads
+    JSON_BACKEND = "json"
+
+PING_FRAMES = frozenset(("", "{}", b"", b"{}"))
+# Push type is serialized first by Centrifugo; anything but 0 (publication) is join/leave/unsub/...
+NON_PUBLICATION_PUSH_RE = re.compile(r'^\{"result":\{"type":([1-9]\d*)')
+PUSH_TYPE_PUBLICATION = 0
+
+PROTOCOL_JSON = "json"
+PROTOCOL_PROTOBUF = "protobuf"
+
+
+class Reply:
+    """Answer to one of our commands (connect id=1, subscribe id=2)"""
+    __slots__ = ("id", "result", "error")
+
+    def __init__(self, id, result, error=None):
+        self.id = id
+        self.result = result
+        self.error = error
+
+
+class Publication:
+    """A donation pushed into the channel, already unwrapped from whichever layout it came in"""
+    __slots__ = ("channel", "offset", "donation")
+
+    def __init__(self, channel, offset, donation):
+        self.channel = channel
+        self.offset = offset
+        self.donation = donation
+
+
+def unwrap_donation(data):
+    """
+    Donation dict from a publication's data, or None for connection-info messages.
+    Some API versions wrap the donation in one more "data" object.
+    """
+    if not isinstance(data, dict):
+        return None
+    inner = data.get("data")
+    if isinstance(inner, dict):
+        data = inner
+    info = data.get("info")
+    if isinstance(info, dict) and "user" in info:
+        return None
+    return data
+
+
+# --- protobuf wire format (Centrifugo binary transport), just the fields we read ---
+
+def _read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _iter_fields(buf):
+    """Yields (field number, value) for varint and length-delimited fields; skips fixed-width ones"""
+    pos, end = 0, len(buf)
+    while pos < end:
+        key, pos = _read_varint(buf, pos)
+        field, wire_type = key >> 3, key & 0x07
+        if wire_type == 0:
+            value, pos = _read_varint(buf, pos)
+        elif wire_type == 2:
+            length, pos = _read_varint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire_type == 1:
+            pos += 8
+            continue
+        elif wire_type == 5:
+            pos += 4
+            continue
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield field, value
+
+
+class CentrifugoDecoder:
+    """
+    Turns raw Centrifugo frames into Reply / Publication records.
+
+    The transport is the one negotiated for the connection, never guessed from the payload:
+    a protobuf length prefix can be any byte, including "{" or "\n".
+
+    JSON transport: one frame may carry several newline-separated replies (batched).
+    Pings ("{}") and non-publication pushes (join/leave) are dropped before json decoding.
+    Text frames (str) are always JSON; binary ones are JSON too unless the connection is protobuf.
+    Protobuf transport (binary frames): varint-delimited Reply messages, where
+    Reply{id=1, error=2, result=3}, Push{type=1, channel=2, data=3} and
+    Publication{data=4, offset=6}; the donation itself is JSON inside Publication.data.
+    """
+
+    def __init__(self, loads=None, protocol=PROTOCOL_JSON):
+        if protocol not in (PROTOCOL_JSON, PROTOCOL_PROTOBUF):
+            raise ValueError(f"Unknown Centrifugo protocol: {protocol}")
+        self.loads = loads or json_loads
+        self.protocol = protocol
+        self.stats = {"frames": 0, "pings": 0, "skipped": 0, "replies": 0, "publications": 0, "errors": 0}
+
+    def decode(self, frame):
+        """Returns a list of Reply / Publication (empty for pings and skipped pushes)"""
+        self.stats["frames"] += 1
+        if isinstance(frame, (bytes, bytearray, memoryview)):
+            frame = bytes(frame)
+            if self.protocol == PROTOCOL_PROTOBUF:
+                return self._decode_protobuf(frame)
+            try:
+                frame = frame.decode("utf-8")
+            except UnicodeDecodeError as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Undecodable Centrifugo frame: {e}")
+                return []
+        if frame in PING_FRAMES:
+            self.stats["pings"] += 1
+            return []
+
+        records = []
+        for line in frame.split("\n") if "\n" in frame else (frame,):
+            if line in PING_FRAMES:
+                self.stats["pings"] += 1
+                continue
+            if NON_PUBLICATION_PUSH_RE.match(line):
+                self.stats["skipped"] += 1
+                continue
+            try:
+                record = self._from_json(self.loads(line))
+            except ValueError as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Undecodable Centrifugo frame: {e}")
+                continue
+            if record is not None:
+                records.append(record)
+        return records
+
+    def _from_json(self, message):
+        if not isinstance(message, dict):
+            # Valid JSON but not a Centrifugo reply (array, string, number...) - drop just this line
+            self.stats["errors"] += 1
+            logger.warning(f"Unexpected Centrifugo message: {type(message).__name__}")
+            return None
+        if not message:
+            self.stats["pings"] += 1
+            return None
+        reply_id = message.get("id")
+        result = message.get("result")
+        if reply_id:
+            self.stats["replies"] += 1
+            return Reply(reply_id, result or {}, message.get("error"))
+        if not isinstance(result, dict):
+            self.stats["skipped"] += 1
+            return None
+
+        push_type = result.get("type", PUSH_TYPE_PUBLICATION)
+        if push_type not in (PUSH_TYPE_PUBLICATION, "publish"):
+            self.stats["skipped"] += 1
+            return None
+        data = result.get("data")
+        if not isinstance(data, dict):
+            self.stats["skipped"] += 1
+            return None
+        # Standard layout: result -> data (publication: offset, data) -> data (donation)
+        offset = data.get("offset") if "data" in data else None
+        donation = unwrap_donation(data)
+        if donation is None:
+            self.stats["skipped"] += 1
+            return None
+        self.stats["publications"] += 1
+        return Publication(result.get("channel"), offset, donation)
+
+    def _decode_protobuf(self, frame):
+        records, pos, end = [], 0, len(frame)
+        if not frame:
+            self.stats["pings"] += 1
+        while pos < end:
+            try:
+                length, pos = _read_varint(frame, pos)
+            except IndexError as e:
+                # Broken length prefix: the rest of the frame cannot be split into replies
+                self.stats["errors"] += 1
+                logger.warning(f"Undecodable Centrifugo protobuf frame: {e}")
+                break
+            buf = frame[pos:pos + length]
+            pos += length
+            if not buf:
+                # Empty Reply is the protobuf ping
+                self.stats["pings"] += 1
+                continue
+            try:
+                record = self._reply_from_protobuf(buf)
+            except (IndexError, ValueError) as e:
+                self.stats["errors"] += 1
+                logger.warning(f"Undecodable Centrifugo protobuf reply: {e}")
+                continue
+            if record is not None:
+                records.append(record)
+        return records
+
+    def _reply_from_protobuf(self, buf):
+        reply_id, result, error = 0, b"", None
+        for field, value in _iter_fields(buf):
+            if field == 1:
+                reply_id = value
+            elif field == 2:
+                error = {field_no: v for field_no, v in _iter_fields(value)}
+            elif field == 3:
+                result = value
+        if reply_id:
+            self.stats["replies"] += 1
+            # Command results stay raw: the provider only needs them on the JSON transport
+            return Reply(reply_id, {"raw": result}, error)
+
+        push_type, channel, data = PUSH_TYPE_PUBLICATION, None, b""
+        for field, value in _iter_fields(result):
+            if field == 1:
+                push_type = value
+            elif field == 2:
+                channel = value.decode("utf-8")
+            elif field == 3:
+                data = value
+        if push_type != PUSH_TYPE_PUBLICATION:
+            self.stats["skipped"] += 1
+            return None
+
+        offset, payload = None, b""
+        for field, value in _iter_fields(data):
+            if field == 4:
+                payload = value
+            elif field == 6:
+                offset = value
+        donation = unwrap_donation(self.loads(payload)) if payload else None
+        if donation is None:
+            self.stats["skipped"] += 1
+            return None
+        self.stats["publications"] += 1
+        return Publication(channel, offset, donation)
@@ -1,19 +1,44 @@
-import requests
+import asyncio
 import json
 import logging
-from threading import Thread
-import eel
+import os
+import random
+from threading import Lock
 import time
-
-try:
-    import websocket
-except ImportError:
-    websocket = None
-    print("[WARNING] websocket-client not installed. Run: pip install websocket-client")
-
-class DonationAlertsProvider:
-    def __init__(self, logger):
+from providers.async_ws import AsyncWebSocket, WebSocketClosed
+from providers.centrifugo import PING_FRAMES, PROTOCOL_JSON, CentrifugoDecoder, Publication, unwrap_donation
+from providers.donation_journal import donation_journal
+from providers.event_bus import send_to_ui
+from providers.http_client import http_client
+from providers.log_setup import LazyJson
+from providers.metrics import trace_donation
+from providers.runtime import AsyncProvider, runtime
+
+DA_API_BASE = os.environ.get("STREAMPLAYER_DA_API_BASE", "https://www.donationalerts.com")
+DA_WS_URL = os.environ.get("STREAMPLAYER_DA_WS_URL", "wss://centrifugo.donationalerts.com/connection/websocket")
+DA_SCOPES = "oauth-user-show oauth-donation-subscribe"
+
+RECONNECT_BASE_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+TOKEN_REFRESH_MARGIN = 300  # refresh this many seconds before the access token expires
+DEFAULT_ACCOUNT = "main"
+
+class DonationAlertsProvider(AsyncProvider):
+    """
+    One DonationAlerts account: OAuth tokens, its Centrifugo connection and donation channel.
+    Several accounts are managed by DonationAlertsRegistry (providers/da_registry.py); on_donation
+    lets the registry merge their donations, without it donations go straight to the UI.
+    """
+    provider_id = 'DA'
+
+    def __init__(self, logger, account_id=DEFAULT_ACCOUNT, api_base=DA_API_BASE, ws_url=DA_WS_URL,
+                 http=http_client, on_donation=None):
         self.logger = logger
+        self.account_id = account_id
+        self.on_donation = on_donation
+        self.api_base = api_base
+        self.ws_url = ws_url
+        self.http = http
         self.client_id = None
         self.client_secret = None
         self.redirect_uri = "http://localhost:8080"
@@ -22,20 +47,53 @@ class DonationAlertsProvider:
         self.user_id = None
         self.socket_token = None
         self.ws = None
-        self.ws_thread = None
+        self._supervisor = None  # Future of the supervisor task on the runtime loop
         self.is_connected = False
         self.user_name = "Unknown"
 
-    def log(self, message, level="info"):
-        prefix = "[PYTHON] [DA_PROVIDER]"
+        # Supervisor state
+        self.token_expires_at = None
+        self._stop_event = None  # asyncio.Event, created on the runtime loop
+        self._refresh_future = None
+        self._token_lock = Lock()
+        self._reconnect_attempt = 0
+        self._disconnected_at = None
+        self._subscribing_recover = False
+
+        # Centrifugo stream position, used to recover publications missed while offline
+        self.channel_offset = None
+        self.channel_epoch = None
+        # DA's endpoint is connected with the JSON protocol (no format=protobuf)
+        self.decoder = CentrifugoDecoder(protocol=PROTOCOL_JSON)
+
+        self.metrics = {
+            "connects": 0,
+            "reconnects": 0,
+            "disconnects": 0,
+            "last_reconnect_ms": None,
+            "max_reconnect_ms": None,
+            "token_refreshes": 0,
+            "token_refresh_failures": 0,
+            "recovered_messages": 0,
+            "gaps_detected": 0,
+            "messages_lost": 0,
+            "unrecovered_resubscribes": 0,
+        }
+
+    def log(self, message, level="info", *args, category=None):
+        """message may contain %-placeholders for args; they are only rendered if the record is emitted"""
+        prefix = "[PYTHON] [DA_PROVIDER]" if self.account_id == DEFAULT_ACCOUNT else f"[PYTHON] [DA_PROVIDER:{self.account_id}]"
+        extra = {"category": category} if category else None
         if level == "error":
-            self.logger.error(f"{prefix} ❌ {message}")
+            self.logger.error(f"{prefix} ❌ {message}", *args, extra=extra)
         elif level == "warning":
-            self.logger.warning(f"{prefix} ⚠️ {message}")
+            self.logger.warning(f"{prefix} ⚠️ {message}", *args, extra=extra)
+        elif level == "debug":
+            self.logger.debug(f"{prefix} {message}", *args, extra=extra)
         else:
-            self.logger.info(f"{prefix} {message}")
+            self.logger.info(f"{prefix} {message}", *args, extra=extra)
 
-    def exchange_code_for_token(self, code, client_id, client_secret, redirect_uri=None):
+    def exchange_code_for_token(self, code, client_id, client_secret, redirect_uri=None, start_websocket=True):
         """Exchanges OAuth code for access token"""
         self.log(f"Exchanging code for token...", "info")
         self.log(f"Code: {code[:10]}...", "info")
@@ -45,7 +103,7 @@ class DonationAlertsProvider:
         uri_to_use = redirect_uri if redirect_uri else self.redirect_uri
         self.log(f"Redirect URI: {uri_to_use}", "info")
         
-        url = "https://www.donationalerts.com/oauth/token"
+        url = f"{self.api_base}/oauth/token"
         data = {
             "grant_type": "authorization_code",
             "client_id": client_id,
@@ -55,7 +113,7 @@ class DonationAlertsProvider:
         }
 
         try:
-            response = requests.post(url, data=data, timeout=15)
+            response = self.http.post(url, data=data, endpoint="da.oauth_token")
             self.log(f"Response Status: {response.status_code}", "info")
             
             if response.status_code == 200:
@@ -64,13 +122,15 @@ class DonationAlertsProvider:
                 self.refresh_token = token_data.get("refresh_token")
                 self.client_id = client_id
                 self.client_secret = client_secret
+                self._set_token_expiry(token_data.get("expires_in"))
                 
                 self.log("✅ Token exchange successful!", "info")
                 
                 # Get User Info & Socket Token immediately
                 if self._fetch_user_info():
-                    # Start WebSocket
-                    self._start_websocket()
+                    # Start WebSocket (the registry starts it itself after checking for a shared connection)
+                    if start_websocket:
+                        self._start_websocket()
                     
                     return {
                         "success": True,
@@ -96,11 +156,11 @@ class DonationAlertsProvider:
     def _fetch_user_info(self):
         """Fetches user info and socket connection token"""
         self.log("Fetching user info and socket token...", "info")
-        url = "https://www.donationalerts.com/api/v1/user/oauth"
+        url = f"{self.api_base}/api/v1/user/oauth"
         headers = {"Authorization": f"Bearer {self.access_token}"}
         
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self.http.get(url, headers=headers, endpoint="da.user_oauth")
             if response.status_code == 200:
                 data = response.json().get("data", {})
                 self.user_id = data.get("id")
@@ -117,39 +177,39 @@ class DonationAlertsProvider:
         return False
 
     def _start_websocket(self):
-        if self.ws_thread and self.ws_thread.is_alive():
+        if self._supervisor and not self._supervisor.done():
             self.log("WebSocket already running", "warning")
             return
 
-        self.log("Starting WebSocket thread...", "info")
-        self.ws_thread = Thread(target=self._websocket_loop, daemon=True)
-        self.ws_thread.start()
+        self.log("Starting WebSocket supervisor...", "info")
+        self._supervisor = runtime.submit(self._websocket_loop())
 
     def _send_to_ui(self, function_name, data):
-        """Helper to safely call Eel functions"""
-        try:
-            func = getattr(eel, function_name, None)
-            if func:
-                self.log(f"Calling UI function: {function_name}", "info")
-                func(data)
-            else:
-                self.log(f"⚠️ UI function '{function_name}' NOT found in eel module. Is the browser connected?", "warning")
-        except Exception as e:
-            self.log(f"Error calling {function_name}: {e}", "warning")
+        """Queues a UI callback on the outbound event bus (batched, see providers/event_bus.py)"""
+        send_to_ui(function_name, data)
+
+    def _send_status(self, status):
+        self._send_to_ui('onDAConnectionStatus', {'status': status, 'account_id': self.account_id})
             
     def start_auth_thread(self, credentials):
-        """Launches OAuth process in a thread"""
+        """Launches OAuth process on the runtime executor"""
         cid = credentials.get('client_id', 'unknown')
         self.log(f"Launch OAuth for ID: {cid}")
 
-        auth_thread = Thread(
-            target=self.auth, 
-            args=(credentials['client_id'], credentials['client_secret']),
-            daemon=True
+        runtime.submit(runtime.run_blocking(self.auth, credentials['client_id'], credentials['client_secret']))
+
+    async def connect(self, config):
+        """AsyncProvider entry point used by connect_provider"""
+        return await runtime.run_blocking(
+            self.connect_with_token,
+            config.get('token'),
+            config.get('refresh_token'),
+            config.get('client_id'),
+            config.get('client_secret'),
+            config.get('token_expiry')
         )
-        auth_thread.start()
 
-    def connect_with_token(self, access_token, refresh_token, client_id, client_secret):
+    def connect_with_token(self, access_token, refresh_token, client_id, client_secret, token_expiry=None, start_websocket=True):
         """
         Подключается к DonationAlerts с существующим токеном
         Вызывается из React при загрузке страницы, если токен уже есть в store
@@ -167,13 +227,18 @@ class DonationAlertsProvider:
             self.refresh_token = refresh_token
             self.client_id = client_id
             self.client_secret = client_secret
+            if token_expiry:
+                # token_expiry приходит из store в миллисекундах
+                self.token_expires_at = float(token_expiry) / 1000
+                self._schedule_token_refresh()
             
-            # Проверяем валидность токена
-            if self._fetch_user_info():
+            # Проверяем валидность токена (при 401 пробуем обновить через refresh_token)
+            if self._fetch_user_info() or (self.refresh_token and self._refresh_access_token() and self._fetch_user_info()):
                 self.log(f"Token valid for user: {self.user_name}", "info")
                 
                 # Запускаем WebSocket
-                self._start_websocket()
+                if start_websocket:
+                    self._start_websocket()
                 
                 return {
                     'success': True,
@@ -195,100 +260,216 @@ class DonationAlertsProvider:
                 'message': str(e)
             }
 
+    async def disconnect(self):
+        """Stops the supervisor and closes the socket without reconnecting"""
+        self.log("Disconnect requested", "info")
+        if self._stop_event:
+            self._stop_event.set()
+        if self._refresh_future:
+            self._refresh_future.cancel()
+        if self.ws:
+            await self.ws.close()
+        return {'success': True}
+
+    def _set_token_expiry(self, expires_in):
+        if expires_in:
+            self.token_expires_at = time.time() + float(expires_in)
+            self._schedule_token_refresh()
+
+    def _schedule_token_refresh(self):
+        if self._refresh_future:
+            self._refresh_future.cancel()
+        if not self.token_expires_at or not self.refresh_token:
+            return
+        delay = max(30.0, self.token_expires_at - time.time() - TOKEN_REFRESH_MARGIN)
+        self._refresh_future = runtime.submit(self._refresh_after(delay))
+        self.log(f"Token refresh scheduled in {int(delay)}s", "info")
+
+    async def _refresh_after(self, delay):
+        await asyncio.sleep(delay)
+        await runtime.run_blocking(self._refresh_access_token)
+
+    def _token_expiring(self):
+        return bool(self.token_expires_at) and self.token_expires_at - time.time() < TOKEN_REFRESH_MARGIN
+
+    def _refresh_access_token(self):
+        """Exchanges the stored refresh_token for a new access token and tells the UI to persist it"""
+        with self._token_lock:
+            if not (self.refresh_token and self.client_id and self.client_secret):
+                self.log("Cannot refresh token: missing refresh_token or client credentials", "warning")
+                return False
+
+            self.log("Refreshing OAuth token...", "info")
+            data = {
+                "grant_type": "refresh_token",
+                "refresh_token": self.refresh_token,
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "scope": DA_SCOPES
+            }
+            try:
+                response = self.http.post(f"{self.api_base}/oauth/token", data=data, endpoint="da.oauth_token")
+                if response.status_code != 200:
+                    self.log(f"Token refresh failed: HTTP {response.status_code}: {response.text}", "error")
+                    self.metrics["token_refresh_failures"] += 1
+                    return False
+
+                token_data = response.json()
+                self.access_token = token_data.get("access_token")
+                self.refresh_token = token_data.get("refresh_token", self.refresh_token)
+                self._set_token_expiry(token_data.get("expires_in"))
+                self.metrics["token_refreshes"] += 1
+                self.log("✅ Token refreshed", "info")
+
+                self._send_to_ui('onDATokenRefreshed', {
+                    'account_id': self.account_id,
+                    'access_token': self.access_token,
+                    'refresh_token': self.refresh_token,
+                    'expires_at': int(self.token_expires_at * 1000) if self.token_expires_at else 0
+                })
+                return True
+            except Exception as e:
+                self.log(f"Exception during token refresh: {e}", "error")
+                self.metrics["token_refresh_failures"] += 1
+                return False
+
+    def _reconnect_delay(self):
+        # Exponential backoff with full jitter
+        ceiling = min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * (2 ** self._reconnect_attempt))
+        self._reconnect_attempt += 1
+        return random.uniform(RECONNECT_BASE_DELAY / 2, ceiling)
+
+    def _prepare_reconnect(self):
+        """Makes sure we have a valid access token and a fresh socket token before reconnecting"""
+        if self._token_expiring():
+            self._refresh_access_token()
+        if self._fetch_user_info():
+            return True
+        # Most likely 401 - the token expired without us knowing its expiry
+        return bool(self.refresh_token) and self._refresh_access_token() and self._fetch_user_info()
+
+    def get_metrics(self):
+        metrics = dict(self.metrics)
+        metrics["status"] = self.get_status()["status"]
+        metrics["channel_offset"] = self.channel_offset
+        metrics["channel_epoch"] = self.channel_epoch
+        metrics["frames"] = dict(self.decoder.stats)
+        metrics["token_expires_in"] = int(self.token_expires_at - time.time()) if self.token_expires_at else None
+        return metrics
+
     def get_status(self):
         """Returns current connection status"""
         status = 'connected' if self.is_connected else 'disconnected'
-        # Если поток запущен но еще не connected, значит connecting
-        if self.ws_thread and self.ws_thread.is_alive() and not self.is_connected:
+        # Если супервизор запущен но еще не connected, значит connecting
+        if self._supervisor and not self._supervisor.done() and not self.is_connected:
             status = 'connecting'
         return {'status': status}
 
 
-    def _websocket_loop(self):
-        time.sleep(1.0)
-        if not websocket:
-            self.log("websocket-client not installed", "error")
-            return
+    async def _websocket_loop(self):
+        """Supervisor: keeps the Centrifugo connection alive until disconnect() is called"""
+        self._stop_event = asyncio.Event()
+        await asyncio.sleep(1.0)
 
-        ws_url = "wss://centrifugo.donationalerts.com/connection/websocket"
+        self._reconnect_attempt = 0
+        while not self._stop_event.is_set():
+            await self._run_websocket()
+            self.is_connected = False
+            if self._stop_event.is_set():
+                break
+
+            self.metrics["disconnects"] += 1
+            if self._disconnected_at is None:
+                self._disconnected_at = time.perf_counter()
+
+            delay = self._reconnect_delay()
+            self.log(f"Reconnecting in {delay:.1f}s (attempt {self._reconnect_attempt})...", "warning")
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), delay)
+                break
+            except asyncio.TimeoutError:
+                pass
+            if not await runtime.run_blocking(self._prepare_reconnect):
+                self.log("Could not refresh credentials, will retry", "warning")
+                continue
+
+        self.log("WebSocket supervisor stopped", "info")
+
+    async def _run_websocket(self):
+        ws_url = self.ws_url
         self.log(f"Connecting to {ws_url}...", "info")
         
         # Notify UI
-        self._send_to_ui('onDAConnectionStatus', {'status': 'connecting'})
-
-        def on_open(ws):
-            self.log("✅ WebSocket Connected! Sending Auth...", "info")
-            # Step 1: Send Auth with socket_token
-            auth_payload = {
-                "params": {"token": self.socket_token},
-                "id": 1
-            }
-            ws.send(json.dumps(auth_payload))
-            
+        self._send_status('connecting')
 
-        def on_message(ws, message):
-            if message == "{}": return  # PING message
-            self.log(f"📥 RAW MESSAGE FROM SERVER: {message}", "info")
-            try:
-                data = json.loads(message)
-                
-                # Обработка PING (Centrifugo присылает {} для поддержания связи)
-                if not data:
-                    return
-
-                # Если в ответе есть "result" (ответ на команды auth/subscribe)
-                if "id" in data:
-                    if data.get("id") == 1:
-                        client_id = data.get("result", {}).get("client")
-                        self.log(f"✅ Auth result: {client_id}", "info")
-                        self._subscribe_to_channel(ws, client_id)
-                    elif data.get("id") == 2:
-                        self.log("✅ Subscription successful!", "info")
-                        self.is_connected = True
-                        self._send_to_ui('onDAConnectionStatus', {'status': 'connected'})
-
-                # Если это УВЕДОМЛЕНИЕ (оно приходит без ID)
-                if "result" in data:
-                    result = data["result"]
-                    # Проверяем разные варианты вложенности данных
-                    if "data" in result and "data" in result["data"]:
-                        # Стандартный формат: result -> data -> data
-                        self._handle_notification(result["data"]["data"])
-                    elif "data" in result:
-                        # Упрощенный формат
-                        self._handle_notification(result["data"])
-                    elif "type" in result and result["type"] == "publish":
-                        # Centrifugo publish формат
-                        self._handle_notification(result.get("data", {}))
-                    
-            except Exception as e:
-                self.log(f"Error parsing message: {e}", "error")
+        try:
+            self.ws = await AsyncWebSocket.connect(ws_url, ping_interval=25, ping_timeout=10)
+        except Exception as e:
+            self.log(f"WebSocket Error: {e}", "error")
+            self._send_status('disconnected')
+            return
 
-        def on_error(ws, error):
-            self.log(f"WebSocket Error: {error}", "error")
-            self._send_to_ui('onDAConnectionStatus', {'status': 'disconnected'})
+        self.log("✅ WebSocket Connected! Sending Auth...", "info")
+        # Step 1: Send Auth with socket_token
+        auth_payload = {
+            "params": {"token": self.socket_token},
+            "id": 1
+        }
+        try:
+            await self.ws.send(json.dumps(auth_payload))
+            async for message in self.ws:
+                await self._on_message(self.ws, message)
+        except WebSocketClosed:
+            pass
+        except Exception as e:
+            self.log(f"WebSocket Error: {e}", "error")
+        # No-op after a server close; otherwise stops the socket's reader and keepalive tasks
+        await self.ws.close()
 
-        def on_close(ws, close_status_code, close_msg):
-            self.log(f"WebSocket Closed: {close_status_code} {close_msg}", "warning")
-            self.is_connected = False
-            self._send_to_ui('onDAConnectionStatus', {'status': 'disconnected'})
-
-        # Run WebSocket
-        self.ws = websocket.WebSocketApp(
-            ws_url,
-            on_open=on_open,
-            on_message=on_message,
-            on_error=on_error,
-            on_close=on_close
-        )
-        self.ws.run_forever(ping_interval=25, ping_timeout=10)
+        self.log(f"WebSocket Closed: {self.ws.close_code} {self.ws.close_reason}", "warning")
+        self.is_connected = False
+        self._send_status('disconnected')
 
-    def _subscribe_to_channel(self, ws, client_id):
-        """Get subscription token and subscribe"""
+    async def _on_message(self, ws, message):
+        received_at = time.perf_counter()
+        if self.logger.isEnabledFor(logging.DEBUG) and message not in PING_FRAMES:
+            self.log("📥 Raw frame: %s", "debug", message, category="da.frames")
+        try:
+            # Пинги и join/leave отбрасываются декодером до json-парсинга; один фрейм может нести несколько ответов
+            records = self.decoder.decode(message)
+            parse_ms = (time.perf_counter() - received_at) * 1000
+
+            for record in records:
+                if isinstance(record, Publication):
+                    self._track_offset(record.offset)
+                    self._handle_notification(record.donation, received_at, parse_ms)
+                elif record.id == 1:
+                    client_id = record.result.get("client")
+                    self.log(f"✅ Auth result: {client_id}", "info")
+                    await self._subscribe_to_channel(ws, client_id)
+                elif record.id == 2:
+                    if record.error:
+                        self.log(f"❌ Subscription failed: {record.error}", "error")
+                        continue
+                    self.log("✅ Subscription successful!", "info")
+                    self._on_subscribed(record.result)
+                    self.is_connected = True
+                    self._send_status('connected')
+        except Exception as e:
+            self.log(f"Error parsing message: {e}", "error")
+
+    async def _subscribe_to_channel(self, ws, client_id):
+        """Get subscription token (blocking HTTP on the runtime executor) and subscribe"""
+        sub_msg = await runtime.run_blocking(self._build_subscribe_message, client_id)
+        if sub_msg:
+            await ws.send(json.dumps(sub_msg))
+
+    def _build_subscribe_message(self, client_id):
+        """Requests a subscription token and builds the Centrifugo subscribe command"""
         channel = f"$alerts:donation_{self.user_id}"
         self.log(f"Getting subscription token for {channel}...", "info")
         
-        url = "https://www.donationalerts.com/api/v1/centrifuge/subscribe"
+        url = f"{self.api_base}/api/v1/centrifuge/subscribe"
         headers = {"Authorization": f"Bearer {self.access_token}"}
         payload = {
             "client": client_id,
@@ -296,7 +477,7 @@ class DonationAlertsProvider:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
+            response = self.http.post(url, json=payload, headers=headers, endpoint="da.centrifuge_subscribe")
             if response.status_code == 200:
                 channels_data = response.json().get("channels", [])
                 sub_token = None
@@ -307,44 +488,96 @@ class DonationAlertsProvider:
                 
                 if sub_token:
                     self.log("✅ Got subscription token. Subscribing...", "info")
-                    sub_msg = {
-                        "params": {
-                            "channel": channel,
-                            "token": sub_token
-                        },
+                    params = {
+                        "channel": channel,
+                        "token": sub_token
+                    }
+                    # Просим Centrifugo переслать публикации, пропущенные пока мы были отключены
+                    self._subscribing_recover = self.channel_offset is not None
+                    if self._subscribing_recover:
+                        params["recover"] = True
+                        params["offset"] = self.channel_offset
+                        if self.channel_epoch:
+                            params["epoch"] = self.channel_epoch
+                    return {
+                        "params": params,
                         "method": 1,
                         "id": 2
                     }
-                    ws.send(json.dumps(sub_msg))
                 else:
                     self.log("❌ Subscription token not found in response", "error")
             else:
                 self.log(f"❌ Failed to get sub token: {response.text}", "error")
         except Exception as e:
             self.log(f"Error getting sub token: {e}", "error")
+        return None
 
-    def _handle_notification(self, data):
-        """Process incoming donation data"""
-        self.log(f"💰 DEBUG NOTIFICATION DATA: {json.dumps(data)}", "info")
+    def _track_offset(self, offset):
+        """Remembers the stream position and counts publications we never saw"""
+        if offset is None:
+            return
+        if self.channel_offset is not None and offset > self.channel_offset + 1:
+            missed = offset - self.channel_offset - 1
+            self.metrics["gaps_detected"] += 1
+            self.metrics["messages_lost"] += missed
+            self.log(f"Gap in donation stream: {missed} publication(s) missed", "warning")
+        if self.channel_offset is None or offset > self.channel_offset:
+            self.channel_offset = offset
+
+    def _on_subscribed(self, result):
+        """Handles the subscribe reply: stream position, recovered publications and reconnect metrics"""
+        if result.get("epoch"):
+            self.channel_epoch = result["epoch"]
+
+        publications = result.get("publications") or []
+        if self._subscribing_recover:
+            if result.get("recovered"):
+                self.log(f"♻️ Recovered {len(publications)} publication(s) missed while offline", "info")
+            else:
+                self.metrics["unrecovered_resubscribes"] += 1
+                self.log("Centrifugo could not recover the missed publications", "warning")
+
+        for publication in publications:
+            self._track_offset(publication.get("offset"))
+            self.metrics["recovered_messages"] += 1
+            donation_data = unwrap_donation(publication.get("data"))
+            if donation_data is not None:
+                self._handle_notification(donation_data)
+
+        if result.get("offset") is not None and (self.channel_offset is None or result["offset"] > self.channel_offset):
+            self.channel_offset = result["offset"]
+
+        self.metrics["connects"] += 1
+        if self._disconnected_at is not None:
+            elapsed_ms = round((time.perf_counter() - self._disconnected_at) * 1000, 2)
+            self.metrics["reconnects"] += 1
+            self.metrics["last_reconnect_ms"] = elapsed_ms
+            self.metrics["max_reconnect_ms"] = max(self.metrics["max_reconnect_ms"] or 0, elapsed_ms)
+            self.log(f"Reconnected after {elapsed_ms} ms", "info")
+            self._disconnected_at = None
+        self._reconnect_attempt = 0
+
+    def _handle_notification(self, donation_data, received_at=None, parse_ms=None):
+        """Process a donation already unwrapped by the Centrifugo decoder"""
+        if received_at is None:
+            received_at = time.perf_counter()
         try:
-            # Пытаемся извлечь данные доната, учитывая разную вложенность
-            donation_data = data
-            self.log(f"💰 Initial Donation Data: {json.dumps(donation_data)}", "info")
-
-            # Если данные обернуты в еще один data (бывает в некоторых версиях API)
-            if "data" in data and isinstance(data["data"], dict):
-                donation_data = data["data"]
+            # Payload is serialized only when DEBUG is on (see providers/log_setup.py)
+            self.log("💰 Donation payload: %s", "debug", LazyJson(donation_data), category="da.payload")
             
-            # Проверяем, не является ли это просто информационным сообщением о подключении
-            if "info" in donation_data and "user" in donation_data["info"]:
-                self.log("ℹ️ Received connection info message (ignoring)", "info")
-                self.log(f"💰 Parsed Donation Data: {json.dumps(donation_data)}", "info")
+            # Журнал: дедуп по id и offset для replay; запись на диск идет в отдельном потоке
+            entry = donation_journal.record(self.provider_id, dict(donation_data, account_id=self.account_id))
+            if entry is None:
+                self.log("Duplicate donation %s ignored", "info", donation_data.get('id'))
                 return
 
-            self.log(f"💰 Parsed Donation Data: {json.dumps(donation_data)}", "info")
-            
-            self.log(f"🔔 New Donation: {donation_data.get('username')} - {donation_data.get('amount')} {donation_data.get('currency')}", "info")
-            self._send_to_ui('onNewDonation', donation_data)
+            self.log("🔔 New Donation: %s - %s %s", "info",
+                     donation_data.get('username'), donation_data.get('amount'), donation_data.get('currency'))
+            entry = trace_donation(self.provider_id, entry, received_at, parse_ms)
+            if self.on_donation is not None:
+                self.on_donation(self.account_id, entry)
+            else:
+                self._send_to_ui('onNewDonation', entry)
             
         except Exception as e:
             self.log(f"Error handling notification: {e}", "error")
@@ -353,31 +586,3 @@ class DonationAlertsProvider:
         # Keep existing test logic but use new log method
         self.log("Testing connection...", "info")
         return {"success": True, "message": "Ready to connect"} # Simplified for now
-
-provider_logger = logging.getLogger("DA_PROVIDER")
-da_provider = DonationAlertsProvider(logger=provider_logger)
-
-@eel.expose
-def exchange_da_code(code, client_id, client_secret, redirect_uri=None):
-    return da_provider.exchange_code_for_token(code, client_id, client_secret, redirect_uri)
-
-@eel.expose
-def connect_with_token(access_token, refresh_token, client_id, client_secret):
-    return da_provider.connect_with_token(access_token, refresh_token, client_id, client_secret)
-
-@eel.expose
-def get_da_status():
-    return da_provider.get_status()
-
-@eel.expose
-def start_da_auth(credentials):
-    Thread(target=da_provider.start_auth_thread, args=(credentials,), daemon=True).start()
-
-@eel.expose
-def test_da_connection(credentials):
-    return da_provider.test_connection(
-        credentials.get('client_id'), 
-        credentials.get('client_secret'), 
-        credentials.get('access_token')
-    )
-        
\ No newline at end of file
@@ -0,0 +1,249 @@
+import eel
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from providers.da_provider import DEFAULT_ACCOUNT, DonationAlertsProvider
+from providers.event_bus import send_to_ui
+from providers.runtime import AsyncProvider, runtime
+
+MAX_CONNECTIONS = 4  # Centrifugo sockets open at once, one per distinct DonationAlerts user
+
+
+class DonationAlertsRegistry(AsyncProvider):
+    """
+    All DonationAlerts accounts feeding the queue (co-streams, several channels).
+
+    Each account is a DonationAlertsProvider with its own tokens. Centrifugo connection tokens
+    are issued per DA user, so accounts that resolve to the same user share one socket and
+    subscription; different users get their own socket, at most max_connections of them.
+    Donations of every account are merged into one stream: numbered in arrival order
+    (stream_seq), tagged with account_id and counted per account.
+    """
+    provider_id = 'DA'
+
+    def __init__(self, max_connections=MAX_CONNECTIONS, provider_factory=DonationAlertsProvider):
+        self.logger = logging.getLogger("DA_REGISTRY")
+        self.max_connections = max_connections
+        self.provider_factory = provider_factory
+        self.accounts = OrderedDict()  # account_id -> DonationAlertsProvider
+        self.shared = {}               # account_id -> account_id whose connection it uses
+        self.stats = {}                # account_id -> donation counters
+        self._seq = 0
+        self._lock = Lock()
+
+    # --- accounts ---
+
+    def account(self, account_id=None):
+        """Provider of the account, created on first use"""
+        account_id = account_id or DEFAULT_ACCOUNT
+        with self._lock:
+            provider = self.accounts.get(account_id)
+            if provider is None:
+                provider = self.provider_factory(
+                    logger=logging.getLogger("DA_PROVIDER"), account_id=account_id, on_donation=self._on_donation
+                )
+                self.accounts[account_id] = provider
+                self.stats[account_id] = {"donations": 0, "amounts": {}, "last_donation_at": None}
+            return provider
+
+    def _connection_owner(self, account_id):
+        return self.shared.get(account_id, account_id)
+
+    def _is_running(self, provider):
+        return provider._supervisor is not None and not provider._supervisor.done()
+
+    def _attach(self, account_id, exclude=()):
+        """
+        Called once the account's tokens are valid (user_id known): reuses the connection of an
+        account with the same DA user or starts a new one if the limit allows.
+        exclude: accounts whose connection is about to close - neither shared nor counted
+        """
+        provider = self.accounts[account_id]
+        with self._lock:
+            self.shared.pop(account_id, None)
+            for other_id, other in self.accounts.items():
+                if other_id in exclude:
+                    continue
+                if other_id != account_id and other.user_id == provider.user_id and other_id not in self.shared \
+                        and self._is_running(other):
+                    self.shared[account_id] = other_id
+                    self.logger.info(f"Account '{account_id}' shares the connection of '{other_id}' (user {provider.user_id})")
+                    return {'success': True, 'shared_with': other_id}
+
+            running = sum(1 for other_id, other in self.accounts.items()
+                          if other_id != account_id and other_id not in exclude and self._is_running(other))
+            if not self._is_running(provider) and running >= self.max_connections:
+                self.logger.warning(f"Account '{account_id}' not connected: {running} connections already open")
+                return {'success': False, 'message': f'Too many DonationAlerts connections (max {self.max_connections})'}
+        provider._start_websocket()
+        return {'success': True}
+
+    def connect_with_token(self, account_id, access_token, refresh_token, client_id, client_secret, token_expiry=None):
+        provider = self.account(account_id)
+        result = provider.connect_with_token(access_token, refresh_token, client_id, client_secret, token_expiry,
+                                             start_websocket=False)
+        if not result.get('success'):
+            return result
+        return dict(result, **self._attach(provider.account_id), account_id=provider.account_id)
+
+    def exchange_code(self, account_id, code, client_id, client_secret, redirect_uri=None):
+        provider = self.account(account_id)
+        result = provider.exchange_code_for_token(code, client_id, client_secret, redirect_uri, start_websocket=False)
+        if not result.get('success'):
+            return result
+        return dict(result, **self._attach(provider.account_id), account_id=provider.account_id)
+
+    async def connect(self, config):
+        """AsyncProvider entry point used by connect_provider; config may carry account_id"""
+        return await runtime.run_blocking(
+            self.connect_with_token,
+            config.get('account_id'),
+            config.get('token'),
+            config.get('refresh_token'),
+            config.get('client_id'),
+            config.get('client_secret'),
+            config.get('token_expiry')
+        )
+
+    async def disconnect(self, account_id=None):
+        """
+        Disconnects one account or all of them. Accounts riding on the disconnected account's
+        connection are handed over first: the first one opens its own connection, the rest share it.
+        """
+        with self._lock:
+            if account_id is None:
+                targets, riders = list(self.accounts), []
+            else:
+                targets = [account_id]
+                riders = [other for other, owner in self.shared.items() if owner == account_id]
+            for target in targets:
+                self.shared.pop(target, None)
+            providers = [self.accounts[target] for target in targets if target in self.accounts]
+
+        # New connection before the old one closes: no gap, and the journal drops the donations both deliver
+        handed_over = {}
+        for rider in riders:
+            handed_over[rider] = self._attach(rider, exclude={account_id})
+            if not handed_over[rider].get('success'):
+                self.logger.warning(f"Account '{rider}' lost its connection with '{account_id}': {handed_over[rider].get('message')}")
+                send_to_ui('onDAConnectionStatus', {'status': 'disconnected', 'account_id': rider})
+
+        for provider in providers:
+            await provider.disconnect()
+        return {'success': True, 'accounts': targets, 'handed_over': handed_over}
+
+    async def remove_account(self, account_id):
+        await self.disconnect(account_id)
+        with self._lock:
+            self.accounts.pop(account_id, None)
+            self.stats.pop(account_id, None)
+        return {'success': True}
+
+    # --- merged donation stream ---
+
+    def _on_donation(self, account_id, entry):
+        """Runs on the runtime loop for every account, so the stream order is the arrival order"""
+        with self._lock:
+            self._seq += 1
+            stats = self.stats.get(account_id)
+            if stats is not None:
+                stats["donations"] += 1
+                currency = entry.get("currency") or "?"
+                try:
+                    stats["amounts"][currency] = stats["amounts"].get(currency, 0) + float(entry.get("amount") or 0)
+                except (TypeError, ValueError):
+                    pass
+                stats["last_donation_at"] = time.time()
+            entry = dict(entry, account_id=account_id, stream_seq=self._seq)
+        send_to_ui('onNewDonation', entry)
+
+    # --- status ---
+
+    def get_status(self):
+        """Connected if any account is; per-account statuses under 'accounts'"""
+        with self._lock:
+            accounts = {
+                account_id: self.accounts[self._connection_owner(account_id)].get_status()['status']
+                if self._connection_owner(account_id) in self.accounts else 'disconnected'
+                for account_id in self.accounts
+            }
+        statuses = set(accounts.values())
+        status = next((s for s in ('connected', 'connecting') if s in statuses), 'disconnected')
+        return {'status': status, 'accounts': accounts}
+
+    def get_metrics(self, account_id=None):
+        """Metrics of one account's connection, or every account with its donation counters"""
+        if account_id is not None:
+            with self._lock:
+                provider = self.accounts.get(self._connection_owner(account_id))
+            return provider.get_metrics() if provider else {}
+
+        with self._lock:
+            accounts = list(self.accounts.items())
+            shared = dict(self.shared)
+            stats = {account_id: dict(s, amounts=dict(s["amounts"])) for account_id, s in self.stats.items()}
+            stream_seq = self._seq
+        result = {}
+        for account_id, provider in accounts:
+            owner = shared.get(account_id)
+            connection = self.accounts.get(owner, provider) if owner else provider
+            result[account_id] = dict(
+                stats.get(account_id, {}),
+                user_id=provider.user_id,
+                user_name=provider.user_name,
+                shared_with=owner,
+                connection=connection.get_metrics(),
+            )
+        return {
+            'accounts': result,
+            'stream_seq': stream_seq,
+            'connections': sum(1 for _, provider in accounts if self._is_running(provider)),
+            'max_connections': self.max_connections,
+        }
+
+
+da_registry = DonationAlertsRegistry()
+
+
+@eel.expose
+def exchange_da_code(code, client_id, client_secret, redirect_uri=None, account_id=None):
+    return runtime.call_blocking(da_registry.exchange_code, account_id, code, client_id, client_secret, redirect_uri)
+
+@eel.expose
+def connect_with_token(access_token, refresh_token, client_id, client_secret, token_expiry=None, account_id=None):
+    return runtime.call_blocking(da_registry.connect_with_token, account_id, access_token, refresh_token,
+                                 client_id, client_secret, token_expiry)
+
+@eel.expose
+def disconnect_da(account_id=None):
+    return runtime.call(da_registry.disconnect(account_id))
+
+@eel.expose
+def remove_da_account(account_id):
+    return runtime.call(da_registry.remove_account(account_id))
+
+@eel.expose
+def get_da_metrics(account_id=DEFAULT_ACCOUNT):
+    return da_registry.get_metrics(account_id)
+
+@eel.expose
+def get_da_accounts():
+    return da_registry.get_metrics()
+
+@eel.expose
+def get_da_status():
+    return da_registry.get_status()
+
+@eel.expose
+def start_da_auth(credentials):
+    da_registry.account(credentials.get('account_id')).start_auth_thread(credentials)
+
+@eel.expose
+def test_da_connection(credentials):
+    return da_registry.account(credentials.get('account_id')).test_connection(
+        credentials.get('client_id'),
+        credentials.get('client_secret'),
+        credentials.get('access_token')
+    )
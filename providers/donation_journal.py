@@ -0,0 +1,301 @@
+import atexit
+import eel
+import json
+import logging
+import queue
+import sqlite3
+import time
+import uuid
+from collections import OrderedDict
+from threading import Event, Lock, Thread
+
+from providers.event_bus import send_to_ui
+from providers.runtime import runtime
+from providers.storage import get_data_path
+
+logger = logging.getLogger("DONATION_JOURNAL")
+
+DEFAULT_CONSUMER = "ui"
+FLUSH_INTERVAL = 0.05          # group commit window: one fsync per batch, not per donation
+MAX_BATCH = 256
+RECENT_IDS_LIMIT = 10000       # dedup window kept in RAM (the UNIQUE index is the durable backstop)
+RETENTION = 7 * 24 * 3600      # acknowledged donations are pruned after a week
+
+
+class DonationJournal:
+    """
+    Append-only journal of incoming donations (SQLite WAL, synchronous=FULL).
+    record() runs on the receive path and only does an in-memory dedup check and an offset
+    assignment; the actual INSERT happens on a writer thread that commits in small batches.
+    Each consumer has an acknowledged offset; everything above it is replayed on reconnect/restart.
+    """
+
+    def __init__(self, db_path=None, flush_interval=FLUSH_INTERVAL, retention=RETENTION):
+        self.logger = logger
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.retention = retention
+
+        self._lock = Lock()      # in-memory state, taken on the receive path
+        self._db_lock = Lock()   # SQLite connection; never held together with _lock during a commit
+        self._queue = queue.Queue()
+        self._writer = None
+        self._db = None
+        self._next_offset = 1
+        self._recent_ids = OrderedDict()
+        self._acked = {}         # consumer -> contiguous acknowledged offset
+        self._acked_ahead = {}   # consumer -> offsets acknowledged out of order
+        self._last_prune = 0.0
+
+        self.stats = {
+            "recorded": 0,
+            "duplicates": 0,
+            "written": 0,
+            "batches": 0,
+            "acks": 0,
+            "replayed": 0,
+            "write_errors": 0,
+        }
+
+    # --- lifecycle ---
+
+    def _open_db(self):
+        path = self.db_path or get_data_path("journal", "donations.sqlite3")
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=FULL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS donations ("
+            " offset INTEGER PRIMARY KEY,"
+            " key TEXT NOT NULL UNIQUE,"
+            " source TEXT NOT NULL,"
+            " received_at REAL NOT NULL,"
+            " payload TEXT NOT NULL)"
+        )
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS consumers ("
+            " name TEXT PRIMARY KEY,"
+            " acked_offset INTEGER NOT NULL)"
+        )
+        db.commit()
+        return db
+
+    def start(self):
+        """Opens the journal and starts the writer; called once at startup (lazily otherwise)"""
+        with self._lock:
+            if self._writer is not None:
+                return
+            self._db = self._open_db()
+            # Pruning may have deleted every row up to the acked offsets: continue above those too,
+            # otherwise new donations would get offsets consumers already count as delivered
+            row = self._db.execute(
+                "SELECT MAX((SELECT COALESCE(MAX(offset), 0) FROM donations),"
+                " (SELECT COALESCE(MAX(acked_offset), 0) FROM consumers))"
+            ).fetchone()
+            self._next_offset = (row[0] or 0) + 1
+            for key, in self._db.execute(
+                "SELECT key FROM donations ORDER BY offset DESC LIMIT ?", (RECENT_IDS_LIMIT,)
+            ).fetchall()[::-1]:
+                self._recent_ids[key] = None
+            for name, acked in self._db.execute("SELECT name, acked_offset FROM consumers"):
+                self._acked[name] = acked
+
+            self._writer = Thread(target=self._writer_loop, name="donation-journal", daemon=True)
+            self._writer.start()
+            self.logger.info(f"Journal opened, next offset {self._next_offset}")
+
+    def close(self):
+        if self._writer is None:
+            return
+        self._queue.put(None)
+        self._writer.join(timeout=5)
+        self._writer = None
+
+    # --- receive path ---
+
+    def record(self, source, donation):
+        """
+        Registers a donation. Returns the donation with its journal offset attached,
+        or None if this donation id was already seen (provider redelivery, recovered history).
+        """
+        if self._writer is None:
+            self.start()
+
+        donation_id = donation.get("id")
+        key = f"{source}:{donation_id}" if donation_id not in (None, "") else f"{source}:anon:{uuid.uuid4().hex}"
+
+        with self._lock:
+            if key in self._recent_ids:
+                self.stats["duplicates"] += 1
+                return None
+            self._recent_ids[key] = None
+            if len(self._recent_ids) > RECENT_IDS_LIMIT:
+                self._recent_ids.popitem(last=False)
+            offset = self._next_offset
+            self._next_offset += 1
+            self.stats["recorded"] += 1
+
+        entry = dict(donation, journal_offset=offset, source=source)
+        self._queue.put(("append", (offset, key, source, time.time(), entry)))
+        return entry
+
+    # --- consumers ---
+
+    def ack(self, consumer, offsets):
+        """Marks offsets as handled by a consumer. Out-of-order acks are held until the gap closes."""
+        if isinstance(offsets, int):
+            offsets = [offsets]
+        with self._lock:
+            acked = self._acked.get(consumer, 0)
+            ahead = self._acked_ahead.setdefault(consumer, set())
+            ahead.update(o for o in offsets if o > acked)
+            while acked + 1 in ahead:
+                acked += 1
+                ahead.discard(acked)
+            changed = acked != self._acked.get(consumer, 0)
+            self._acked[consumer] = acked
+            self.stats["acks"] += len(offsets)
+        if changed:
+            self._queue.put(("ack", (consumer, acked)))
+        return acked
+
+    def flush(self, timeout=5):
+        """Blocks until everything queued so far is committed"""
+        if self._writer is None:
+            return
+        done = Event()
+        self._queue.put(("flush", done))
+        done.wait(timeout)
+
+    def pending(self, consumer=DEFAULT_CONSUMER, limit=500):
+        """Donations not yet acknowledged by the consumer, oldest first"""
+        self.flush()
+        with self._lock:
+            acked = self._acked.get(consumer, 0)
+            ahead = set(self._acked_ahead.get(consumer, ()))
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT offset, payload FROM donations WHERE offset > ? ORDER BY offset LIMIT ?",
+                (acked, limit)
+            ).fetchall()
+        return [json.loads(payload) for offset, payload in rows if offset not in ahead]
+
+    def replay(self, consumer=DEFAULT_CONSUMER):
+        """Re-sends unacknowledged donations to the UI"""
+        entries = self.pending(consumer)
+        for entry in entries:
+            send_to_ui('onNewDonation', dict(entry, replayed=True))
+        with self._lock:
+            self.stats["replayed"] += len(entries)
+        if entries:
+            self.logger.info(f"Replaying {len(entries)} unacknowledged donation(s) to '{consumer}'")
+        return len(entries)
+
+    # --- writer thread ---
+
+    def _writer_loop(self):
+        running = True
+        while running:
+            item = self._queue.get()
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            # Собираем пачку, чтобы был один fsync на несколько донатов
+            while len(batch) < MAX_BATCH and batch[-1] is not None and batch[-1][0] != "flush":
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            running = self._write_batch(batch)
+            self._maybe_prune()
+
+    def _write_batch(self, batch):
+        rows, acks, waiters, running = [], {}, [], True
+        for item in batch:
+            if item is None:
+                running = False
+                continue
+            kind, value = item
+            if kind == "append":
+                offset, key, source, received_at, entry = value
+                rows.append((offset, key, source, received_at, json.dumps(entry, ensure_ascii=False)))
+            elif kind == "ack":
+                acks[value[0]] = value[1]
+            elif kind == "flush":
+                waiters.append(value)
+
+        try:
+            with self._db_lock:
+                if rows:
+                    self._db.executemany(
+                        "INSERT OR IGNORE INTO donations (offset, key, source, received_at, payload)"
+                        " VALUES (?, ?, ?, ?, ?)", rows
+                    )
+                for name, acked in acks.items():
+                    self._db.execute(
+                        "INSERT INTO consumers (name, acked_offset) VALUES (?, ?)"
+                        " ON CONFLICT(name) DO UPDATE SET acked_offset = MAX(acked_offset, excluded.acked_offset)",
+                        (name, acked)
+                    )
+                self._db.commit()
+            if rows:
+                with self._lock:
+                    self.stats["written"] += len(rows)
+                    self.stats["batches"] += 1
+        except sqlite3.Error as e:
+            with self._lock:
+                self.stats["write_errors"] += 1
+            self.logger.error(f"Journal write failed ({len(rows)} donation(s)): {e}")
+
+        for waiter in waiters:
+            waiter.set()
+        return running
+
+    def _maybe_prune(self):
+        now = time.time()
+        if now - self._last_prune < 3600:
+            return
+        self._last_prune = now
+        with self._lock:
+            if not self._acked:
+                return
+            # Only delete what every known consumer has acknowledged
+            floor = min(self._acked.values())
+        with self._db_lock:
+            try:
+                self._db.execute(
+                    "DELETE FROM donations WHERE offset <= ? AND received_at < ?",
+                    (floor, now - self.retention)
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                self.logger.warning(f"Journal prune failed: {e}")
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["next_offset"] = self._next_offset
+            stats["queued_writes"] = self._queue.qsize()
+            stats["consumers"] = dict(self._acked)
+            return stats
+
+
+donation_journal = DonationJournal()
+atexit.register(donation_journal.close)
+
+
+@eel.expose
+def replay_donations(consumer=DEFAULT_CONSUMER):
+    count = runtime.call_blocking(donation_journal.replay, consumer)
+    return {"success": True, "replayed": count}
+
+@eel.expose
+def ack_donations(offsets, consumer=DEFAULT_CONSUMER):
+    acked = donation_journal.ack(consumer, offsets)
+    return {"success": True, "acked_offset": acked}
+
+@eel.expose
+def get_journal_stats():
+    return donation_journal.get_stats()
@@ -0,0 +1,253 @@
+import asyncio
+import eel
+import json
+import logging
+import random
+import time
+from datetime import datetime
+from urllib.parse import urlencode
+
+from providers.async_ws import AsyncWebSocket, WebSocketClosed
+from providers.donation_journal import donation_journal
+from providers.event_bus import send_to_ui
+from providers.http_client import http_client
+from providers.metrics import trace_donation
+from providers.runtime import AsyncProvider, runtime
+
+DX_HUB_URL = "https://donatex.gg/api/public-donations-hub"
+
+RECORD_SEPARATOR = "\x1e"
+PING_INTERVAL = 15  # SignalR default keep-alive
+RECONNECT_BASE_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+
+# SignalR hub message types
+MSG_INVOCATION = 1
+MSG_PING = 6
+MSG_CLOSE = 7
+
+
+class DonateXProvider(AsyncProvider):
+    """
+    Python port of the DonateX SignalR client (JSON hub protocol over WebSocket).
+    Runs on the shared provider runtime instead of inside the browser.
+    """
+    provider_id = 'DX'
+
+    def __init__(self, logger, hub_url=DX_HUB_URL, http=http_client):
+        self.logger = logger
+        self.hub_url = hub_url
+        self.http = http
+        self.token = None
+        self.ws = None
+        self.is_connected = False
+        self._supervisor = None
+        self._stop_event = None
+        self._reconnect_attempt = 0
+
+    def log(self, message, level="info", *args, category=None):
+        """message may contain %-placeholders for args; they are only rendered if the record is emitted"""
+        prefix = "[PYTHON] [DX_PROVIDER]"
+        extra = {"category": category} if category else None
+        if level == "error":
+            self.logger.error(f"{prefix} ❌ {message}", *args, extra=extra)
+        elif level == "warning":
+            self.logger.warning(f"{prefix} ⚠️ {message}", *args, extra=extra)
+        elif level == "debug":
+            self.logger.debug(f"{prefix} {message}", *args, extra=extra)
+        else:
+            self.logger.info(f"{prefix} {message}", *args, extra=extra)
+
+    def _send_to_ui(self, function_name, data):
+        """Queues a UI callback on the outbound event bus"""
+        send_to_ui(function_name, data)
+
+    async def connect(self, config):
+        token = config.get('token')
+        if not token:
+            return {"success": False, "message": "Missing DonateX token"}
+
+        if self._supervisor and not self._supervisor.done():
+            if token == self.token:
+                return {"success": True, "message": "Already connected"}
+            await self.disconnect()
+
+        self.token = token
+        self._supervisor = asyncio.ensure_future(self._connection_loop())
+        return {"success": True, "message": "Connecting"}
+
+    async def disconnect(self):
+        if self._stop_event:
+            self._stop_event.set()
+        if self.ws:
+            await self.ws.close()
+        if self._supervisor:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._supervisor), 5)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                self._supervisor.cancel()
+        self.is_connected = False
+        self._send_to_ui('onDXConnectionStatus', {'status': 'disconnected'})
+        return {"success": True}
+
+    def get_status(self):
+        status = 'connected' if self.is_connected else 'disconnected'
+        if self._supervisor and not self._supervisor.done() and not self.is_connected:
+            status = 'connecting'
+        return {'status': status}
+
+    def _negotiate(self):
+        """POST {hub}/negotiate - returns the WebSocket URL to connect to"""
+        query = urlencode({"access_token": self.token, "negotiateVersion": 1})
+        response = self.http.post(f"{self.hub_url}/negotiate?{query}", endpoint="dx.negotiate")
+        if response.status_code != 200:
+            raise ConnectionError(f"Negotiate failed: HTTP {response.status_code}: {response.text[:200]}")
+
+        data = response.json()
+        if data.get("error"):
+            raise ConnectionError(f"Negotiate failed: {data['error']}")
+
+        # Azure SignalR style redirect
+        hub_url, token = self.hub_url, self.token
+        if data.get("url"):
+            hub_url, token = data["url"], data.get("accessToken", token)
+
+        params = {"access_token": token}
+        connection_token = data.get("connectionToken") or data.get("connectionId")
+        if connection_token:
+            params["id"] = connection_token
+        ws_base = hub_url.replace("https://", "wss://", 1).replace("http://", "ws://", 1)
+        separator = "&" if "?" in ws_base else "?"
+        return f"{ws_base}{separator}{urlencode(params)}"
+
+    async def _connection_loop(self):
+        self._stop_event = asyncio.Event()
+        self._reconnect_attempt = 0
+        while not self._stop_event.is_set():
+            await self._run_connection()
+            self.is_connected = False
+            if self._stop_event.is_set():
+                break
+
+            ceiling = min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * (2 ** self._reconnect_attempt))
+            self._reconnect_attempt += 1
+            delay = random.uniform(RECONNECT_BASE_DELAY / 2, ceiling)
+            self.log(f"Reconnecting in {delay:.1f}s (attempt {self._reconnect_attempt})...", "warning")
+            self._send_to_ui('onDXConnectionStatus', {'status': 'connecting'})
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_connection(self):
+        self._send_to_ui('onDXConnectionStatus', {'status': 'connecting'})
+        try:
+            ws_url = await runtime.run_blocking(self._negotiate)
+            self.ws = await AsyncWebSocket.connect(ws_url, ping_interval=None)
+            await self.ws.send(json.dumps({"protocol": "json", "version": 1}) + RECORD_SEPARATOR)
+        except Exception as e:
+            self.log(f"Connection failed: {e}", "error")
+            self._send_to_ui('onDXConnectionStatus', {'status': 'disconnected'})
+            return
+
+        pinger = asyncio.ensure_future(self._ping_loop(self.ws))
+        handshake_done = False
+        try:
+            async for frame in self.ws:
+                if isinstance(frame, bytes):
+                    frame = frame.decode("utf-8")
+                for record in frame.split(RECORD_SEPARATOR):
+                    if not record:
+                        continue
+                    message = json.loads(record)
+
+                    if not handshake_done:
+                        if message.get("error"):
+                            self.log(f"Handshake rejected: {message['error']}", "error")
+                            return
+                        handshake_done = True
+                        self.is_connected = True
+                        self._reconnect_attempt = 0
+                        self.log("✅ Connected to DonateX hub", "info")
+                        self._send_to_ui('onDXConnectionStatus', {'status': 'connected'})
+                        continue
+
+                    self._handle_message(message)
+        except WebSocketClosed:
+            pass
+        except Exception as e:
+            self.log(f"Connection error: {e}", "error")
+        finally:
+            pinger.cancel()
+            await self.ws.close()
+            self.is_connected = False
+            self._send_to_ui('onDXConnectionStatus', {'status': 'disconnected'})
+
+    async def _ping_loop(self, ws):
+        ping = json.dumps({"type": MSG_PING}) + RECORD_SEPARATOR
+        try:
+            while not ws.closed:
+                await asyncio.sleep(PING_INTERVAL)
+                await ws.send(ping)
+        except (asyncio.CancelledError, WebSocketClosed):
+            pass
+
+    def _handle_message(self, message):
+        msg_type = message.get("type")
+        if msg_type == MSG_PING:
+            return
+        if msg_type == MSG_CLOSE:
+            self.log(f"Server closed the hub connection: {message.get('error')}", "warning")
+            if message.get("allowReconnect") is False and self._stop_event:
+                self._stop_event.set()
+            return
+        if msg_type == MSG_INVOCATION and message.get("target") == "DonationCreated":
+            for donation in message.get("arguments") or []:
+                self._handle_donation(donation)
+
+    def _handle_donation(self, data):
+        """Same normalization the React client used to do in handleIncomingDXDonation"""
+        received_at = time.perf_counter()
+        created_at = data.get("createdAt")
+        try:
+            timestamp = int(datetime.fromisoformat(created_at.replace("Z", "+00:00")).timestamp() * 1000)
+        except (AttributeError, ValueError):
+            timestamp = int(time.time() * 1000)
+
+        try:
+            amount = float(data.get("amount"))
+        except (TypeError, ValueError):
+            amount = 0.0
+
+        donation = {
+            "id": data.get("id") or str(int(time.time() * 1000)),
+            "username": data.get("nickname") or data.get("username") or "Anonymous",
+            "amount": amount,
+            "currency": data.get("currency") or "RUB",
+            "message": data.get("message") or "",
+            "timestamp": timestamp,
+            "is_test": bool(data.get("isTest", False)),
+        }
+        entry = donation_journal.record(self.provider_id, donation)
+        if entry is None:
+            self.log("Duplicate donation %s ignored", "info", donation['id'])
+            return
+
+        self.log("🔔 New Donation: %s - %s %s", "info", donation['username'], donation['amount'], donation['currency'])
+        self._send_to_ui('onNewDonation', trace_donation(self.provider_id, entry, received_at))
+
+
+provider_logger = logging.getLogger("DX_PROVIDER")
+dx_provider = DonateXProvider(logger=provider_logger)
+
+@eel.expose
+def connect_dx(access_token):
+    return runtime.call(dx_provider.connect({'token': access_token}))
+
+@eel.expose
+def disconnect_dx():
+    return runtime.call(dx_provider.disconnect())
+
+@eel.expose
+def get_dx_status():
+    return dx_provider.get_status()
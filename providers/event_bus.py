@@ -0,0 +1,219 @@
+import eel
+import logging
+import time
+from collections import deque
+from threading import Lock
+
+from providers.runtime import runtime
+
+logger = logging.getLogger("EVENT_BUS")
+
+# Events where only the latest value matters - repeated ones inside a window are merged
+# (per account: statuses of different DonationAlerts accounts are kept apart)
+COALESCED_EVENTS = {
+    'onDAConnectionStatus',
+    'onDXConnectionStatus',
+}
+
+
+def _coalesce_key(event_type, data):
+    account_id = data.get('account_id') if isinstance(data, dict) else None
+    return event_type, account_id
+
+
+class EventBus:
+    """
+    Outbound UI event bus.
+    Events are collected for a short window and delivered as one onEvents(batch) call.
+    Every event carries a sequence number so the UI can detect drops. Delivery is
+    acknowledged by the JS return value; while too many batches are unacknowledged or no
+    browser is connected, events stay buffered (bounded) instead of being pushed.
+    """
+
+    def __init__(self, window_ms=25, max_pending=5000, max_batch=500, max_in_flight=4, ack_timeout=5.0):
+        self.logger = logger
+        self.window_ms = window_ms
+        self.max_pending = max_pending
+        self.max_batch = max_batch
+        self.max_in_flight = max_in_flight
+        self.ack_timeout = ack_timeout
+
+        self._lock = Lock()
+        self._pending = deque()       # [seq, type, data]
+        self._coalesce_index = {}     # (type, account_id) -> pending entry, for COALESCED_EVENTS
+        self._in_flight = {}          # last seq of batch -> sent_at
+        self._seq = 0
+        self._flush_scheduled = False
+
+        self.stats = {
+            "published": 0,
+            "delivered": 0,
+            "batches": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "acks": 0,
+            "ack_timeouts": 0,
+            "held_no_browser": 0,
+            "held_backpressure": 0,
+            "max_batch_size": 0,
+            "send_errors": 0,
+        }
+
+    def configure(self, window_ms=None, max_pending=None, max_in_flight=None, ack_timeout=None):
+        with self._lock:
+            if window_ms is not None:
+                self.window_ms = max(1, int(window_ms))
+            if max_pending is not None:
+                self.max_pending = int(max_pending)
+            if max_in_flight is not None:
+                self.max_in_flight = max(1, int(max_in_flight))
+            if ack_timeout is not None:
+                self.ack_timeout = float(ack_timeout)
+
+    def publish(self, event_type, data):
+        with self._lock:
+            self.stats["published"] += 1
+
+            if event_type in COALESCED_EVENTS:
+                key = _coalesce_key(event_type, data)
+                entry = self._coalesce_index.get(key)
+                if entry is not None:
+                    # Keep the queue position and seq of the first one, but the latest payload
+                    entry[2] = data
+                    self.stats["coalesced"] += 1
+                    return
+
+            self._seq += 1
+            entry = [self._seq, event_type, data]
+            self._pending.append(entry)
+            if event_type in COALESCED_EVENTS:
+                self._coalesce_index[key] = entry
+
+            if len(self._pending) > self.max_pending:
+                self._drop_one_locked()
+
+            self._schedule_flush_locked()
+
+    def _drop_one_locked(self):
+        """Buffer is full: sacrifice a status event first, otherwise the oldest event"""
+        victim = None
+        for entry in self._pending:
+            if entry[1] in COALESCED_EVENTS:
+                victim = entry
+                break
+        if victim is None:
+            victim = self._pending[0]
+        self._pending.remove(victim)
+        self._unindex_locked(victim)
+        self.stats["dropped"] += 1
+        if self.stats["dropped"] == 1 or self.stats["dropped"] % 100 == 0:
+            self.logger.warning(f"UI event buffer full, dropped {victim[1]} #{victim[0]} ({self.stats['dropped']} total)")
+
+    def _unindex_locked(self, entry):
+        if entry[1] in COALESCED_EVENTS:
+            key = _coalesce_key(entry[1], entry[2])
+            if self._coalesce_index.get(key) is entry:
+                del self._coalesce_index[key]
+
+    def _schedule_flush_locked(self, delay_ms=None):
+        if self._flush_scheduled:
+            return
+        self._flush_scheduled = True
+        loop = runtime.start()
+        delay = (self.window_ms if delay_ms is None else delay_ms) / 1000
+        loop.call_soon_threadsafe(loop.call_later, delay, self._flush)
+
+    @staticmethod
+    def _browser_connected():
+        sockets = getattr(eel, '_websockets', None)
+        # Unknown eel internals: assume connected and let the call fail loudly
+        return True if sockets is None else len(sockets) > 0
+
+    def _flush(self):
+        with self._lock:
+            self._flush_scheduled = False
+            if not self._pending:
+                return
+
+            now = time.monotonic()
+            for last_seq, sent_at in list(self._in_flight.items()):
+                if now - sent_at > self.ack_timeout:
+                    # Browser reloaded or the call was lost; the UI will notice the seq gap
+                    del self._in_flight[last_seq]
+                    self.stats["ack_timeouts"] += 1
+
+            if not self._browser_connected():
+                self.stats["held_no_browser"] += 1
+                self._schedule_flush_locked(delay_ms=250)
+                return
+            if len(self._in_flight) >= self.max_in_flight:
+                self.stats["held_backpressure"] += 1
+                self._schedule_flush_locked()
+                return
+
+            batch = []
+            while self._pending and len(batch) < self.max_batch:
+                entry = self._pending.popleft()
+                self._unindex_locked(entry)
+                batch.append({"seq": entry[0], "type": entry[1], "data": entry[2]})
+
+            last_seq = batch[-1]["seq"]
+            self._in_flight[last_seq] = now
+            self.stats["batches"] += 1
+            self.stats["delivered"] += len(batch)
+            self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(batch))
+
+            if self._pending:
+                self._schedule_flush_locked(delay_ms=0)
+
+        self._send(batch, last_seq)
+
+    def _send(self, batch, last_seq):
+        func = getattr(eel, 'onEvents', None)
+        if func is None:
+            self.logger.warning("UI function 'onEvents' NOT found in eel module. Is the browser connected?")
+            self._ack(last_seq)
+            return
+        try:
+            func({"events": batch})(lambda ack: self._ack(last_seq))
+        except Exception as e:
+            self.stats["send_errors"] += 1
+            self.logger.warning(f"Error calling onEvents: {e}")
+            self._ack(last_seq)
+
+    def _ack(self, last_seq):
+        with self._lock:
+            if self._in_flight.pop(last_seq, None) is not None:
+                self.stats["acks"] += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["pending"] = len(self._pending)
+            stats["in_flight"] = len(self._in_flight)
+            stats["last_seq"] = self._seq
+            stats["window_ms"] = self.window_ms
+            return stats
+
+
+event_bus = EventBus()
+
+
+def send_to_ui(function_name, data):
+    """Queues a UI callback on the event bus (replaces direct eel.<function_name>(data) calls)"""
+    event_bus.publish(function_name, data)
+
+
+@eel.expose
+def get_event_bus_stats():
+    return event_bus.get_stats()
+
+@eel.expose
+def configure_event_bus(config):
+    event_bus.configure(
+        window_ms=config.get('window_ms'),
+        max_pending=config.get('max_pending'),
+        max_in_flight=config.get('max_in_flight'),
+        ack_timeout=config.get('ack_timeout')
+    )
+    return {"success": True, "stats": event_bus.get_stats()}
@@ -0,0 +1,224 @@
+import eel
+import email.utils
+import logging
+import random
+import time
+from bisect import bisect_left
+from threading import Lock
+from urllib.parse import urlsplit
+
+# requests (~100 ms to import) is loaded with the first request, not at startup
+requests = None
+
+logger = logging.getLogger("HTTP_CLIENT")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# (connect, read) timeouts per logical endpoint
+ENDPOINT_TIMEOUTS = {
+    "da.oauth_token": (5, 15),
+    "da.user_oauth": (5, 10),
+    "da.centrifuge_subscribe": (5, 10),
+    "yt.videos": (5, 10),
+    "yt.playlist_items": (5, 10),
+    "yt.thumbnail": (5, 10),
+    "dx.negotiate": (5, 10),
+}
+DEFAULT_TIMEOUT = (5, 15)
+
+# Connection pool size per host; everything else gets DEFAULT_POOL_SIZE
+HOST_POOL_SIZES = {
+    "www.donationalerts.com": 4,
+    "www.googleapis.com": 16,
+    "i.ytimg.com": 4,
+    "donatex.gg": 2,
+}
+DEFAULT_POOL_SIZE = 4
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram (Prometheus-style cumulative buckets are derived on export)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms):
+        self.counts[bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.sum += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile"""
+        if not self.count:
+            return None
+        target = q * self.count
+        running = 0
+        for i, c in enumerate(self.counts):
+            running += c
+            if running >= target:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum, 2),
+            "avg_ms": round(self.sum / self.count, 2) if self.count else None,
+            "max_ms": round(self.max, 2),
+            "p50_ms": self.quantile(0.5),
+            "p99_ms": self.quantile(0.99),
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+def parse_retry_after(value):
+    """Retry-After is either delta-seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpClient:
+    """
+    Shared HTTP client for all providers.
+    Keeps one keep-alive Session with a connection pool per host, retries 429/5xx with
+    exponential backoff + full jitter (honouring Retry-After) and records per-endpoint latency.
+    """
+
+    def __init__(self, max_retries=3, backoff_base=0.5, backoff_max=10.0):
+        self.logger = logger
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._session = None
+        self._session_lock = Lock()
+        self._host_pools = {(host, "https"): size for host, size in HOST_POOL_SIZES.items()}
+
+        self._lock = Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    @property
+    def session(self):
+        """The keep-alive Session, built (and requests imported) on first use"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    global requests
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=DEFAULT_POOL_SIZE))
+                    session.mount("http://", HTTPAdapter(pool_connections=8, pool_maxsize=DEFAULT_POOL_SIZE))
+                    for (host, scheme), size in self._host_pools.items():
+                        session.mount(f"{scheme}://{host}", HTTPAdapter(pool_connections=1, pool_maxsize=size))
+                    self._session = session
+        return self._session
+
+    def mount_host(self, host, pool_size, scheme="https"):
+        with self._session_lock:
+            self._host_pools[(host, scheme)] = pool_size
+            if self._session is not None:
+                from requests.adapters import HTTPAdapter
+                self._session.mount(f"{scheme}://{host}", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # Full jitter: uniform(0, base * 2^attempt)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _record(self, endpoint, elapsed_ms, outcome):
+        with self._lock:
+            hist = self.histograms.get(endpoint)
+            if hist is None:
+                hist = self.histograms[endpoint] = LatencyHistogram()
+            hist.observe(elapsed_ms)
+            key = (endpoint, outcome)
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def request(self, method, url, endpoint=None, timeout=None, idempotent=None, max_retries=None, **kwargs):
+        """
+        Performs a request with retries. Non-idempotent requests (POST by default) are only
+        retried on 429 and on connection errors, where the server has not processed them.
+        Returns the final Response; raises the last exception if every attempt failed to connect.
+        """
+        endpoint = endpoint or urlsplit(url).path
+        timeout = timeout or ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT)
+        if idempotent is None:
+            idempotent = method.upper() in ("GET", "HEAD", "PUT", "DELETE", "OPTIONS")
+        retries = self.max_retries if max_retries is None else max_retries
+
+        attempt = 0
+        while True:
+            session = self.session
+            started = time.perf_counter()
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self._record(endpoint, elapsed_ms, "error")
+                retryable = idempotent or isinstance(e, requests.ConnectTimeout)
+                if attempt >= retries or not retryable:
+                    raise
+                delay = self._backoff(attempt)
+                self.logger.warning(f"{endpoint}: {type(e).__name__}, retry {attempt + 1}/{retries} in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._record(endpoint, elapsed_ms, str(response.status_code))
+
+            status = response.status_code
+            retryable = status == 429 or (idempotent and status in RETRY_STATUSES)
+            if not retryable or attempt >= retries:
+                return response
+
+            delay = self._backoff(attempt, parse_retry_after(response.headers.get("Retry-After")))
+            self.logger.warning(f"{endpoint}: HTTP {status}, retry {attempt + 1}/{retries} in {delay:.2f}s")
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get_stats(self):
+        with self._lock:
+            stats = {endpoint: hist.to_dict() for endpoint, hist in self.histograms.items()}
+            for (endpoint, outcome), count in self.counters.items():
+                stats[endpoint].setdefault("outcomes", {})[outcome] = count
+            return stats
+
+    def reset_stats(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+http_client = HttpClient()
+
+
+@eel.expose
+def get_http_stats():
+    return http_client.get_stats()
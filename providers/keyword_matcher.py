@@ -0,0 +1,133 @@
+import eel
+import logging
+import unicodedata
+from collections import deque
+from threading import Lock
+
+logger = logging.getLogger("KEYWORD_MATCHER")
+
+
+def normalize_text(text):
+    """NFKC + casefold, done once per text instead of once per keyword"""
+    return unicodedata.normalize("NFKC", text or "").casefold()
+
+
+class AhoCorasick:
+    """
+    Classic Aho-Corasick automaton over normalized keywords.
+    Scans a text in a single pass regardless of the number of keywords.
+    """
+
+    def __init__(self, keywords):
+        # Node 0 is the root. Each node: transitions dict, fail link, output (indices into self.terms)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.terms = []   # original keyword as the user typed it
+        self.lengths = []  # length of the normalized pattern
+
+        seen = set()
+        for keyword in keywords:
+            pattern = normalize_text(keyword).strip()
+            if not pattern or pattern in seen:
+                continue
+            seen.add(pattern)
+            self._insert(pattern, keyword)
+
+        self._build_fail_links()
+
+    def _insert(self, pattern, original):
+        node = 0
+        for ch in pattern:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = nxt
+        self.output[node].append(len(self.terms))
+        self.terms.append(original)
+        self.lengths.append(len(pattern))
+
+    def _build_fail_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[child] = target if target != child else 0
+                # Inherit matches that end at the fail target (suffix patterns)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def __len__(self):
+        return len(self.terms)
+
+    def iter_matches(self, normalized_text):
+        """Yields (term_index, start, end) for every occurrence; positions refer to the normalized text"""
+        goto, fail, output, lengths = self.goto, self.fail, self.output, self.lengths
+        node = 0
+        for i, ch in enumerate(normalized_text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node]:
+                for idx in output[node]:
+                    yield idx, i + 1 - lengths[idx], i + 1
+
+
+class KeywordMatcher:
+    """Keeps a compiled automaton and rebuilds it only when the blacklist changes"""
+
+    def __init__(self):
+        self.logger = logger
+        self._automaton = None
+        self._signature = None
+        self._lock = Lock()
+        self.builds = 0
+
+    def set_keywords(self, keywords):
+        signature = tuple(keywords or [])
+        with self._lock:
+            if signature == self._signature and self._automaton is not None:
+                return self._automaton
+            self._automaton = AhoCorasick(signature)
+            self._signature = signature
+            self.builds += 1
+            self.logger.info(f"Blacklist automaton rebuilt ({len(self._automaton)} terms, {len(self._automaton.goto)} states)")
+            return self._automaton
+
+    def match(self, text, keywords=None, first_only=False, max_matches=100):
+        """
+        Scans text for blacklisted terms.
+        Returns a list of {"term", "start", "end"}; positions are offsets into the normalized text.
+        """
+        automaton = self.set_keywords(keywords) if keywords is not None else self._automaton
+        if not automaton or not text:
+            return []
+
+        matches = []
+        for idx, start, end in automaton.iter_matches(normalize_text(text)):
+            matches.append({"term": automaton.terms[idx], "start": start, "end": end})
+            if first_only or len(matches) >= max_matches:
+                break
+        return matches
+
+
+keyword_matcher = KeywordMatcher()
+
+
+@eel.expose
+def set_blacklist_keywords(keywords):
+    automaton = keyword_matcher.set_keywords(keywords)
+    return {"success": True, "terms": len(automaton)}
+
+@eel.expose
+def match_blacklist(text, keywords=None, first_only=False):
+    matches = keyword_matcher.match(text, keywords, first_only=first_only)
+    return {"matched": bool(matches), "matches": matches}
@@ -0,0 +1,240 @@
+import atexit
+import eel
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from threading import Lock
+
+logger = logging.getLogger("LOGGING")
+
+LOG_FORMAT = '%(name)s  %(asctime)s [%(levelname)s] %(message)s'
+BUFFER_SIZE = 10000            # records waiting for the writer thread; overflow is dropped, never blocks
+SUPPRESSED_REPORT_INTERVAL = 10.0
+
+# Hot-path categories (logger name or extra={"category": ...}): records/sec, burst and the
+# fraction of INFO/DEBUG records kept. WARNING and above are rate limited but never sampled.
+DEFAULT_LIMITS = {
+    "da.frames": {"rate": 20, "burst": 50, "sample": 1.0},
+    "da.payload": {"rate": 10, "burst": 20, "sample": 1.0},
+    "EVENT_BUS": {"rate": 5, "burst": 20, "sample": 1.0},
+}
+
+
+class LazyJson:
+    """Log argument serialized only if the record is actually emitted: logger.debug('%s', LazyJson(data))"""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        try:
+            return json.dumps(self.value, ensure_ascii=False, default=str)
+        except (TypeError, ValueError):
+            return repr(self.value)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line (STREAMPLAYER_LOG_FORMAT=json); extra={"fields": {...}} become top-level keys"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        category = getattr(record, "category", None)
+        if category:
+            entry["category"] = category
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket + sampling per category; suppressed counts are reported on the next record that passes"""
+
+    def __init__(self, limits=None):
+        super().__init__()
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self._buckets = {}     # category -> [tokens, last refill]
+        self._suppressed = {}  # category -> count since the last report
+        self._last_report = {}
+        self._lock = Lock()
+        self.stats = {"passed": 0, "rate_limited": 0, "sampled_out": 0}
+
+    def configure(self, category, rate=None, burst=None, sample=None):
+        with self._lock:
+            if rate is None and burst is None and sample is None:
+                self.limits.pop(category, None)
+                self._buckets.pop(category, None)
+                return
+            limit = dict(self.limits.get(category, {"rate": 0, "burst": 0, "sample": 1.0}))
+            if rate is not None:
+                limit["rate"] = float(rate)
+            if burst is not None:
+                limit["burst"] = float(burst)
+            if sample is not None:
+                limit["sample"] = min(1.0, max(0.0, float(sample)))
+            self.limits[category] = limit
+            self._buckets.pop(category, None)
+
+    def filter(self, record):
+        category = getattr(record, "category", None) or record.name
+        limit = self.limits.get(category)
+        if limit is None:
+            return True
+
+        with self._lock:
+            if record.levelno < logging.WARNING and limit["sample"] < 1.0 and random.random() >= limit["sample"]:
+                self.stats["sampled_out"] += 1
+                self._suppressed[category] = self._suppressed.get(category, 0) + 1
+                return False
+
+            if limit["rate"] > 0:
+                now = time.monotonic()
+                burst = limit["burst"] or limit["rate"]
+                tokens, last = self._buckets.get(category, (burst, now))
+                tokens = min(burst, tokens + (now - last) * limit["rate"])
+                if tokens < 1:
+                    self._buckets[category] = (tokens, now)
+                    self.stats["rate_limited"] += 1
+                    self._suppressed[category] = self._suppressed.get(category, 0) + 1
+                    return False
+                self._buckets[category] = (tokens - 1, now)
+
+            self.stats["passed"] += 1
+            suppressed = self._suppressed.get(category, 0)
+            if suppressed and time.monotonic() - self._last_report.get(category, 0) >= SUPPRESSED_REPORT_INTERVAL:
+                self._suppressed[category] = 0
+                self._last_report[category] = time.monotonic()
+                record.suppressed = suppressed
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Never blocks the caller: when the writer thread falls behind, new records are dropped and counted"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = super().prepare(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            record.msg = f"{record.msg} (+{suppressed} similar suppressed)"
+            record.message = record.msg
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogManager:
+    """
+    Owns the logging pipeline: every logger writes into a bounded in-memory queue (QueueHandler),
+    a single QueueListener thread formats and writes to stdout. Formatting of the message itself
+    stays lazy (%-args are only rendered for records that pass level and rate filters).
+    """
+
+    def __init__(self, buffer_size=BUFFER_SIZE):
+        self.logger = logger
+        self.buffer_size = buffer_size
+        self.rate_filter = RateLimitFilter()
+        self.handler = None
+        self.listener = None
+        self.base_level = logging.INFO
+        self.debug_loggers = set()
+        self._lock = Lock()
+
+    def setup(self, level=logging.INFO, json_output=None):
+        with self._lock:
+            if self.listener is not None:
+                return
+            if json_output is None:
+                json_output = os.environ.get("STREAMPLAYER_LOG_FORMAT", "").lower() == "json"
+            if os.environ.get("STREAMPLAYER_DEBUG"):
+                level = logging.DEBUG
+
+            stream_handler = logging.StreamHandler(sys.stdout)
+            stream_handler.setFormatter(JsonFormatter() if json_output else logging.Formatter(LOG_FORMAT))
+
+            self.handler = DroppingQueueHandler(queue.Queue(self.buffer_size))
+            self.handler.addFilter(self.rate_filter)
+            self.listener = QueueListener(self.handler.queue, stream_handler, respect_handler_level=False)
+
+            root = logging.getLogger()
+            for old in list(root.handlers):
+                root.removeHandler(old)
+            root.addHandler(self.handler)
+            root.setLevel(level)
+            self.base_level = level
+            self.listener.start()
+            atexit.register(self.shutdown)
+
+    def shutdown(self):
+        """Flushes what is still queued"""
+        with self._lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+
+    def set_debug(self, enabled, loggers=None):
+        """DEBUG for everything (loggers=None) or for the given logger names only; switchable at runtime"""
+        with self._lock:
+            if not loggers:
+                logging.getLogger().setLevel(logging.DEBUG if enabled else self.base_level)
+                if not enabled:
+                    for name in self.debug_loggers:
+                        logging.getLogger(name).setLevel(logging.NOTSET)
+                    self.debug_loggers.clear()
+                return
+            for name in loggers:
+                logging.getLogger(name).setLevel(logging.DEBUG if enabled else logging.NOTSET)
+                if enabled:
+                    self.debug_loggers.add(name)
+                else:
+                    self.debug_loggers.discard(name)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.rate_filter.stats)
+            stats["dropped"] = self.handler.dropped if self.handler else 0
+            stats["buffered"] = self.handler.queue.qsize() if self.handler else 0
+            stats["buffer_size"] = self.buffer_size
+            stats["debug"] = logging.getLogger().level <= logging.DEBUG
+            stats["debug_loggers"] = sorted(self.debug_loggers)
+            stats["limits"] = dict(self.rate_filter.limits)
+            return stats
+
+
+log_manager = LogManager()
+
+
+@eel.expose
+def set_debug_logging(enabled, loggers=None):
+    log_manager.set_debug(bool(enabled), loggers)
+    logger.info(f"Debug logging {'enabled' if enabled else 'disabled'}{f' for {loggers}' if loggers else ''}")
+    return {"success": True, "stats": log_manager.get_stats()}
+
+@eel.expose
+def configure_log_limits(category, rate=None, burst=None, sample=None):
+    log_manager.rate_filter.configure(category, rate, burst, sample)
+    return {"success": True, "limits": log_manager.rate_filter.limits}
+
+@eel.expose
+def get_logging_stats():
+    return log_manager.get_stats()
@@ -0,0 +1,222 @@
+import bottle
+import eel
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from threading import Lock
+
+from providers.http_client import http_client, LatencyHistogram
+
+logger = logging.getLogger("METRICS")
+
+# Span names in the order they happen for a donation
+SPAN_RECEIVE = "receive"          # frame arrived -> donation handed to the event bus (includes parse)
+SPAN_PARSE = "parse"              # decoding of the frame (providers/centrifugo.py)
+SPAN_UI_DISPATCH = "ui_dispatch"  # event bus batch + eel bridge + JS handler, until the UI asks to validate
+SPAN_METADATA = "metadata"        # videos.list (cached)
+SPAN_TRANSCRIPT = "transcript"    # transcript fetch + scan
+SPAN_FILTER = "filter"            # every other rule
+SPAN_ENQUEUE = "enqueue"          # verdict returned -> item stored in the queue
+SPANS = (SPAN_RECEIVE, SPAN_PARSE, SPAN_UI_DISPATCH, SPAN_METADATA, SPAN_TRANSCRIPT, SPAN_FILTER, SPAN_ENQUEUE)
+END_TO_END = "donation_to_queue"
+
+SPAN_BUCKETS_MS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+MAX_ACTIVE_TRACES = 1000
+TRACE_TTL = 600               # a donation that never reaches the queue (rejected, UI closed) is dropped
+RECENT_TRACES = 50
+METRICS_ROUTE = "/metrics"
+
+
+class Trace:
+    __slots__ = ("trace_id", "source", "started", "spans", "marks")
+
+    def __init__(self, trace_id, source, started):
+        self.trace_id = trace_id
+        self.source = source
+        self.started = started
+        self.spans = {}
+        self.marks = {}
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "source": self.source,
+            "spans_ms": {name: round(ms, 3) for name, ms in self.spans.items()},
+        }
+
+
+class Tracer:
+    """
+    In-process tracing of the donation -> queue path.
+    A trace is opened when a provider receives a donation; its id travels with the donation
+    (trace_id field) through the UI and back into validate_video / queue_add, where the
+    remaining spans are recorded. Span durations are aggregated into histograms; the last few
+    finished traces are kept for the in-app dashboard.
+    """
+
+    def __init__(self, max_active=MAX_ACTIVE_TRACES, ttl=TRACE_TTL):
+        self.logger = logger
+        self.max_active = max_active
+        self.ttl = ttl
+        self._lock = Lock()
+        self._active = OrderedDict()
+        self._recent = deque(maxlen=RECENT_TRACES)
+        self.histograms = {}
+        self.counters = {"traces_started": 0, "traces_finished": 0, "traces_expired": 0, "traces_rejected": 0}
+
+    def _observe_locked(self, name, elapsed_ms):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = LatencyHistogram(SPAN_BUCKETS_MS)
+        hist.observe(elapsed_ms)
+
+    def _expire_locked(self, now):
+        while self._active:
+            trace = next(iter(self._active.values()))
+            if len(self._active) <= self.max_active and now - trace.started < self.ttl:
+                break
+            self._active.popitem(last=False)
+            self.counters["traces_expired"] += 1
+
+    # --- recording ---
+
+    def start_trace(self, source, started=None):
+        """Opens a trace; started is a time.perf_counter() value (defaults to now)"""
+        now = time.perf_counter()
+        trace = Trace(uuid.uuid4().hex[:16], source, started if started is not None else now)
+        with self._lock:
+            self._active[trace.trace_id] = trace
+            self.counters["traces_started"] += 1
+            self._expire_locked(now)
+        return trace.trace_id
+
+    def add_span(self, trace_id, name, elapsed_ms):
+        with self._lock:
+            self._observe_locked(name, elapsed_ms)
+            trace = self._active.get(trace_id) if trace_id else None
+            if trace is not None:
+                trace.spans[name] = trace.spans.get(name, 0.0) + elapsed_ms
+
+    def observe(self, name, elapsed_ms):
+        """Span-like timing that is not tied to a donation (e.g. every transcript fetch)"""
+        with self._lock:
+            self._observe_locked(name, elapsed_ms)
+
+    def mark(self, trace_id, name):
+        """Remembers a point in time; a later close_gap() turns it into a span"""
+        with self._lock:
+            trace = self._active.get(trace_id) if trace_id else None
+            if trace is not None:
+                trace.marks[name] = time.perf_counter()
+
+    def close_gap(self, trace_id, name):
+        """Records span `name` from its mark until now (used across the Python <-> UI boundary)"""
+        with self._lock:
+            trace = self._active.get(trace_id) if trace_id else None
+            marked = trace.marks.pop(name, None) if trace is not None else None
+            if marked is None:
+                return
+            elapsed_ms = (time.perf_counter() - marked) * 1000
+            self._observe_locked(name, elapsed_ms)
+            trace.spans[name] = trace.spans.get(name, 0.0) + elapsed_ms
+
+    def finish(self, trace_id, accepted=True):
+        """Closes the trace; accepted traces feed the end-to-end histogram"""
+        with self._lock:
+            trace = self._active.pop(trace_id, None) if trace_id else None
+            if trace is None:
+                return None
+            total_ms = (time.perf_counter() - trace.started) * 1000
+            if accepted:
+                self._observe_locked(END_TO_END, total_ms)
+                self.counters["traces_finished"] += 1
+            else:
+                self.counters["traces_rejected"] += 1
+            entry = dict(trace.to_dict(), total_ms=round(total_ms, 3), accepted=accepted)
+            self._recent.append(entry)
+            return entry
+
+    # --- export ---
+
+    def get_metrics(self):
+        with self._lock:
+            return {
+                "spans": {name: hist.to_dict() for name, hist in self.histograms.items()},
+                "counters": dict(self.counters, active_traces=len(self._active)),
+                "recent_traces": list(self._recent),
+            }
+
+    def render_prometheus(self):
+        metrics = self.get_metrics()
+        spans = metrics["spans"]
+        end_to_end = spans.pop(END_TO_END, None)
+
+        lines = []
+        _render_histogram(lines, "streamplayer_span_duration_seconds",
+                          "Duration of donation pipeline spans", "span", spans)
+        if end_to_end is not None:
+            _render_histogram(lines, "streamplayer_donation_to_queue_seconds",
+                              "Time from a donation frame to its video in the queue", None, {None: end_to_end})
+        lines.append("# HELP streamplayer_traces_total Donation traces by outcome")
+        lines.append("# TYPE streamplayer_traces_total counter")
+        for key, value in metrics["counters"].items():
+            if key.startswith("traces_"):
+                lines.append(f'streamplayer_traces_total{{outcome="{key[len("traces_"):]}"}} {value}')
+        lines.append("# HELP streamplayer_active_traces Donations still on their way to the queue")
+        lines.append("# TYPE streamplayer_active_traces gauge")
+        lines.append(f"streamplayer_active_traces {metrics['counters']['active_traces']}")
+        _render_histogram(lines, "streamplayer_http_request_duration_seconds",
+                          "Outgoing HTTP request latency", "endpoint", http_client.get_stats())
+        return "\n".join(lines) + "\n"
+
+
+def _render_histogram(lines, metric, help_text, label, histograms):
+    """Prometheus text exposition from LatencyHistogram.to_dict() (per-bucket counts in ms)"""
+    if not histograms:
+        return
+    lines.append(f"# HELP {metric} {help_text}")
+    lines.append(f"# TYPE {metric} histogram")
+    for name, data in sorted(histograms.items(), key=lambda kv: str(kv[0])):
+        base = f'{label}="{name}"' if label else ""
+        sep = "," if base else ""
+        running = 0
+        for bound, count in data["buckets"].items():
+            if bound == "+Inf":
+                continue
+            running += count
+            lines.append(f'{metric}_bucket{{{base}{sep}le="{float(bound) / 1000:g}"}} {running}')
+        lines.append(f'{metric}_bucket{{{base}{sep}le="+Inf"}} {data["count"]}')
+        labels = f"{{{base}}}" if base else ""
+        lines.append(f"{metric}_sum{labels} {data['sum_ms'] / 1000:.6f}")
+        lines.append(f"{metric}_count{labels} {data['count']}")
+
+
+tracer = Tracer()
+
+
+def trace_donation(source, entry, received_at, parse_ms=None):
+    """
+    Opens the trace of a freshly received donation right before it goes to the UI.
+    Returns a copy of the entry carrying trace_id (the journal keeps its own copy untouched).
+    """
+    trace_id = tracer.start_trace(source, received_at)
+    if parse_ms is not None:
+        tracer.add_span(trace_id, SPAN_PARSE, parse_ms)
+    tracer.add_span(trace_id, SPAN_RECEIVE, (time.perf_counter() - received_at) * 1000)
+    tracer.mark(trace_id, SPAN_UI_DISPATCH)
+    return dict(entry, trace_id=trace_id)
+
+
+# Same bottle app (and port) as Eel; registered before eel.start() adds its catch-all route
+@bottle.route(METRICS_ROUTE)
+def serve_metrics():
+    bottle.response.content_type = "text/plain; version=0.0.4; charset=utf-8"
+    return tracer.render_prometheus()
+
+
+@eel.expose
+def get_metrics():
+    metrics = tracer.get_metrics()
+    metrics["http"] = http_client.get_stats()
+    return metrics
@@ -0,0 +1,229 @@
+import asyncio
+import bottle
+import eel
+import logging
+import os
+import re
+from threading import Lock
+
+from providers.event_bus import send_to_ui
+from providers.http_client import http_client, LatencyHistogram
+from providers.queue_store import queue_store
+from providers.runtime import runtime
+from providers.storage import get_data_path
+from providers.video_metadata import video_metadata
+
+logger = logging.getLogger("PREFETCH")
+
+DEFAULT_LOOKAHEAD = 3
+DEBOUNCE = 0.2                 # queue edits usually come in bursts (playlists)
+MAX_THUMBNAILS = 500
+THUMBNAIL_ROUTE = "/thumbs"
+SAFE_ID_RE = re.compile(r"^[\w-]{1,64}$")
+TTFF_BUCKETS_MS = (100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+
+
+class PrefetchScheduler:
+    """
+    Warms up the next items of the queue while the current one plays:
+    refreshes stale metadata (the cache only hits the API when statistics expired), downloads
+    thumbnails into a local cache served by the Eel web server, and tells the UI which item to
+    preload in a hidden player. Time-to-first-frame reported by the UI is kept per
+    prefetched/cold switch so the effect is measurable.
+    """
+
+    def __init__(self, store, metadata, http=http_client, lookahead=DEFAULT_LOOKAHEAD, thumb_dir=None):
+        self.logger = logger
+        self.store = store
+        self.metadata = metadata
+        self.http = http
+        self.lookahead = lookahead
+        self.thumb_dir = thumb_dir
+        self.api_key = None
+
+        self._lock = Lock()
+        self._task = None
+        self._dirty = False
+        self._warmed = {}          # queueId -> {"video_id", "thumbnail", "available"}
+        self._preloaded = None     # queueId we last asked the UI to preload
+        self.ttff = {"prefetched": LatencyHistogram(TTFF_BUCKETS_MS), "cold": LatencyHistogram(TTFF_BUCKETS_MS)}
+        self.stats = {
+            "runs": 0,
+            "thumbnails_downloaded": 0,
+            "thumbnail_hits": 0,
+            "thumbnail_errors": 0,
+            "metadata_refreshes": 0,
+            "unavailable": 0,
+            "preload_signals": 0,
+        }
+
+    def get_thumb_dir(self):
+        if self.thumb_dir is None:
+            self.thumb_dir = os.path.dirname(get_data_path("thumbnails", "_"))
+        return self.thumb_dir
+
+    def start(self):
+        self.store.add_listener(self.on_queue_changed)
+        self.on_queue_changed()
+
+    def configure(self, lookahead=None, api_key=None):
+        with self._lock:
+            if lookahead is not None:
+                self.lookahead = max(0, int(lookahead))
+            if api_key is not None:
+                self.api_key = api_key or None
+        self.on_queue_changed()
+
+    # --- scheduling ---
+
+    def on_queue_changed(self, *args):
+        """Queue listener; may be called from any thread, only schedules work on the runtime loop"""
+        loop = runtime.start()
+        loop.call_soon_threadsafe(self._schedule)
+
+    def _schedule(self):
+        if self._task is not None and not self._task.done():
+            self._dirty = True
+            return
+        self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while True:
+            self._dirty = False
+            await asyncio.sleep(DEBOUNCE)
+            try:
+                await self._warm_upcoming()
+            except Exception as e:
+                self.logger.error(f"Prefetch run failed: {e}")
+            if not self._dirty:
+                return
+
+    async def _warm_upcoming(self):
+        upcoming = self.store.upcoming(self.lookahead)
+        self.stats["runs"] += 1
+
+        live = {item["queueId"] for item in upcoming}
+        for queue_id in list(self._warmed):
+            if queue_id not in live:
+                del self._warmed[queue_id]
+
+        # Metadata: one batched call for everything that is stale (the cache skips fresh ids)
+        cold = [item for item in upcoming if item["queueId"] not in self._warmed]
+        available = {}
+        if cold and self.api_key:
+            ids = [item["id"] for item in cold]
+            try:
+                items = await runtime.run_blocking(self.metadata.fetch_videos, ids, self.api_key)
+                self.stats["metadata_refreshes"] += 1
+                available = {video_id: video_id in items for video_id in ids}
+            except Exception as e:
+                self.logger.warning(f"Metadata refresh failed: {e}")
+
+        for item in cold:
+            thumbnail = await runtime.run_blocking(self._ensure_thumbnail, item["id"], item.get("thumbnail"))
+            state = {"video_id": item["id"], "thumbnail": thumbnail, "available": available.get(item["id"], True)}
+            self._warmed[item["queueId"]] = state
+            if not state["available"]:
+                self.stats["unavailable"] += 1
+                self.logger.warning(f"Queued video {item['id']} is no longer available")
+            send_to_ui('onPrefetchReady', dict(state, queueId=item["queueId"]))
+
+        # Next item to play: ask the UI to load its embed in the background
+        next_item = next((item for item in upcoming if self._warmed.get(item["queueId"], {}).get("available", True)), None)
+        next_id = next_item["queueId"] if next_item else None
+        if next_id != self._preloaded:
+            self._preloaded = next_id
+            if next_item:
+                self.stats["preload_signals"] += 1
+                send_to_ui('onPreloadNext', {"queueId": next_id, "id": next_item["id"], "url": next_item.get("url")})
+
+    # --- thumbnails ---
+
+    def _bump(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def thumbnail_path(self, video_id):
+        return os.path.join(self.get_thumb_dir(), f"{video_id}.jpg")
+
+    def _ensure_thumbnail(self, video_id, url):
+        """Downloads the thumbnail once; returns the local URL (or the remote one if it failed)"""
+        if not url or not SAFE_ID_RE.match(video_id or ""):
+            return url
+        path = self.thumbnail_path(video_id)
+        local_url = f"{THUMBNAIL_ROUTE}/{video_id}.jpg"
+        if os.path.exists(path):
+            self._bump("thumbnail_hits")
+            return local_url
+
+        try:
+            response = self.http.get(url, endpoint="yt.thumbnail")
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}")
+            tmp_path = path + ".part"
+            with open(tmp_path, "wb") as f:
+                f.write(response.content)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self._bump("thumbnail_errors")
+            self.logger.warning(f"Thumbnail download failed for {video_id}: {e}")
+            return url
+
+        self._bump("thumbnails_downloaded")
+        self._prune_thumbnails()
+        return local_url
+
+    def _prune_thumbnails(self):
+        directory = self.get_thumb_dir()
+        files = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".jpg")]
+        if len(files) <= MAX_THUMBNAILS:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - MAX_THUMBNAILS]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # --- time to first frame ---
+
+    def record_ttff(self, ttff_ms, prefetched):
+        with self._lock:
+            self.ttff["prefetched" if prefetched else "cold"].observe(float(ttff_ms))
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["lookahead"] = self.lookahead
+            stats["warmed"] = len(self._warmed)
+            stats["ttff"] = {kind: hist.to_dict() for kind, hist in self.ttff.items()}
+            return stats
+
+
+prefetch_scheduler = PrefetchScheduler(queue_store, video_metadata)
+
+
+# Served by the same bottle app as Eel; registered before eel.start() adds its catch-all route
+@bottle.route(f"{THUMBNAIL_ROUTE}/<filename>")
+def serve_thumbnail(filename):
+    video_id, ext = os.path.splitext(filename)
+    if ext != ".jpg" or not SAFE_ID_RE.match(video_id):
+        return bottle.HTTPError(404)
+    response = bottle.static_file(filename, root=prefetch_scheduler.get_thumb_dir(), mimetype="image/jpeg")
+    response.set_header("Cache-Control", "public, max-age=86400")
+    return response
+
+
+@eel.expose
+def configure_prefetch(config):
+    prefetch_scheduler.configure(lookahead=config.get('lookahead'), api_key=config.get('api_key'))
+    return {"success": True, "lookahead": prefetch_scheduler.lookahead}
+
+@eel.expose
+def report_playback_timing(queue_id, ttff_ms, prefetched=False):
+    prefetch_scheduler.record_ttff(ttff_ms, prefetched)
+    return {"success": True}
+
+@eel.expose
+def get_prefetch_stats():
+    return prefetch_scheduler.get_stats()
@@ -0,0 +1,325 @@
+import heapq
+import logging
+import time
+from collections import Counter
+
+logger = logging.getLogger("QUEUE_SCHEDULER")
+
+# (minimum donation amount, weight): a weight-4 item costs a quarter of a turn, so it overtakes
+# up to three regular items queued after the same point. Amounts are compared as-is (no currency conversion).
+DEFAULT_TIERS = ((0, 1.0), (100, 2.0), (500, 4.0), (1000, 8.0))
+STREAMER = "__streamer__"  # items added by hand, without a requester
+POLICIES = ("fifo", "priority", "fair")
+
+
+class QueueRejected(ValueError):
+    """The scheduling policy refused an item (per-donor cap)"""
+
+
+def normalize_tiers(tiers):
+    """[[amount, weight], ...] from the UI -> sorted tuple of (amount, weight) with positive weights"""
+    result = sorted((float(amount), float(weight)) for amount, weight in tiers or DEFAULT_TIERS)
+    if not result or any(weight <= 0 for _, weight in result):
+        raise ValueError("Tier weights must be positive")
+    return tuple(result)
+
+
+class FairScheduler:
+    """
+    Play order for donation-driven videos: weighted fair queueing over requesters.
+
+    Every item gets a finish tag when it is queued:
+        start  = max(virtual_time, last finish tag of its requester)     ("fair" policy)
+        finish = start + 1 / weight(amount tier)
+    and items play in tag order. virtual_time is the tag of the last played item, so:
+    - a requester's items are spread out (round-robin with everyone else) instead of playing
+      back to back, however many were sent at once;
+    - bigger donations cost less of a turn and move ahead;
+    - tags never change as time passes and new items are always tagged after virtual_time,
+      so waiting items age towards the front and cannot starve.
+    The "priority" policy skips the per-requester term (tiers only, FIFO within a tier).
+
+    push/pop/remove/reprioritize are O(log n): a binary heap with lazy invalidation.
+    """
+
+    def __init__(self, policy="fair", tiers=DEFAULT_TIERS, max_per_donor=0):
+        if policy not in ("priority", "fair"):
+            raise ValueError(f"Unknown scheduling policy: {policy}")
+        self.policy = policy
+        self.tiers = normalize_tiers(tiers)
+        self.max_per_donor = int(max_per_donor or 0)
+
+        self.virtual_time = 0.0
+        self._heap = []            # [tag, seq, queue_id, requester, start]; queue_id None = removed
+        self._entries = {}         # queue_id -> live heap entry
+        self._last_finish = {}     # requester -> finish tag of their latest item
+        self._donor_counts = Counter()
+        self._seq = 0
+        self.stats = {"pushed": 0, "popped": 0, "removed": 0, "reprioritized": 0, "rejected": 0, "compactions": 0}
+
+    # --- policy ---
+
+    def weight(self, amount):
+        try:
+            amount = float(amount or 0)
+        except (TypeError, ValueError):
+            amount = 0.0
+        weight = self.tiers[0][1]
+        for threshold, tier_weight in self.tiers:
+            if amount < threshold:
+                break
+            weight = tier_weight
+        return weight
+
+    @staticmethod
+    def requester_of(item):
+        requester = (item.get("requester") or "").strip().lower()
+        return requester or STREAMER
+
+    def admit(self, item):
+        """(True, None) or (False, reason) - the per-donor cap on queued items"""
+        requester = self.requester_of(item)
+        if self.max_per_donor and requester != STREAMER and self._donor_counts[requester] >= self.max_per_donor:
+            self.stats["rejected"] += 1
+            return False, f"{item.get('requester')} already has {self.max_per_donor} video(s) in the queue"
+        return True, None
+
+    # --- heap ---
+
+    def _push_entry(self, queue_id, tag, requester, start):
+        self._seq += 1
+        entry = [tag, self._seq, queue_id, requester, start]
+        self._entries[queue_id] = entry
+        heapq.heappush(self._heap, entry)
+        return entry
+
+    def _invalidate(self, queue_id):
+        entry = self._entries.pop(queue_id, None)
+        if entry is not None:
+            entry[2] = None
+            if len(self._heap) > 2 * len(self._entries) + 64:
+                self._heap = [e for e in self._heap if e[2] is not None]
+                heapq.heapify(self._heap)
+                self.stats["compactions"] += 1
+        return entry
+
+    def push(self, item, tag=None):
+        """Queues an item (must have queueId); returns its tag. tag= places it explicitly (manual order)"""
+        queue_id = item["queueId"]
+        previous = self._invalidate(queue_id)
+        if previous is not None:
+            self._release(previous)
+        requester = self.requester_of(item)
+        if tag is None:
+            start = self.virtual_time
+            if self.policy == "fair":
+                start = max(start, self._last_finish.get(requester, 0.0))
+            tag = start + 1.0 / self.weight(item.get("amount"))
+            if self.policy == "fair":
+                self._last_finish[requester] = tag
+        else:
+            start = tag
+        self._push_entry(queue_id, tag, requester, start)
+        self._donor_counts[requester] += 1
+        self.stats["pushed"] += 1
+        return tag
+
+    def pop(self):
+        """queue_id of the next item to play (None if empty); advances virtual time"""
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            queue_id = entry[2]
+            if queue_id is None:
+                continue
+            del self._entries[queue_id]
+            self._release(entry)
+            self.virtual_time = max(self.virtual_time, entry[0])
+            self.stats["popped"] += 1
+            return queue_id
+        return None
+
+    def peek(self):
+        while self._heap and self._heap[0][2] is None:
+            heapq.heappop(self._heap)
+        return self._heap[0][2] if self._heap else None
+
+    def _release(self, entry):
+        requester = entry[3]
+        self._donor_counts[requester] -= 1
+        if self._donor_counts[requester] <= 0:
+            del self._donor_counts[requester]
+
+    def remove(self, queue_id):
+        entry = self._invalidate(queue_id)
+        if entry is None:
+            return False
+        self._release(entry)
+        self.stats["removed"] += 1
+        return True
+
+    def reprioritize(self, queue_id, amount=None, tag=None):
+        """
+        New tag for one queued item: from a new amount (same start, new tier) or an explicit tag
+        (manual move). Other items keep their tags. Returns the new tag or None if not queued.
+        """
+        entry = self._entries.get(queue_id)
+        if entry is None:
+            return None
+        old_tag, _, _, requester, start = entry
+        if tag is None:
+            tag = start + 1.0 / self.weight(amount)
+            if self.policy == "fair" and self._last_finish.get(requester) == old_tag:
+                self._last_finish[requester] = tag
+        else:
+            start = tag
+        self._invalidate(queue_id)
+        self._push_entry(queue_id, tag, requester, start)
+        self.stats["reprioritized"] += 1
+        return tag
+
+    def tag(self, queue_id):
+        entry = self._entries.get(queue_id)
+        return entry[0] if entry else None
+
+    def clear(self):
+        self._heap.clear()
+        self._entries.clear()
+        self._donor_counts.clear()
+        self._last_finish.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, queue_id):
+        return queue_id in self._entries
+
+    def get_stats(self):
+        return dict(
+            self.stats,
+            policy=self.policy,
+            tiers=[list(t) for t in self.tiers],
+            max_per_donor=self.max_per_donor,
+            queued=len(self._entries),
+            heap_size=len(self._heap),
+            donors=len(self._donor_counts),
+            virtual_time=round(self.virtual_time, 4),
+        )
+
+
+# --- offline simulation ---
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * (len(sorted_values) - 1) + 0.5))]
+
+
+def simulate(arrivals, policy="fair", tiers=DEFAULT_TIERS, max_per_donor=0, default_duration=240.0, window=3600.0):
+    """
+    Replays a donation log against a policy ("fifo", "priority" or "fair") with a single player.
+
+    arrivals: dicts with t (seconds), requester, amount and optional duration (seconds), sorted by t.
+    Items that arrive while a video plays are queued before the next pick. Returns the play
+    order (queue ids) and wait-time / fairness metrics, so policies can be compared on the same log.
+    """
+    arrivals = list(arrivals)
+    scheduler = None if policy == "fifo" else FairScheduler(policy, tiers, max_per_donor)
+    fifo = []
+    fifo_head = 0
+    fifo_counts = Counter()
+    items = {}
+
+    clock = 0.0
+    index = 0
+    order, waits, rejected = [], [], 0
+    waits_by_weight = {}
+    weigher = scheduler or FairScheduler("priority", tiers)
+    schedule_ns = 0
+
+    while index < len(arrivals) or (scheduler is not None and len(scheduler)) or (scheduler is None and fifo_head < len(fifo)):
+        queued = len(scheduler) if scheduler is not None else len(fifo) - fifo_head
+        if not queued and index < len(arrivals):
+            clock = max(clock, float(arrivals[index]["t"]))
+        while index < len(arrivals) and float(arrivals[index]["t"]) <= clock:
+            arrival = arrivals[index]
+            queue_id = arrival.get("queueId") or f"sim-{index}"
+            item = dict(arrival, queueId=queue_id)
+            index += 1
+            requester = FairScheduler.requester_of(item)
+            started = time.perf_counter_ns()
+            if scheduler is not None:
+                admitted, _ = scheduler.admit(item)
+                if admitted:
+                    scheduler.push(item)
+            else:
+                admitted = not max_per_donor or fifo_counts[requester] < max_per_donor
+                if admitted:
+                    fifo.append(queue_id)
+                    fifo_counts[requester] += 1
+            schedule_ns += time.perf_counter_ns() - started
+            if not admitted:
+                rejected += 1
+                continue
+            items[queue_id] = item
+
+        started = time.perf_counter_ns()
+        if scheduler is not None:
+            queue_id = scheduler.pop()
+        elif fifo_head < len(fifo):
+            queue_id = fifo[fifo_head]
+            fifo_head += 1
+            fifo_counts[FairScheduler.requester_of(items[queue_id])] -= 1
+        else:
+            queue_id = None
+        schedule_ns += time.perf_counter_ns() - started
+        if queue_id is None:
+            continue
+
+        item = items.pop(queue_id)
+        wait = clock - float(item["t"])
+        order.append((queue_id, FairScheduler.requester_of(item), clock))
+        waits.append(wait)
+        waits_by_weight.setdefault(weigher.weight(item.get("amount")), []).append(wait)
+        clock += float(item.get("duration") or default_duration)
+
+    return {"order": [queue_id for queue_id, _, _ in order], "metrics": _metrics(
+        order, waits, waits_by_weight, rejected, window, schedule_ns, len(arrivals)
+    )}
+
+
+def _metrics(order, waits, waits_by_weight, rejected, window, schedule_ns, arrivals):
+    def wait_stats(values):
+        values = sorted(values)
+        return {
+            "count": len(values),
+            "mean_s": round(sum(values) / len(values), 1) if values else None,
+            "p50_s": round(_percentile(values, 0.5), 1) if values else None,
+            "p95_s": round(_percentile(values, 0.95), 1) if values else None,
+            "max_s": round(values[-1], 1) if values else None,
+        }
+
+    longest_streak = streak = 0
+    previous = None
+    for _, requester, _ in order:
+        streak = streak + 1 if requester == previous else 1
+        previous = requester
+        longest_streak = max(longest_streak, streak)
+
+    # Who owned the first `window` seconds of playback (e.g. the first hour of the stream)
+    first_start = order[0][2] if order else 0.0
+    in_window = Counter(requester for _, requester, started in order if started - first_start < window)
+    top_requester, top_plays = in_window.most_common(1)[0] if in_window else (None, 0)
+
+    return {
+        "arrivals": arrivals,
+        "played": len(order),
+        "rejected": rejected,
+        "wait": wait_stats(waits),
+        "wait_by_weight": {str(weight): wait_stats(values) for weight, values in sorted(waits_by_weight.items())},
+        "longest_same_requester_streak": longest_streak,
+        "window_s": window,
+        "window_top_requester": top_requester,
+        "window_top_share": round(top_plays / sum(in_window.values()), 3) if in_window else None,
+        "window_requesters": len(in_window),
+        "schedule_us_per_item": round(schedule_ns / 1000 / max(1, arrivals), 3),
+    }
@@ -0,0 +1,599 @@
+import bisect
+import eel
+import json
+import logging
+import random
+import sqlite3
+import string
+import time
+from collections import Counter, deque
+from itertools import islice
+from threading import Lock
+
+from providers.event_bus import send_to_ui
+from providers.metrics import tracer, SPAN_ENQUEUE
+from providers.queue_scheduler import POLICIES, FairScheduler, QueueRejected
+from providers.storage import get_data_path
+
+logger = logging.getLogger("QUEUE_STORE")
+
+HISTORY_LIMIT = 1000   # kept on the backend; the UI only mirrors the last HISTORY_VIEW items
+HISTORY_VIEW = 10
+POSITION_STEP = 1024.0
+MIN_POSITION_GAP = 1e-6
+
+
+class _Node:
+    __slots__ = ("queue_id", "item", "position", "tag", "prev", "next")
+
+    def __init__(self, queue_id, item, position, tag=None):
+        self.queue_id = queue_id
+        self.item = item
+        self.position = position
+        self.tag = tag  # scheduler tag, None without a scheduling policy
+        self.prev = None
+        self.next = None
+
+
+class QueueStore:
+    """
+    Backend-owned play queue + history.
+    The queue is a doubly linked list indexed by queueId, so remove and move are O(1) in FIFO mode.
+    Order is persisted as a fractional position per row, so a move rewrites a single row.
+    Every mutation bumps the version and pushes only the ops (insert/remove/move/current/...)
+    to all connected windows through the event bus.
+    With a scheduling policy other than "fifo", a FairScheduler decides where new items go and
+    what plays next; the list is kept in the scheduler's tag order so the UI shows the play order.
+    A sorted tag index (two parallel lists) finds where a scheduled item goes with a binary search,
+    O(log n) comparisons; keeping it sorted costs an O(n) list insert/delete per add, remove and
+    retag - a C memmove, cheap next to the SQLite write for queues of a few thousand items.
+    """
+
+    def __init__(self, db_path=None, history_limit=HISTORY_LIMIT):
+        self.logger = logger
+        self.db_path = db_path
+        self.history_limit = history_limit
+
+        self._lock = Lock()
+        self._db = None
+        self._nodes = {}
+        self._video_index = Counter()  # video id -> number of queued copies
+        self._head = None
+        self._tail = None
+        self._index_tags = []   # sorted scheduler tags of the queued nodes...
+        self._index_ids = []    # ...and their queue ids, at the same positions
+        self.current = None
+        self.history = deque()   # newest first
+        self.version = 0
+        self._listeners = []
+        self.scheduler = None          # None = FIFO
+        self.scheduler_config = {"policy": "fifo"}
+
+    # --- persistence ---
+
+    def _get_db(self):
+        if self._db is None:
+            path = self.db_path or get_data_path("queue", "queue.sqlite3")
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS queue_items ("
+                " queue_id TEXT PRIMARY KEY,"
+                " position REAL NOT NULL,"
+                " payload TEXT NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " payload TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)")
+            self._db.commit()
+            self._load_locked()
+        return self._db
+
+    def _load_locked(self):
+        for queue_id, position, payload in self._db.execute(
+            "SELECT queue_id, position, payload FROM queue_items ORDER BY position"
+        ):
+            self._link_after(self._tail, _Node(queue_id, json.loads(payload), position))
+        for payload, in self._db.execute(
+            "SELECT payload FROM history ORDER BY seq DESC LIMIT ?", (self.history_limit,)
+        ):
+            self.history.append(json.loads(payload))
+        state = dict(self._db.execute("SELECT key, value FROM state").fetchall())
+        self.current = json.loads(state["current"]) if state.get("current") else None
+        self.version = int(state.get("version") or 0)
+        if state.get("scheduler"):
+            try:
+                self._set_scheduler_locked(json.loads(state["scheduler"]))
+            except (ValueError, TypeError) as e:
+                self.logger.error(f"Ignoring saved scheduling policy: {e}")
+        self.logger.info(f"Queue loaded: {len(self._nodes)} item(s), {len(self.history)} in history")
+
+    def _save_item(self, node):
+        self._db.execute(
+            "INSERT OR REPLACE INTO queue_items (queue_id, position, payload) VALUES (?, ?, ?)",
+            (node.queue_id, node.position, json.dumps(node.item, ensure_ascii=False))
+        )
+
+    def _save_position(self, node):
+        self._db.execute("UPDATE queue_items SET position = ? WHERE queue_id = ?", (node.position, node.queue_id))
+
+    def _delete_item(self, queue_id):
+        self._db.execute("DELETE FROM queue_items WHERE queue_id = ?", (queue_id,))
+
+    def _save_current(self):
+        value = json.dumps(self.current, ensure_ascii=False) if self.current else None
+        self._db.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('current', ?)", (value,))
+
+    def _push_history(self, item):
+        self.history.appendleft(item)
+        self._db.execute("INSERT INTO history (payload) VALUES (?)", (json.dumps(item, ensure_ascii=False),))
+        if len(self.history) > self.history_limit:
+            self.history.pop()
+            self._db.execute(
+                "DELETE FROM history WHERE seq <= (SELECT MAX(seq) FROM history) - ?", (self.history_limit,)
+            )
+
+    def _pop_history(self):
+        item = self.history.popleft()
+        self._db.execute("DELETE FROM history WHERE seq = (SELECT MAX(seq) FROM history)")
+        return item
+
+    def _commit(self, ops):
+        """Persists the version and broadcasts the ops of one mutation"""
+        self.version += 1
+        self._db.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('version', ?)", (str(self.version),))
+        self._db.commit()
+        send_to_ui('onQueueOps', {"version": self.version, "ops": ops})
+        for listener in self._listeners:
+            try:
+                listener(ops)
+            except Exception as e:
+                self.logger.error(f"Queue listener failed: {e}")
+
+    def add_listener(self, listener):
+        """listener(ops) is called after every mutation, under the store lock - it must not block"""
+        self._listeners.append(listener)
+
+    # --- linked list ---
+
+    def _link_after(self, anchor, node):
+        """Inserts node after anchor (None = at the head)"""
+        node.prev = anchor
+        node.next = anchor.next if anchor else self._head
+        if node.prev:
+            node.prev.next = node
+        else:
+            self._head = node
+        if node.next:
+            node.next.prev = node
+        else:
+            self._tail = node
+        self._nodes[node.queue_id] = node
+        self._video_index[node.item.get("id")] += 1
+        if node.tag is not None:
+            self._index_add(node)
+
+    def _unlink(self, node):
+        if node.prev:
+            node.prev.next = node.next
+        else:
+            self._head = node.next
+        if node.next:
+            node.next.prev = node.prev
+        else:
+            self._tail = node.prev
+        node.prev = node.next = None
+        del self._nodes[node.queue_id]
+        if node.tag is not None:
+            self._index_remove(node)
+        video_id = node.item.get("id")
+        self._video_index[video_id] -= 1
+        if self._video_index[video_id] <= 0:
+            del self._video_index[video_id]
+
+    def _position_after(self, anchor):
+        """Fractional position between anchor and its successor"""
+        after = anchor.next if anchor else self._head
+        low = anchor.position if anchor else (after.position - 2 * POSITION_STEP if after else 0.0)
+        high = after.position if after else low + 2 * POSITION_STEP
+        if high - low < MIN_POSITION_GAP:
+            self._renumber()
+            return self._position_after(anchor)
+        return (low + high) / 2
+
+    def _renumber(self):
+        """Rare: positions got too dense after many moves into the same gap"""
+        node, position = self._head, POSITION_STEP
+        while node:
+            node.position = position
+            self._save_position(node)
+            position += POSITION_STEP
+            node = node.next
+
+    def _index_add(self, node):
+        """O(log n) search + O(n) list insert"""
+        index = bisect.bisect_right(self._index_tags, node.tag)
+        self._index_tags.insert(index, node.tag)
+        self._index_ids.insert(index, node.queue_id)
+
+    def _index_remove(self, node):
+        """O(log n) search (plus the nodes sharing this tag) + O(n) list delete"""
+        index = bisect.bisect_left(self._index_tags, node.tag)
+        while self._index_ids[index] != node.queue_id:
+            index += 1
+        del self._index_tags[index]
+        del self._index_ids[index]
+
+    def _set_tag(self, node, tag):
+        self._index_remove(node)
+        node.tag = tag
+        self._index_add(node)
+
+    def _iter_items(self):
+        node = self._head
+        while node:
+            yield node.item
+            node = node.next
+
+    # --- scheduling ---
+
+    def _set_scheduler_locked(self, config):
+        policy = config.get("policy") or "fifo"
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown scheduling policy: {policy}")
+        self._index_tags.clear()
+        self._index_ids.clear()
+        for node in self._nodes.values():
+            node.tag = None
+        if policy == "fifo":
+            self.scheduler = None
+        else:
+            self.scheduler = FairScheduler(policy, config.get("tiers"), config.get("max_per_donor") or 0)
+            # Items already queued keep their order, ahead of everything scheduled from now on
+            count = len(self._nodes)
+            node, index = self._head, 0
+            while node:
+                node.tag = self.scheduler.push(node.item, tag=float(index - count))
+                self._index_tags.append(node.tag)
+                self._index_ids.append(node.queue_id)
+                node, index = node.next, index + 1
+        self.scheduler_config = dict(config, policy=policy)
+
+    @staticmethod
+    def _tag(node):
+        return node.tag if node.tag is not None else float("-inf")
+
+    def _anchor_for(self, tag):
+        """Last node whose tag is <= tag: binary search for the first node with a bigger tag, then its prev"""
+        index = bisect.bisect_right(self._index_tags, tag)
+        if index == len(self._index_ids):
+            return self._tail
+        anchor = self._nodes[self._index_ids[index]].prev
+        # Only steps back over nodes sharing that same bigger tag
+        while anchor is not None and self._tag(anchor) > tag:
+            anchor = anchor.prev
+        return anchor
+
+    def _retag_after_move(self, node):
+        """A manual move wins over the policy: the item gets a tag between its new neighbours"""
+        low = self._tag(node.prev) if node.prev else None
+        high = self._tag(node.next) if node.next else None
+        if low is None and high is None:
+            return
+        if low is None or low == float("-inf"):
+            tag = high - 1.0
+        elif high is None or high == float("-inf"):
+            tag = low + 1.0
+        else:
+            tag = (low + high) / 2
+        self._set_tag(node, self.scheduler.reprioritize(node.queue_id, tag=tag))
+
+    @staticmethod
+    def _make_queue_id(video_id):
+        suffix = "".join(random.choices(string.ascii_lowercase + string.digits, k=9))
+        return f"{video_id}-{int(time.time() * 1000)}-{suffix}"
+
+    # --- operations ---
+
+    def add(self, video):
+        """Queues a video; raises QueueRejected when the scheduling policy refuses it"""
+        with self._lock:
+            self._get_db()
+            item = dict(video, queueId=video.get("queueId") or self._make_queue_id(video.get("id")))
+            if self.scheduler is not None:
+                admitted, reason = self.scheduler.admit(item)
+                if not admitted:
+                    raise QueueRejected(reason)
+
+            # Nothing playing - start the new video right away (same as the old addToQueue)
+            if self.current is None and self._head is None:
+                if self.scheduler is not None:
+                    # Counts as the requester's turn
+                    self.scheduler.push(item)
+                    self.scheduler.pop()
+                self.current = item
+                self._save_current()
+                self._commit([{"op": "current", "item": item}])
+                return item
+
+            tag = None
+            if self.scheduler is not None:
+                tag = self.scheduler.push(item)
+                anchor = self._anchor_for(tag)
+            else:
+                anchor = self._tail
+            node = _Node(item["queueId"], item, self._position_after(anchor), tag)
+            self._link_after(anchor, node)
+            self._save_item(node)
+            self._commit([{"op": "insert", "item": item, "after": anchor.queue_id if anchor else None}])
+            return item
+
+    def remove(self, queue_id):
+        with self._lock:
+            self._get_db()
+            node = self._nodes.get(queue_id)
+            if node is None:
+                return False
+            self._unlink(node)
+            self._delete_item(queue_id)
+            if self.scheduler is not None:
+                self.scheduler.remove(queue_id)
+            self._commit([{"op": "remove", "queueId": queue_id}])
+            return True
+
+    def move(self, queue_id, after_id=None):
+        """Moves an item right after after_id (None = to the front)"""
+        with self._lock:
+            self._get_db()
+            node = self._nodes.get(queue_id)
+            if node is None or after_id == queue_id:
+                return False
+            anchor = self._nodes.get(after_id) if after_id else None
+            if after_id and anchor is None:
+                return False
+            self._unlink(node)
+            node.position = self._position_after(anchor)
+            self._link_after(anchor, node)
+            self._save_position(node)
+            if self.scheduler is not None:
+                self._retag_after_move(node)
+            self._commit([{"op": "move", "queueId": queue_id, "after": after_id}])
+            return True
+
+    def reprioritize(self, queue_id, amount):
+        """
+        New donation amount for a queued item (e.g. a top-up): the scheduler retags just this
+        item and it moves to its new place. Only with a scheduling policy.
+        """
+        with self._lock:
+            self._get_db()
+            node = self._nodes.get(queue_id)
+            if node is None or self.scheduler is None:
+                return False
+            node.item["amount"] = amount
+            self._unlink(node)
+            node.tag = self.scheduler.reprioritize(queue_id, amount=amount)
+            anchor = self._anchor_for(node.tag)
+            node.position = self._position_after(anchor)
+            self._link_after(anchor, node)
+            self._save_item(node)
+            self._commit([
+                {"op": "remove", "queueId": queue_id},
+                {"op": "insert", "item": node.item, "after": anchor.queue_id if anchor else None},
+            ])
+            return True
+
+    def configure_scheduler(self, config):
+        """policy: fifo | priority | fair; tiers: [[min amount, weight], ...]; max_per_donor (0 = no cap)"""
+        with self._lock:
+            self._get_db()
+            self._set_scheduler_locked(config or {})
+            self._db.execute(
+                "INSERT OR REPLACE INTO state (key, value) VALUES ('scheduler', ?)", (json.dumps(self.scheduler_config),)
+            )
+            self._db.commit()
+            self.logger.info(f"Queue scheduling policy: {self.scheduler_config['policy']}")
+            return self._scheduler_stats_locked()
+
+    def _scheduler_stats_locked(self):
+        if self.scheduler is None:
+            return {"policy": "fifo", "queued": len(self._nodes)}
+        return self.scheduler.get_stats()
+
+    def get_scheduler_stats(self):
+        with self._lock:
+            self._get_db()
+            return self._scheduler_stats_locked()
+
+    def clear(self):
+        with self._lock:
+            self._get_db()
+            self._nodes.clear()
+            self._video_index.clear()
+            self._head = self._tail = None
+            self._index_tags.clear()
+            self._index_ids.clear()
+            if self.scheduler is not None:
+                self.scheduler.clear()
+            self._db.execute("DELETE FROM queue_items")
+            self._commit([{"op": "clear"}])
+
+    def play_next(self):
+        with self._lock:
+            self._get_db()
+            ops = []
+            if self.current:
+                self._push_history(self.current)
+                ops.append({"op": "history_push", "item": self.current})
+            node = self._head
+            if self.scheduler is not None:
+                queue_id = self.scheduler.pop()
+                node = self._nodes.get(queue_id, node) if queue_id else node
+            if node:
+                self._unlink(node)
+                self._delete_item(node.queue_id)
+                ops.append({"op": "remove", "queueId": node.queue_id})
+            self.current = node.item if node else None
+            self._save_current()
+            ops.append({"op": "current", "item": self.current})
+            self._commit(ops)
+            return self.current
+
+    def play_previous(self):
+        with self._lock:
+            self._get_db()
+            if not self.history:
+                return self.current
+            ops = []
+            if self.current:
+                tag = None
+                if self.scheduler is not None:
+                    tag = self.scheduler.push(self.current, tag=(self._tag(self._head) if self._head else self.scheduler.virtual_time) - 1.0)
+                node = _Node(self.current["queueId"], self.current, self._position_after(None), tag)
+                self._link_after(None, node)
+                self._save_item(node)
+                ops.append({"op": "insert", "item": self.current, "after": None})
+            self.current = self._pop_history()
+            self._save_current()
+            ops += [{"op": "history_pop"}, {"op": "current", "item": self.current}]
+            self._commit(ops)
+            return self.current
+
+    def set_current(self, video):
+        with self._lock:
+            self._get_db()
+            ops = []
+            if self.current:
+                self._push_history(self.current)
+                ops.append({"op": "history_push", "item": self.current})
+            if video and not video.get("queueId"):
+                video = dict(video, queueId=self._make_queue_id(video.get("id")))
+            self.current = video or None
+            self._save_current()
+            ops.append({"op": "current", "item": self.current})
+            self._commit(ops)
+            return self.current
+
+    def import_state(self, queue, current=None, history=None):
+        """One-time migration of a queue that used to live in the browser's localStorage"""
+        with self._lock:
+            self._get_db()
+            if self._head is not None or self.current is not None:
+                return False
+            for video in queue or []:
+                item = dict(video, queueId=video.get("queueId") or self._make_queue_id(video.get("id")))
+                if item["queueId"] in self._nodes:
+                    continue
+                node = _Node(item["queueId"], item, self._position_after(self._tail))
+                self._link_after(self._tail, node)
+                self._save_item(node)
+            for item in reversed(history or []):
+                self._push_history(item)
+            if self.scheduler is not None:
+                self._set_scheduler_locked(self.scheduler_config)
+            self.current = current or None
+            self._save_current()
+            self._commit([{"op": "reset"}])
+            self.logger.info(f"Imported {len(self._nodes)} queued item(s) from the browser")
+            return True
+
+    def find_video(self, video_id, history_window=HISTORY_VIEW):
+        """Duplicate lookup by YouTube id: 'current', 'queue', 'history' (last N played) or None"""
+        with self._lock:
+            self._get_db()
+            if self.current and self.current.get("id") == video_id:
+                return "current"
+            if video_id in self._video_index:
+                return "queue"
+            if any(item.get("id") == video_id for item in islice(self.history, history_window)):
+                return "history"
+            return None
+
+    def upcoming(self, count):
+        """The next `count` queued items, in play order"""
+        with self._lock:
+            self._get_db()
+            return list(islice(self._iter_items(), count))
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def snapshot(self, history_view=HISTORY_VIEW):
+        with self._lock:
+            self._get_db()
+            return {
+                "version": self.version,
+                "queue": list(self._iter_items()),
+                "current": self.current,
+                "history": list(self.history)[:history_view],
+            }
+
+
+queue_store = QueueStore()
+
+
+@eel.expose
+def get_queue_snapshot():
+    return queue_store.snapshot()
+
+@eel.expose
+def queue_add(video):
+    trace_id = video.pop("trace_id", None)
+    try:
+        item = queue_store.add(video)
+    except QueueRejected as e:
+        if trace_id:
+            tracer.finish(trace_id, accepted=False)
+        return {"success": False, "reason": "queue_cap", "message": str(e)}
+    if trace_id:
+        tracer.close_gap(trace_id, SPAN_ENQUEUE)
+        tracer.finish(trace_id)
+    return {"success": True, "item": item}
+
+@eel.expose
+def queue_remove(queue_id):
+    return {"success": queue_store.remove(queue_id)}
+
+@eel.expose
+def queue_move(queue_id, after_id=None):
+    return {"success": queue_store.move(queue_id, after_id)}
+
+@eel.expose
+def queue_clear():
+    queue_store.clear()
+    return {"success": True}
+
+@eel.expose
+def queue_play_next():
+    return {"success": True, "current": queue_store.play_next()}
+
+@eel.expose
+def queue_play_previous():
+    return {"success": True, "current": queue_store.play_previous()}
+
+@eel.expose
+def queue_set_current(video):
+    return {"success": True, "current": queue_store.set_current(video)}
+
+@eel.expose
+def queue_import(queue, current=None, history=None):
+    return {"success": queue_store.import_state(queue, current, history)}
+
+@eel.expose
+def queue_reprioritize(queue_id, amount):
+    return {"success": queue_store.reprioritize(queue_id, amount)}
+
+@eel.expose
+def configure_queue_scheduler(config):
+    try:
+        return {"success": True, "stats": queue_store.configure_scheduler(config)}
+    except (ValueError, TypeError) as e:
+        return {"success": False, "message": str(e)}
+
+@eel.expose
+def get_queue_scheduler_stats():
+    return queue_store.get_scheduler_stats()
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread, current_thread, main_thread
+
+logger = logging.getLogger("PROVIDER_RUNTIME")
+
+
+class AsyncProvider:
+    """
+    Common interface for everything hosted by the runtime.
+    connect/disconnect run on the runtime loop; get_status must be cheap and thread-safe.
+    """
+    provider_id = None
+
+    async def connect(self, config):
+        raise NotImplementedError
+
+    async def disconnect(self):
+        return {"success": True}
+
+    def get_status(self):
+        return {"status": "disconnected"}
+
+
+class ProviderRuntime:
+    """
+    One asyncio event loop, running in a single background thread, that hosts all providers.
+    Eel's gevent server owns the main thread, so the loop lives next to it and the two sides talk
+    through thread-safe handoffs. Blocking library calls (requests, youtube_transcript_api) go
+    through one small shared executor instead of ad-hoc threads per provider.
+    """
+
+    def __init__(self, blocking_workers=8):
+        self.logger = logger
+        self.blocking_workers = blocking_workers
+        self.loop = None
+        self.executor = None
+        self._thread = None
+        self._lock = Lock()
+
+    def start(self):
+        with self._lock:
+            if self.loop is not None:
+                return self.loop
+            self.executor = ThreadPoolExecutor(max_workers=self.blocking_workers, thread_name_prefix="runtime-io")
+            self.loop = asyncio.new_event_loop()
+            self.loop.set_default_executor(self.executor)
+            self._thread = Thread(target=self._run_loop, name="provider-runtime", daemon=True)
+            self._thread.start()
+            self.logger.info("Provider runtime started")
+            return self.loop
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def in_loop(self):
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def submit(self, coro):
+        """Schedules a coroutine on the runtime loop from any thread; returns a concurrent Future"""
+        loop = self.start()
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def call(self, coro, timeout=None):
+        """
+        Runs a coroutine to completion and returns its result.
+        Inside a gevent greenlet (eel-exposed functions) we yield to the hub while waiting,
+        so other eel calls keep being served.
+        """
+        future = self.submit(coro)
+        try:
+            import gevent
+            from gevent import getcurrent
+            from gevent.hub import get_hub
+            # Eel serves requests from greenlets on the main thread only
+            in_greenlet = current_thread() is main_thread() and getcurrent() is not get_hub()
+        except ImportError:
+            in_greenlet = False
+
+        if in_greenlet:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not future.done():
+                gevent.sleep(0.005)
+                if deadline is not None and time.monotonic() >= deadline:
+                    future.cancel()
+                    raise TimeoutError("Runtime call timed out")
+            return future.result()
+        return future.result(timeout)
+
+    async def run_blocking(self, func, *args):
+        """Awaitable wrapper around a blocking call, executed on the shared executor"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def call_blocking(self, func, *args, timeout=None):
+        """Runs a blocking function on the shared executor without stalling the caller's greenlet"""
+        return self.call(self.run_blocking(func, *args), timeout)
+
+    def stop(self):
+        with self._lock:
+            if self.loop is None:
+                return
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+            self.executor.shutdown(wait=False)
+            self.loop = None
+            self.logger.info("Provider runtime stopped")
+
+
+runtime = ProviderRuntime()
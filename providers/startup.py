@@ -0,0 +1,208 @@
+import importlib
+import json
+import logging
+import os
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from threading import Lock, Thread
+
+from providers.storage import get_data_path
+
+logger = logging.getLogger("STARTUP")
+
+BROWSER_CACHE_FILE = "browser_modes.json"
+MISSING_BROWSER_RECHECK = 24 * 3600  # a browser installed later is picked up within a day
+PROFILE_FILE = "startup_profile.json"
+
+
+class StartupProfiler:
+    """
+    Wall-clock timing of startup phases (--profile-startup). Phases may overlap when they run
+    on different threads; marks are single points in time relative to process start.
+    """
+
+    def __init__(self, enabled=False, output=None):
+        self.enabled = enabled
+        self.output = output
+        if enabled and not output:
+            self.output = get_data_path(PROFILE_FILE)
+        self.started = time.perf_counter()
+        self.phases = []
+        self.marks = {}
+        self._lock = Lock()
+        self._written = False
+
+    def _offset_ms(self, moment):
+        return round((moment - self.started) * 1000, 2)
+
+    @contextmanager
+    def phase(self, name):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                ended = time.perf_counter()
+                with self._lock:
+                    self.phases.append({
+                        "phase": name,
+                        "start_ms": self._offset_ms(began),
+                        "duration_ms": round((ended - began) * 1000, 2),
+                    })
+
+    def mark(self, name):
+        if self.enabled:
+            with self._lock:
+                self.marks.setdefault(name, self._offset_ms(time.perf_counter()))
+
+    def report(self):
+        with self._lock:
+            return {
+                "phases": sorted(self.phases, key=lambda p: p["start_ms"]),
+                "marks": dict(self.marks),
+                "total_ms": max(self.marks.values(), default=self._offset_ms(time.perf_counter())),
+            }
+
+    def write(self):
+        """Writes the report once (later calls are ignored); returns the path or None"""
+        with self._lock:
+            if not self.enabled or self._written:
+                return None
+            self._written = True
+        report = self.report()
+        with open(self.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        for entry in report["phases"]:
+            logger.info(f"{entry['phase']:<22} +{entry['start_ms']:>9.1f} ms  {entry['duration_ms']:>9.1f} ms")
+        for name, at in report["marks"].items():
+            logger.info(f"{name:<22} +{at:>9.1f} ms")
+        logger.info(f"Startup profile written to {self.output}")
+        return self.output
+
+
+def write_profile_on_first_page(profiler, path="/eel.js"):
+    """The page asking for eel.js is the end of startup: the UI is loaded and about to connect"""
+    if not profiler.enabled:
+        return
+    import bottle
+
+    @bottle.hook("before_request")
+    def _first_page():
+        if bottle.request.path == path and not profiler._written:
+            profiler.mark("ui_requested_eel_js")
+            profiler.write()
+
+
+class LazyProviders(Mapping):
+    """
+    provider_id -> provider, where each provider is given as "module:attribute" and imported on
+    first lookup. preload() imports all of them on a background thread so the work overlaps
+    with Eel initialization instead of delaying it.
+    """
+
+    def __init__(self, specs):
+        self.specs = dict(specs)
+        self._loaded = {}
+        self._lock = Lock()
+
+    def __getitem__(self, provider_id):
+        provider = self._loaded.get(provider_id)
+        if provider is not None:
+            return provider
+        spec = self.specs[provider_id]
+        with self._lock:
+            if provider_id not in self._loaded:
+                module_name, attribute = spec.split(":")
+                self._loaded[provider_id] = getattr(importlib.import_module(module_name), attribute)
+            return self._loaded[provider_id]
+
+    def __iter__(self):
+        return iter(self.specs)
+
+    def __len__(self):
+        return len(self.specs)
+
+    def preload(self, profiler=None):
+        """Starts importing every provider module; join the returned thread before relying on them"""
+        profiler = profiler or StartupProfiler()
+
+        def load_all():
+            for provider_id in self.specs:
+                with profiler.phase(f"provider:{provider_id}"):
+                    try:
+                        self[provider_id]
+                    except Exception as e:
+                        logger.error(f"Failed to load provider {provider_id}: {e}")
+
+        thread = Thread(target=load_all, name="provider-preload", daemon=True)
+        thread.start()
+        return thread
+
+
+def _browser_module(mode):
+    from eel import chrome, edge
+    return {"chrome": chrome, "edge": edge}.get(mode)
+
+
+def _still_valid(path):
+    # Edge reports True/False instead of a path
+    return path is True or (isinstance(path, str) and os.path.exists(path))
+
+
+def detect_browser_modes(modes, cache_file=None):
+    """
+    Returns the modes from `modes` that can actually start, in the same order, and tells Eel the
+    browser paths so eel.start() does not look them up again. Lookups run in parallel; results
+    are cached between runs (found paths while they still exist, missing browsers for a day).
+    'default' and unknown modes are passed through untouched.
+    """
+    cache_file = cache_file or get_data_path(BROWSER_CACHE_FILE)
+    try:
+        with open(cache_file, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    now = time.time()
+    found, to_check = {}, []
+    for mode in modes:
+        if _browser_module(mode) is None:
+            continue
+        cached = cache.get(mode)
+        if cached and _still_valid(cached.get("path")):
+            found[mode] = cached["path"]
+        elif cached and cached.get("path") is None and now - cached.get("checked_at", 0) < MISSING_BROWSER_RECHECK:
+            found[mode] = None
+        else:
+            to_check.append(mode)
+
+    if to_check:
+        def lookup(mode):
+            try:
+                return _browser_module(mode).find_path() or None
+            except Exception as e:
+                logger.warning(f"Browser lookup for {mode} failed: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=len(to_check), thread_name_prefix="browser-detect") as pool:
+            for mode, path in zip(to_check, pool.map(lookup, to_check)):
+                found[mode] = path
+                cache[mode] = {"path": path, "checked_at": now}
+        try:
+            with open(cache_file, "w", encoding="utf-8") as f:
+                json.dump(cache, f)
+        except OSError as e:
+            logger.warning(f"Could not cache browser paths: {e}")
+
+    import eel.browsers
+    available = []
+    for mode in modes:
+        if mode not in found:
+            available.append(mode)
+        elif found[mode]:
+            eel.browsers.set_path(mode, found[mode])
+            available.append(mode)
+    logger.info(f"Browser modes available: {available} (looked up: {to_check or 'none, cached'})")
+    return available
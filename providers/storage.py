@@ -0,0 +1,31 @@
+import os
+import sys
+
+APP_DIR_NAME = "StreamPlayer"
+
+
+def get_data_dir():
+    """
+    Returns a writable per-user directory for backend state (caches, journals).
+    PyInstaller onefile unpacks into a temp dir, so we can't store anything next to the binary.
+    """
+    override = os.environ.get("STREAMPLAYER_DATA_DIR")
+    if override:
+        base = override
+    elif sys.platform == "win32":
+        base = os.path.join(os.environ.get("APPDATA", os.path.expanduser("~")), APP_DIR_NAME)
+    elif sys.platform == "darwin":
+        base = os.path.join(os.path.expanduser("~"), "Library", "Application Support", APP_DIR_NAME)
+    else:
+        xdg = os.environ.get("XDG_DATA_HOME", os.path.join(os.path.expanduser("~"), ".local", "share"))
+        base = os.path.join(xdg, APP_DIR_NAME)
+
+    os.makedirs(base, exist_ok=True)
+    return base
+
+
+def get_data_path(*parts):
+    """Path inside the data dir, creating intermediate folders"""
+    path = os.path.join(get_data_dir(), *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -0,0 +1,253 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import zlib
+from collections import OrderedDict
+from threading import Lock
+
+from providers.runtime import runtime
+from providers.storage import get_data_path
+
+logger = logging.getLogger("TRANSCRIPT_CACHE")
+
+DEFAULT_MEMORY_LIMIT = 32 * 1024 * 1024  # 32 MB of transcript text in RAM
+DEFAULT_TTL = 7 * 24 * 3600              # transcripts rarely change
+DEFAULT_NEGATIVE_TTL = 6 * 3600          # "subtitles disabled" may be fixed by the uploader
+DEFAULT_DISK_LIMIT = 256 * 1024 * 1024   # compressed payloads on disk
+PURGE_INTERVAL = 3600
+
+
+class TranscriptCache:
+    """
+    Two-tier cache for transcript results.
+    Tier 1: in-memory LRU bounded by total bytes.
+    Tier 2: SQLite table with zlib-compressed payloads that survives restarts, bounded by total
+    payload bytes. Expired rows are purged at startup and then periodically (start()).
+    Negative results (disabled / not found) are stored with their own, shorter TTL.
+    """
+
+    def __init__(self, db_path=None, memory_limit=DEFAULT_MEMORY_LIMIT,
+                 ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL, disk_limit=DEFAULT_DISK_LIMIT):
+        self.logger = logger
+        self.db_path = db_path
+        self.memory_limit = memory_limit
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.disk_limit = disk_limit
+
+        self._lru = OrderedDict()  # key -> (expires_at, size, result)
+        self._memory_bytes = 0
+        self._lock = Lock()
+        self._db = None
+        self._disk_bytes = None    # measured by purge_expired()
+        self._maintenance = None
+
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "stores": 0,
+            "purged": 0,
+            "disk_evictions": 0,
+        }
+
+    @staticmethod
+    def make_key(video_id, languages):
+        return f"{video_id}|{','.join(languages or [])}"
+
+    def _get_db(self):
+        if self._db is None:
+            path = self.db_path or get_data_path("cache", "transcripts.sqlite3")
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS transcripts ("
+                " key TEXT PRIMARY KEY,"
+                " expires_at REAL NOT NULL,"
+                " negative INTEGER NOT NULL,"
+                " payload BLOB NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def configure(self, memory_limit=None, ttl=None, negative_ttl=None, disk_limit=None):
+        with self._lock:
+            if disk_limit is not None:
+                self.disk_limit = int(disk_limit)
+            if memory_limit is not None:
+                self.memory_limit = int(memory_limit)
+                self._evict_locked()
+            if ttl is not None:
+                self.ttl = float(ttl)
+            if negative_ttl is not None:
+                self.negative_ttl = float(negative_ttl)
+
+    def get(self, video_id, languages):
+        key = self.make_key(video_id, languages)
+        now = time.time()
+
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                expires_at, size, result = entry
+                if expires_at > now:
+                    self._lru.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    if not result.get("success"):
+                        self.stats["negative_hits"] += 1
+                    return result
+                self._drop_locked(key)
+                self.stats["expired"] += 1
+
+            try:
+                row = self._get_db().execute(
+                    "SELECT expires_at, negative, payload FROM transcripts WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                self.logger.warning(f"Disk cache read failed: {e}")
+                row = None
+
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+
+            expires_at, negative, payload = row
+            if expires_at <= now:
+                self._delete_disk_locked(key)
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            result = json.loads(zlib.decompress(payload).decode("utf-8"))
+            self._put_memory_locked(key, expires_at, result)
+            self.stats["disk_hits"] += 1
+            if negative:
+                self.stats["negative_hits"] += 1
+            return result
+
+    def put(self, video_id, languages, result, negative=False):
+        key = self.make_key(video_id, languages)
+        expires_at = time.time() + (self.negative_ttl if negative else self.ttl)
+        payload = zlib.compress(json.dumps(result, ensure_ascii=False).encode("utf-8"))
+
+        with self._lock:
+            self._put_memory_locked(key, expires_at, result)
+            try:
+                db = self._get_db()
+                db.execute(
+                    "INSERT OR REPLACE INTO transcripts (key, expires_at, negative, payload) VALUES (?, ?, ?, ?)",
+                    (key, expires_at, int(negative), payload)
+                )
+                db.commit()
+            except sqlite3.Error as e:
+                self.logger.warning(f"Disk cache write failed: {e}")
+            self.stats["stores"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            self._memory_bytes = 0
+            try:
+                db = self._get_db()
+                db.execute("DELETE FROM transcripts")
+                db.commit()
+            except sqlite3.Error as e:
+                self.logger.warning(f"Disk cache clear failed: {e}")
+
+    def purge_expired(self):
+        """
+        Removes expired rows from disk, then the ones closest to expiry while the table is over
+        disk_limit. Returns how many rows were dropped.
+        """
+        with self._lock:
+            try:
+                db = self._get_db()
+                dropped = db.execute("DELETE FROM transcripts WHERE expires_at <= ?", (time.time(),)).rowcount
+                self.stats["purged"] += dropped
+
+                total, over_limit = 0, []
+                for key, size in db.execute(
+                    "SELECT key, LENGTH(payload) FROM transcripts ORDER BY expires_at DESC"
+                ):
+                    if total + size > self.disk_limit:
+                        over_limit.append((key,))
+                    else:
+                        total += size
+                if over_limit:
+                    db.executemany("DELETE FROM transcripts WHERE key = ?", over_limit)
+                    self.stats["disk_evictions"] += len(over_limit)
+                db.commit()
+                self._disk_bytes = total
+                return dropped + len(over_limit)
+            except sqlite3.Error as e:
+                self.logger.warning(f"Disk cache purge failed: {e}")
+                return 0
+
+    def start(self, interval=PURGE_INTERVAL):
+        """Purges now and then every `interval` seconds on the provider runtime"""
+        if self._maintenance is not None:
+            return
+
+        async def maintain():
+            while True:
+                dropped = await runtime.run_blocking(self.purge_expired)
+                if dropped:
+                    self.logger.info(f"Purged {dropped} transcript(s) from the disk cache")
+                await asyncio.sleep(interval)
+
+        self._maintenance = runtime.submit(maintain())
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_entries"] = len(self._lru)
+            stats["memory_bytes"] = self._memory_bytes
+            stats["memory_limit"] = self.memory_limit
+            stats["disk_bytes"] = self._disk_bytes
+            stats["disk_limit"] = self.disk_limit
+            lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+            stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+            return stats
+
+    # --- internal helpers (caller holds the lock) ---
+
+    @staticmethod
+    def _sizeof(key, result):
+        return len(key) + len(result.get("transcript") or "") + len(result.get("message") or "") + 64
+
+    def _put_memory_locked(self, key, expires_at, result):
+        if key in self._lru:
+            self._drop_locked(key)
+        size = self._sizeof(key, result)
+        if size > self.memory_limit:
+            # Bigger than the whole tier: keep it on disk only
+            return
+        self._lru[key] = (expires_at, size, result)
+        self._memory_bytes += size
+        self._evict_locked()
+
+    def _drop_locked(self, key):
+        _, size, _ = self._lru.pop(key)
+        self._memory_bytes -= size
+
+    def _evict_locked(self):
+        while self._memory_bytes > self.memory_limit and self._lru:
+            _, (_, size, _) = self._lru.popitem(last=False)
+            self._memory_bytes -= size
+            self.stats["evictions"] += 1
+
+    def _delete_disk_locked(self, key):
+        try:
+            db = self._get_db()
+            db.execute("DELETE FROM transcripts WHERE key = ?", (key,))
+            db.commit()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Disk cache delete failed: {e}")
+
+
+transcript_cache = TranscriptCache()
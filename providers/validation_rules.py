@@ -0,0 +1,309 @@
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from providers.keyword_matcher import AhoCorasick, normalize_text
+
+logger = logging.getLogger("VALIDATION_RULES")
+
+# Stages run in this order; a stage only runs when every rule of the previous one passed
+STAGE_DONATION = "donation"   # no network: amount, URL blacklist, duplicates
+STAGE_METADATA = "metadata"   # needs the videos.list item: channel, duration, views, likes, title
+STAGE_CONTENT = "content"     # transcript download + scan
+STAGES = (STAGE_DONATION, STAGE_METADATA, STAGE_CONTENT)
+
+PLAN_CACHE_SIZE = 16
+
+DURATION_RE = re.compile(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?")
+VIDEO_ID_RE = re.compile(r"(?:youtube\.com/(?:[^/]+/.+/|(?:v|e(?:mbed)?|shorts)/|.*[?&]v=)|youtu\.be/)([^\"&?/\s]{11})")
+CHANNEL_ID_RE = re.compile(r"youtube\.com/channel/(UC[\w-]{22})")
+HANDLE_RE = re.compile(r"youtube\.com/(@[\w.-]+)")
+BARE_VIDEO_ID_RE = re.compile(r"^[\w-]{11}$")
+BARE_CHANNEL_ID_RE = re.compile(r"^UC[\w-]{22}$")
+
+
+def parse_duration(value):
+    """ISO 8601 duration from contentDetails (PT1H2M3S) -> seconds; None if unparsable"""
+    match = DURATION_RE.fullmatch(value or "")
+    if not match:
+        return None
+    days, hours, minutes, seconds = (int(g or 0) for g in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def parse_blacklisted_urls(entries):
+    """Splits the URL blacklist into video ids, channel ids and @handles"""
+    video_ids, channel_ids, handles = set(), set(), set()
+    for entry in entries or []:
+        entry = (entry or "").strip()
+        if not entry:
+            continue
+        if m := CHANNEL_ID_RE.search(entry):
+            channel_ids.add(m.group(1))
+        elif m := HANDLE_RE.search(entry):
+            handles.add(m.group(1).lower())
+        elif m := VIDEO_ID_RE.search(entry):
+            video_ids.add(m.group(1))
+        elif entry.startswith("@"):
+            handles.add(entry.lower())
+        elif BARE_CHANNEL_ID_RE.match(entry):
+            channel_ids.add(entry)
+        elif BARE_VIDEO_ID_RE.match(entry):
+            video_ids.add(entry)
+        else:
+            logger.warning(f"Unrecognized blacklist entry ignored: {entry}")
+    return video_ids, channel_ids, handles
+
+
+class Rule:
+    """
+    One predicate of a plan. check(ctx) returns None (pass) or (reason, detail).
+    fail_closed: a check that raises rejects the video (blacklists, moderation) instead of passing it.
+    """
+    __slots__ = ("name", "stage", "cost", "check", "per_video", "fail_closed")
+
+    def __init__(self, name, stage, cost, check, per_video=True, fail_closed=False):
+        self.name = name
+        self.stage = stage
+        self.cost = cost
+        self.check = check
+        self.per_video = per_video
+        self.fail_closed = fail_closed
+
+
+class RuleTrace:
+    """Per-evaluation record: which rules ran, how long they took, which failed and why we stopped"""
+    __slots__ = ("timings", "rejection", "errors")
+
+    def __init__(self):
+        self.timings = {}
+        self.rejection = None
+        self.errors = {}  # rule name -> error message
+
+    def to_dict(self):
+        return {
+            "timings_ms": {name: round(ms, 3) for name, ms in self.timings.items()},
+            "rejection": self.rejection,
+            "errors": dict(self.errors),
+        }
+
+
+class RulePlan:
+    """
+    Filters compiled into an ordered list of rules per stage (cheapest first).
+    Everything that can be precomputed - thresholds, blacklist sets, the keyword automaton,
+    @handle -> channel id - is built once here, so evaluating a video is only the predicate calls.
+    A channel's title is not its handle, so @handles only match once handle_resolver(handle)
+    has turned them into channel ids; the ones it could not resolve are kept in unresolved_handles.
+    """
+
+    def __init__(self, filters, duplicate_lookup=None, handle_resolver=None):
+        self.filters = filters
+        self.rules = {stage: [] for stage in STAGES}
+        self.stats = {}
+        self._lock = Lock()
+
+        min_amount = float(filters.get("min_amount") or 0)
+        min_views = int(filters.get("min_views") or 0)
+        min_likes = int(filters.get("min_likes") or 0)
+        min_duration = int(filters.get("min_duration") or 0)
+        max_duration = int(filters.get("max_duration") or 0)
+        keywords = [k for k in (filters.get("keywords") or []) if k and k.strip()]
+        video_ids, channel_ids, handles = parse_blacklisted_urls(filters.get("blacklisted_urls"))
+        handle_channels, self.unresolved_handles, self.resolve_incomplete = self._resolve_handles(handles, handle_resolver)
+        channel_ids |= set(handle_channels)
+        self.automaton = AhoCorasick(keywords) if keywords else None
+
+        # --- donation stage ---
+        if min_amount > 0:
+            def check_amount(ctx):
+                amount = float((ctx.get("donation") or {}).get("amount") or 0)
+                if amount < min_amount:
+                    return "amount", {"current": amount, "min": min_amount}
+            self._add("min_amount", STAGE_DONATION, 0, check_amount, per_video=False)
+
+        if video_ids:
+            def check_video_url(ctx):
+                if ctx["video_id"] in video_ids:
+                    return "blacklisted_url", {"video_id": ctx["video_id"]}
+            self._add("blacklisted_video", STAGE_DONATION, 1, check_video_url, fail_closed=True)
+
+        if duplicate_lookup and not filters.get("allow_duplicates"):
+            def check_duplicate(ctx):
+                where = duplicate_lookup(ctx["video_id"])
+                if where:
+                    return "duplicate", {"where": where}
+            self._add("duplicate", STAGE_DONATION, 2, check_duplicate)
+
+        # --- metadata stage ---
+        if channel_ids:
+            def check_channel(ctx):
+                snippet = ctx["item"].get("snippet", {})
+                channel_id = snippet.get("channelId")
+                if channel_id in channel_ids:
+                    detail = {"channel_id": channel_id, "channel": snippet.get("channelTitle")}
+                    if channel_id in handle_channels:
+                        detail["handle"] = handle_channels[channel_id]
+                    return "blacklisted_channel", detail
+            self._add("blacklisted_channel", STAGE_METADATA, 1, check_channel, fail_closed=True)
+
+        if min_duration or max_duration:
+            def check_duration(ctx):
+                seconds = parse_duration(ctx["item"].get("contentDetails", {}).get("duration"))
+                if seconds is None or seconds == 0:
+                    return None  # live streams / premieres report P0D - leave them to other rules
+                if min_duration and seconds < min_duration:
+                    return "duration", {"current": seconds, "min": min_duration}
+                if max_duration and seconds > max_duration:
+                    return "duration", {"current": seconds, "max": max_duration}
+            self._add("duration", STAGE_METADATA, 2, check_duration)
+
+        if min_views:
+            def check_views(ctx):
+                views = int(ctx["item"].get("statistics", {}).get("viewCount", 0) or 0)
+                if views < min_views:
+                    return "views", {"current": views, "min": min_views}
+            self._add("min_views", STAGE_METADATA, 3, check_views)
+
+        if min_likes:
+            def check_likes(ctx):
+                likes = int(ctx["item"].get("statistics", {}).get("likeCount", 0) or 0)
+                if likes < min_likes:
+                    return "likes", {"current": likes, "min": min_likes}
+            self._add("min_likes", STAGE_METADATA, 3, check_likes)
+
+        if self.automaton:
+            def check_title(ctx):
+                title = ctx["item"].get("snippet", {}).get("title", "")
+                for idx, start, end in self.automaton.iter_matches(normalize_text(title)):
+                    return "blacklist", {"source": "title", "term": self.automaton.terms[idx]}
+            self._add("title_keywords", STAGE_METADATA, 5, check_title, fail_closed=True)
+
+        # --- content stage ---
+        if self.automaton and filters.get("captions_enabled", True):
+            def check_transcript(ctx):
+                result = ctx["transcript_source"](ctx["video_id"])
+                if not result.get("success"):
+                    return None  # no captions - nothing to scan
+                for idx, start, end in self.automaton.iter_matches(normalize_text(result["transcript"])):
+                    return "blacklist", {"source": "transcript", "term": self.automaton.terms[idx]}
+            self._add("transcript_keywords", STAGE_CONTENT, 100, check_transcript, fail_closed=True)
+
+        for rules in self.rules.values():
+            rules.sort(key=lambda rule: rule.cost)
+
+    @staticmethod
+    def _resolve_handles(handles, handle_resolver):
+        """
+        ({channel id: handle}, sorted handles that did not resolve, whether any lookup could not be made).
+        A handle YouTube does not know stays unresolved for good; a failed or impossible lookup is retried.
+        """
+        resolved, unresolved, incomplete = {}, [], False
+        for handle in sorted(handles):
+            channel_id = None
+            if handle_resolver is None:
+                incomplete = True
+            else:
+                try:
+                    channel_id = handle_resolver(handle)
+                except Exception as e:
+                    incomplete = True
+                    logger.warning(f"Could not resolve blacklisted handle {handle}: {e}")
+            if channel_id:
+                resolved[channel_id] = handle
+            else:
+                unresolved.append(handle)
+        if unresolved and handle_resolver is not None:
+            logger.warning(f"Blacklisted handles not resolved to a channel, they will not match: {', '.join(unresolved)}")
+        return resolved, unresolved, incomplete
+
+    def _add(self, name, stage, cost, check, per_video=True, fail_closed=False):
+        self.rules[stage].append(Rule(name, stage, cost, check, per_video, fail_closed))
+        self.stats[name] = {"calls": 0, "rejected": 0, "errors": 0, "total_ms": 0.0}
+
+    def has_stage(self, stage):
+        return bool(self.rules[stage])
+
+    def evaluate(self, stage, ctx, trace=None, per_video=True):
+        """
+        Runs one stage; stops at the first failing rule. Returns (reason, detail) or None.
+        per_video=False only runs the rules that depend on the donation alone (before any video id is known).
+        A rule that raises is recorded in trace.errors; fail-closed rules then reject with reason "rule_error".
+        """
+        trace = trace or RuleTrace()
+        for rule in self.rules[stage]:
+            if not per_video and rule.per_video:
+                continue
+            started = time.perf_counter()
+            error = None
+            try:
+                outcome = rule.check(ctx)
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                trace.errors[rule.name] = error
+                logger.warning(f"Rule {rule.name} failed for {ctx.get('video_id')}: {error}")
+                outcome = ("rule_error", {"error": error}) if rule.fail_closed else None
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            trace.timings[rule.name] = trace.timings.get(rule.name, 0.0) + elapsed_ms
+
+            with self._lock:
+                stats = self.stats[rule.name]
+                stats["calls"] += 1
+                stats["total_ms"] += elapsed_ms
+                if error is not None:
+                    stats["errors"] += 1
+                if outcome:
+                    stats["rejected"] += 1
+
+            if outcome:
+                reason, detail = outcome
+                trace.rejection = {"rule": rule.name, "reason": reason, "detail": detail}
+                return outcome
+        return None
+
+    def describe(self):
+        return {stage: [rule.name for rule in rules] for stage, rules in self.rules.items()}
+
+    def get_stats(self):
+        with self._lock:
+            return {name: dict(s, total_ms=round(s["total_ms"], 3)) for name, s in self.stats.items()}
+
+
+class RuleEngine:
+    """
+    Compiles filter settings into RulePlans and keeps the last few around.
+    handle_resolver(handle, api_key) -> channel id or None; blacklisted @handles need an API key,
+    so a plan whose handle lookups could not all be made is not cached and the next compile retries them.
+    """
+
+    def __init__(self, duplicate_lookup=None, cache_size=PLAN_CACHE_SIZE, handle_resolver=None):
+        self.logger = logger
+        self.duplicate_lookup = duplicate_lookup
+        self.handle_resolver = handle_resolver
+        self.cache_size = cache_size
+        self._plans = OrderedDict()
+        self._lock = Lock()
+
+    def compile(self, filters, api_key=None):
+        key = json.dumps(filters or {}, sort_keys=True, default=str)
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                return plan
+
+        resolver = None
+        if self.handle_resolver is not None and api_key:
+            resolver = lambda handle: self.handle_resolver(handle, api_key)
+        plan = RulePlan(filters or {}, self.duplicate_lookup, resolver)
+        if plan.resolve_incomplete:
+            return plan
+        with self._lock:
+            self._plans[key] = plan
+            while len(self._plans) > self.cache_size:
+                self._plans.popitem(last=False)
+        self.logger.info(f"Compiled validation plan: {plan.describe()}")
+        return plan
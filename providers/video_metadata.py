@@ -0,0 +1,243 @@
+import eel
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
+
+from providers.queue_store import queue_store
+from providers.runtime import runtime
+from providers.youtube_data import youtube_data_client, chunked, MAX_IDS_PER_CALL
+
+logger = logging.getLogger("VIDEO_METADATA")
+
+STATIC_TTL = 7 * 24 * 3600   # snippet + contentDetails (title, thumbnails, duration) rarely change
+STATS_TTL = 10 * 60          # view/like counts drift, but minutes-old numbers are fine for filters
+NOT_FOUND_TTL = 10 * 60      # private/deleted videos
+MAX_ENTRIES = 5000
+QUOTA_UNITS_PER_CALL = 1     # videos.list costs 1 unit per request regardless of ids/parts
+DUPLICATE_HISTORY_WINDOW = 50
+
+
+class _Entry:
+    __slots__ = ("static", "static_expires", "statistics", "stats_expires")
+
+    def __init__(self):
+        self.static = None
+        self.static_expires = 0.0
+        self.statistics = None
+        self.stats_expires = 0.0
+
+
+class VideoMetadataCache:
+    """
+    Cache in front of videos.list, keyed by video id.
+    snippet/contentDetails and statistics expire separately: when only statistics are stale we
+    refetch part=statistics. Concurrent callers asking for the same id share one in-flight request.
+    Exposes the same fetch_videos(ids, api_key) / resolve_handle(handle, api_key) interface as YoutubeDataClient.
+    """
+
+    def __init__(self, data_client, static_ttl=STATIC_TTL, stats_ttl=STATS_TTL,
+                 not_found_ttl=NOT_FOUND_TTL, max_entries=MAX_ENTRIES):
+        self.logger = logger
+        self.data_client = data_client
+        self.static_ttl = static_ttl
+        self.stats_ttl = stats_ttl
+        self.not_found_ttl = not_found_ttl
+        self.max_entries = max_entries
+
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}  # video_id -> Future(item or None)
+
+        self.stats = {
+            "hits": 0,
+            "stats_refreshes": 0,
+            "misses": 0,
+            "not_found_hits": 0,
+            "inflight_joins": 0,
+            "api_calls": 0,
+            "quota_units_used": 0,
+            "quota_units_saved": 0,
+            "evictions": 0,
+        }
+
+    def configure(self, static_ttl=None, stats_ttl=None, max_entries=None):
+        with self._lock:
+            if static_ttl is not None:
+                self.static_ttl = float(static_ttl)
+            if stats_ttl is not None:
+                self.stats_ttl = float(stats_ttl)
+            if max_entries is not None:
+                self.max_entries = int(max_entries)
+                self._evict_locked()
+
+    def _evict_locked(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    @staticmethod
+    def _merge(entry):
+        if entry.static is None:
+            return None
+        return dict(entry.static, statistics=entry.statistics or {})
+
+    def _store_locked(self, video_id, item, now, stats_only):
+        entry = self._entries.get(video_id)
+        if entry is None:
+            entry = self._entries[video_id] = _Entry()
+        self._entries.move_to_end(video_id)
+
+        if item is None:
+            entry.static, entry.statistics = None, None
+            entry.static_expires = entry.stats_expires = now + self.not_found_ttl
+            return
+        if not stats_only:
+            entry.static = {k: v for k, v in item.items() if k != "statistics"}
+            entry.static_expires = now + self.static_ttl
+        entry.statistics = item.get("statistics", {})
+        entry.stats_expires = now + self.stats_ttl
+        self._evict_locked()
+
+    def fetch_videos(self, video_ids, api_key):
+        """Returns a dict video_id -> videos.list item; unknown/private ids are absent"""
+        now = time.time()
+        unique_ids = list(dict.fromkeys(video_ids))
+        result, waiting, full_fetch, stats_fetch = {}, {}, [], []
+
+        with self._lock:
+            for video_id in unique_ids:
+                entry = self._entries.get(video_id)
+                if entry is not None and entry.static_expires > now and entry.stats_expires > now:
+                    self._entries.move_to_end(video_id)
+                    item = self._merge(entry)
+                    if item is None:
+                        self.stats["not_found_hits"] += 1
+                    else:
+                        self.stats["hits"] += 1
+                        result[video_id] = item
+                    continue
+
+                future = self._inflight.get(video_id)
+                if future is not None:
+                    self.stats["inflight_joins"] += 1
+                    waiting[video_id] = future
+                    continue
+
+                self._inflight[video_id] = Future()
+                if entry is not None and entry.static is not None and entry.static_expires > now:
+                    self.stats["stats_refreshes"] += 1
+                    stats_fetch.append(video_id)
+                else:
+                    self.stats["misses"] += 1
+                    full_fetch.append(video_id)
+
+        if full_fetch and stats_fetch:
+            # Quota is per request, not per part: ride along with the full fetch instead of a 2nd call
+            full_fetch += stats_fetch
+            stats_fetch = []
+
+        calls = 0
+        try:
+            for part, ids, stats_only in (
+                ("snippet,statistics,contentDetails", full_fetch, False),
+                ("statistics", stats_fetch, True),
+            ):
+                for batch in chunked(ids, MAX_IDS_PER_CALL):
+                    items = self.data_client.fetch_videos(batch, api_key, part=part)
+                    calls += 1
+                    fetched_at = time.time()
+                    with self._lock:
+                        for video_id in batch:
+                            self._store_locked(video_id, items.get(video_id), fetched_at, stats_only)
+                            item = self._merge(self._entries[video_id])
+                            self._inflight.pop(video_id).set_result(item)
+                            if item is not None:
+                                result[video_id] = item
+        except Exception as e:
+            # Callers that joined our requests get the same error
+            with self._lock:
+                for video_id in full_fetch + stats_fetch:
+                    future = self._inflight.pop(video_id, None)
+                    if future is not None:
+                        future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self.stats["api_calls"] += calls
+                self.stats["quota_units_used"] += calls * QUOTA_UNITS_PER_CALL
+                would_be = -(-len(unique_ids) // MAX_IDS_PER_CALL)
+                self.stats["quota_units_saved"] += max(0, would_be - calls) * QUOTA_UNITS_PER_CALL
+
+        for video_id, future in waiting.items():
+            item = future.result()
+            if item is not None:
+                result[video_id] = item
+        return result
+
+    def resolve_handle(self, handle, api_key):
+        """Not cached here: compiled rule plans keep the resolved channel ids"""
+        try:
+            return self.data_client.resolve_handle(handle, api_key)
+        finally:
+            with self._lock:
+                self.stats["api_calls"] += 1
+                self.stats["quota_units_used"] += QUOTA_UNITS_PER_CALL
+
+    def invalidate(self, video_id=None):
+        with self._lock:
+            if video_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(video_id, None)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+            stats["inflight"] = len(self._inflight)
+            lookups = stats["hits"] + stats["not_found_hits"] + stats["stats_refreshes"] + stats["misses"] + stats["inflight_joins"]
+            stats["hit_ratio"] = round((stats["hits"] + stats["not_found_hits"] + stats["inflight_joins"]) / lookups, 4) if lookups else 0.0
+            return stats
+
+
+video_metadata = VideoMetadataCache(youtube_data_client)
+
+
+def find_duplicate(video_id, history_window=DUPLICATE_HISTORY_WINDOW):
+    """Where the video already is ('current' / 'queue' / 'history') or None; no network involved"""
+    return queue_store.find_video(video_id, history_window)
+
+
+@eel.expose
+def get_video_details(video_id, api_key, allow_duplicates=False):
+    """Single-video lookup for the UI: duplicate check first, then the cached videos.list"""
+    if not allow_duplicates:
+        where = find_duplicate(video_id)
+        if where:
+            return {"success": False, "duplicate": where, "message": f"Video is already in {where}"}
+    if not api_key:
+        return {"success": False, "message": "Missing YouTube API key"}
+    try:
+        items = runtime.call_blocking(video_metadata.fetch_videos, [video_id], api_key)
+    except Exception as e:
+        logger.error(f"Metadata fetch failed for {video_id}: {e}")
+        return {"success": False, "message": str(e)}
+    item = items.get(video_id)
+    if item is None:
+        return {"success": False, "not_found": True, "message": "Video not found"}
+    return {"success": True, "item": item}
+
+@eel.expose
+def get_video_metadata_stats():
+    return video_metadata.get_stats()
+
+@eel.expose
+def configure_video_metadata_cache(config):
+    video_metadata.configure(
+        static_ttl=config.get('static_ttl'),
+        stats_ttl=config.get('stats_ttl'),
+        max_entries=config.get('max_entries')
+    )
+    return {"success": True, "stats": video_metadata.get_stats()}
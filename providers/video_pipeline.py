@@ -0,0 +1,576 @@
+import bisect
+import eel
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Event, Lock, Thread
+
+from providers.event_bus import send_to_ui
+from providers.metrics import tracer, SPAN_ENQUEUE, SPAN_FILTER, SPAN_METADATA, SPAN_TRANSCRIPT, SPAN_UI_DISPATCH
+from providers.runtime import runtime
+from providers.validation_rules import RuleEngine, RuleTrace, STAGE_CONTENT, STAGE_DONATION, STAGE_METADATA
+from providers.video_metadata import video_metadata, find_duplicate
+from providers.youtube_data import youtube_data_client, chunked, MAX_IDS_PER_CALL
+
+logger = logging.getLogger("VIDEO_PIPELINE")
+
+
+def build_video_item(video_id, item, donation):
+    """Converts a videos.list item into the VideoItem shape used by the React queue"""
+    snippet = item.get("snippet", {})
+    thumbnails = snippet.get("thumbnails", {})
+    thumbnail = (thumbnails.get("high") or thumbnails.get("default") or {}).get("url")
+    video = {
+        "id": video_id,
+        "url": f"https://www.youtube.com/watch?v={video_id}",
+        "title": snippet.get("title", ""),
+        "requester": donation.get("username", "Anonymous"),
+        "amount": donation.get("amount", 0),
+        "duration": item.get("contentDetails", {}).get("duration", ""),
+        "thumbnail": thumbnail,
+    }
+    # Carried through the UI back into queue_add, which closes the donation trace
+    if donation.get("trace_id"):
+        video["trace_id"] = donation["trace_id"]
+    return video
+
+
+class ValidationJob:
+    """
+    State of one validation run; emits accepted items strictly in input order.
+    With a limit, items that can no longer make it into the first `limit` accepted ones are skipped.
+    """
+
+    def __init__(self, job_id, video_ids, on_accept, on_reject, limit=None):
+        self.job_id = job_id
+        self.video_ids = video_ids
+        self.on_accept = on_accept
+        self.on_reject = on_reject
+        self.limit = limit
+        self.results = [None] * len(video_ids)  # (accepted, payload) per index; accepted=None - skipped
+        self.next_index = 0
+        self.accepted = 0
+        self.rejected = []
+        self.skipped = 0
+        self._accepted_indexes = []  # sorted, every index resolved as accepted so far
+        self.started_at = time.perf_counter()
+        self.first_accept_ms = None
+        self.timings = {"metadata_ms": 0.0, "metadata_calls": 0, "transcript_ms": 0.0, "transcript_calls": 0, "filter_ms": 0.0}
+        self._lock = Lock()
+
+    def add_timing(self, key, elapsed, counter=None):
+        with self._lock:
+            self.timings[key] += elapsed * 1000
+            if counter:
+                self.timings[counter] += 1
+
+    def add_rule_timings(self, trace):
+        if not trace.timings:
+            return
+        with self._lock:
+            rules = self.timings.setdefault("rules", {})
+            for name, elapsed_ms in trace.timings.items():
+                rules[name] = rules.get(name, 0.0) + elapsed_ms
+            if trace.errors:
+                # Rules that raised; fail-open ones let the video through, so make them visible in the summary
+                errors = self.timings.setdefault("rule_errors", {})
+                for name in trace.errors:
+                    errors[name] = errors.get(name, 0) + 1
+
+    def past_limit(self, indexes):
+        """True once `limit` items before all of these indexes are accepted - validating them is wasted work"""
+        with self._lock:
+            if self.limit is None:
+                return False
+            if self.limit <= 0:
+                return True
+            if len(self._accepted_indexes) < self.limit:
+                return False
+            return min(indexes) > self._accepted_indexes[self.limit - 1]
+
+    def skip(self, indexes):
+        for index in indexes:
+            self.resolve(index, None, None)
+
+    def resolve(self, index, accepted, payload):
+        """Stores a result and flushes every contiguous resolved item to the callbacks"""
+        with self._lock:
+            self.results[index] = (accepted, payload)
+            if accepted:
+                bisect.insort(self._accepted_indexes, index)
+            while self.next_index < len(self.results) and self.results[self.next_index] is not None:
+                ok, data = self.results[self.next_index]
+                if ok is None:
+                    self.skipped += 1
+                elif ok:
+                    self.accepted += 1
+                    if self.first_accept_ms is None:
+                        self.first_accept_ms = (time.perf_counter() - self.started_at) * 1000
+                    if self.on_accept:
+                        self.on_accept(self.next_index, data)
+                else:
+                    rejection = {"index": self.next_index, "id": self.video_ids[self.next_index]}
+                    rejection.update(data if isinstance(data, dict) else {"reason": data})
+                    self.rejected.append(rejection)
+                    if self.on_reject:
+                        self.on_reject(self.next_index, self.video_ids[self.next_index], data)
+                self.next_index += 1
+
+    def summary(self):
+        total_ms = (time.perf_counter() - self.started_at) * 1000
+        timings = {k: (round(v, 2) if isinstance(v, float) else v) for k, v in self.timings.items() if k != "rules"}
+        timings["rules_ms"] = {name: round(ms, 3) for name, ms in self.timings.get("rules", {}).items()}
+        timings["total_ms"] = round(total_ms, 2)
+        timings["first_accept_ms"] = round(self.first_accept_ms, 2) if self.first_accept_ms is not None else None
+        return {
+            "job_id": self.job_id,
+            "total": len(self.video_ids),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "skipped": self.skipped,
+            "timings": timings,
+        }
+
+
+class VideoValidationPipeline:
+    """
+    Validates many videos concurrently using a compiled rule plan (providers/validation_rules.py):
+    donation-level rules (no network) -> metadata in batches of 50 ids per API call -> metadata
+    rules -> transcript scan with a bounded number of parallel transcript fetches, only for
+    videos that passed everything cheaper.
+    """
+
+    def __init__(self, data_client, caption_provider=None, max_workers=8, transcript_concurrency=4):
+        self.logger = logger
+        self.data_client = data_client
+        self.caption_provider = caption_provider
+        self.rule_engine = RuleEngine(duplicate_lookup=find_duplicate, handle_resolver=data_client.resolve_handle)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="validate")
+        self.transcript_slots = BoundedSemaphore(transcript_concurrency)
+
+    def run(self, video_ids, donation, filters, api_key, on_accept=None, on_reject=None, job_id=None, limit=None):
+        """
+        Blocks until every video is resolved; callbacks fire in input order as soon as possible.
+        limit - only the first N accepted videos are needed: no metadata or transcript work is
+        started for videos behind them.
+        """
+        job = ValidationJob(job_id or uuid.uuid4().hex[:12], list(video_ids), on_accept, on_reject, limit)
+        if not job.video_ids:
+            return job.summary()
+
+        plan = self.rule_engine.compile(filters, api_key)
+        positions = {}
+        for index, video_id in enumerate(job.video_ids):
+            positions.setdefault(video_id, []).append(index)
+
+        # Cheap rules first: amount, URL blacklist and duplicates never need the network
+        unique_ids = []
+        for video_id, indexes in positions.items():
+            trace = RuleTrace()
+            rejected = plan.evaluate(STAGE_DONATION, {"video_id": video_id, "donation": donation}, trace)
+            job.add_rule_timings(trace)
+            if rejected:
+                for index in indexes:
+                    job.resolve(index, False, trace.rejection)
+            else:
+                unique_ids.append(video_id)
+
+        batch_futures = [
+            self.executor.submit(self._process_batch, job, plan, batch, positions, donation, api_key)
+            for batch in chunked(unique_ids, MAX_IDS_PER_CALL)
+        ]
+
+        item_futures = []
+        for future in batch_futures:
+            item_futures.extend(future.result())
+        for future in item_futures:
+            future.result()
+
+        summary = job.summary()
+        self.logger.info(
+            f"Job {job.job_id}: {summary['accepted']}/{summary['total']} accepted in {summary['timings']['total_ms']} ms "
+            f"(first after {summary['timings']['first_accept_ms']} ms)"
+        )
+        return summary
+
+    def _process_batch(self, job, plan, batch, positions, donation, api_key):
+        pending = []
+        for video_id in batch:
+            if job.past_limit(positions[video_id]):
+                job.skip(positions[video_id])
+            else:
+                pending.append(video_id)
+        if not pending:
+            return []
+        batch = pending
+
+        started = time.perf_counter()
+        try:
+            items = self.data_client.fetch_videos(batch, api_key)
+        except Exception as e:
+            self.logger.error(f"Metadata batch failed: {e}")
+            items = {}
+            error = str(e)
+        else:
+            error = None
+        job.add_timing("metadata_ms", time.perf_counter() - started, "metadata_calls")
+
+        futures = []
+        for video_id in batch:
+            item = items.get(video_id)
+            if item is None:
+                for index in positions[video_id]:
+                    job.resolve(index, False, {"rule": "metadata", "reason": error or "not_found"})
+                continue
+
+            started = time.perf_counter()
+            trace = RuleTrace()
+            rejected = plan.evaluate(STAGE_METADATA, {"video_id": video_id, "item": item, "donation": donation}, trace)
+            job.add_timing("filter_ms", time.perf_counter() - started)
+            job.add_rule_timings(trace)
+            if rejected:
+                for index in positions[video_id]:
+                    job.resolve(index, False, trace.rejection)
+                continue
+
+            if not plan.has_stage(STAGE_CONTENT):
+                for index in positions[video_id]:
+                    job.resolve(index, True, build_video_item(video_id, item, donation))
+                continue
+
+            if job.past_limit(positions[video_id]):
+                job.skip(positions[video_id])
+                continue
+            futures.append(self.executor.submit(self._check_content, job, plan, video_id, item, positions[video_id], donation))
+        return futures
+
+    def _fetch_transcript(self, video_id):
+        if self.caption_provider is None:
+            # YC грузится фоном вместе с остальными провайдерами (main.py), здесь - только ссылка на него
+            from providers.youtube_caption import caption_provider
+            self.caption_provider = caption_provider
+        return self.caption_provider.get_transcript(video_id, bounded=True)
+
+    def _check_content(self, job, plan, video_id, item, indexes, donation):
+        trace = RuleTrace()
+        with self.transcript_slots:
+            # Enough videos may have been accepted while this one waited for a slot
+            if job.past_limit(indexes):
+                job.skip(indexes)
+                return
+            started = time.perf_counter()
+            ctx = {"video_id": video_id, "item": item, "donation": donation, "transcript_source": self._fetch_transcript}
+            plan.evaluate(STAGE_CONTENT, ctx, trace)
+            job.add_timing("transcript_ms", time.perf_counter() - started, "transcript_calls")
+        job.add_rule_timings(trace)
+
+        for index in indexes:
+            if trace.rejection:
+                job.resolve(index, False, trace.rejection)
+            else:
+                job.resolve(index, True, build_video_item(video_id, item, donation))
+
+    def validate_one(self, video_id, donation, filters, api_key):
+        """Synchronous single-video check for the UI; returns the verdict with the rejection reason"""
+        trace_id = donation.get("trace_id")
+        tracer.close_gap(trace_id, SPAN_UI_DISPATCH)
+
+        accepted = []
+        summary = self.run([video_id], donation, filters, api_key, on_accept=lambda index, video: accepted.append(video))
+        rejection = summary["rejected"][0] if summary["rejected"] else None
+
+        if trace_id:
+            self._record_trace_spans(trace_id, summary["timings"])
+            if accepted:
+                tracer.mark(trace_id, SPAN_ENQUEUE)
+            else:
+                tracer.finish(trace_id, accepted=False)
+        return {
+            "accepted": bool(accepted),
+            "video": accepted[0] if accepted else None,
+            "rejection": rejection,
+            "timings": summary["timings"],
+        }
+
+    @staticmethod
+    def _record_trace_spans(trace_id, timings):
+        rules_ms = timings.get("rules_ms", {})
+        if timings.get("metadata_calls"):
+            tracer.add_span(trace_id, SPAN_METADATA, timings["metadata_ms"])
+        if timings.get("transcript_calls"):
+            tracer.add_span(trace_id, SPAN_TRANSCRIPT, timings["transcript_ms"])
+        # Transcript rule time is the fetch itself - already counted above
+        tracer.add_span(trace_id, SPAN_FILTER, sum(ms for name, ms in rules_ms.items() if name != "transcript_keywords"))
+
+    def check_donation(self, donation, filters):
+        """Donation-only rules (amount); lets playlist jobs bail out before listing any page"""
+        trace = RuleTrace()
+        self.rule_engine.compile(filters).evaluate(STAGE_DONATION, {"donation": donation}, trace, per_video=False)
+        return trace.rejection
+
+    def get_rule_stats(self, filters):
+        plan = self.rule_engine.compile(filters)
+        return {"plan": plan.describe(), "rules": plan.get_stats(), "unresolved_handles": plan.unresolved_handles}
+
+
+DEFAULT_PLAYLIST_LIMITS = {
+    "max_per_donation": 50,  # None = unlimited
+    "tiers": [],             # [{"min_amount": 500, "max_videos": 20}, ...]
+    "low_watermark": 3,      # resume paused playlists when the queue has this many items or fewer
+    "resume_timeout": 3600,  # seconds a paused playlist waits for the queue to drain before it expires
+}
+
+
+def resolve_playlist_cap(limits, amount):
+    """Picks the cap of the highest amount tier the donation reaches, falling back to max_per_donation"""
+    cap = limits.get("max_per_donation")
+    best = None
+    for tier in limits.get("tiers") or []:
+        if float(amount or 0) >= float(tier.get("min_amount", 0)):
+            if best is None or float(tier.get("min_amount", 0)) > float(best.get("min_amount", 0)):
+                best = tier
+    if best is not None:
+        cap = best.get("max_videos")
+    return None if cap is None else int(cap)
+
+
+class PlaylistIngestJob:
+    def __init__(self, job_id, playlist_id, pages, donation, filters, api_key, cap, resume_timeout=None):
+        self.job_id = job_id
+        self.playlist_id = playlist_id
+        self.pages = pages
+        self.donation = donation
+        self.filters = filters
+        self.api_key = api_key
+        self.cap = cap
+        self.resume_timeout = resume_timeout
+        self.accepted = 0
+        self.rejected = 0
+        self.pages_done = 0
+        self.total_results = None
+        self.started_at = time.perf_counter()
+        self.first_video_ms = None
+        self.resume = Event()
+        self.paused = False
+        self.cancelled = False
+        self.expired = False
+
+    @property
+    def cap_reached(self):
+        return self.cap is not None and self.accepted >= self.cap
+
+    @property
+    def remaining(self):
+        return None if self.cap is None else max(self.cap - self.accepted, 0)
+
+
+class PlaylistIngestor:
+    """
+    Incremental playlist ingestion.
+    Page one is validated immediately; later pages are only requested when the UI
+    reports that the queue is draining, and ingestion stops once the donation's cap is reached.
+    """
+
+    def __init__(self, pipeline, data_client, send):
+        self.logger = logger
+        self.pipeline = pipeline
+        self.data_client = data_client
+        self.send = send
+        self.limits = dict(DEFAULT_PLAYLIST_LIMITS)
+        self.jobs = {}
+        self._lock = Lock()
+
+    def configure(self, limits):
+        with self._lock:
+            for key in DEFAULT_PLAYLIST_LIMITS:
+                if key in limits:
+                    self.limits[key] = limits[key]
+            return dict(self.limits)
+
+    def start(self, playlist_id, donation, filters, api_key, limits=None):
+        effective = dict(self.limits, **(limits or {}))
+        cap = resolve_playlist_cap(effective, donation.get("amount"))
+        job = PlaylistIngestJob(
+            uuid.uuid4().hex[:12], playlist_id,
+            self.data_client.iter_playlist_pages(playlist_id, api_key),
+            donation, filters, api_key, cap, effective.get("resume_timeout")
+        )
+        with self._lock:
+            self.jobs[job.job_id] = job
+
+        self.logger.info(f"Playlist job {job.job_id} for {playlist_id} started (cap: {cap})")
+        Thread(target=self._run, args=(job,), daemon=True).start()
+        return job.job_id
+
+    def _run(self, job):
+        error = None
+        rejection = self.pipeline.check_donation(job.donation, job.filters)
+        if rejection:
+            self.logger.info(f"Playlist job {job.job_id} skipped: {rejection['reason']}")
+            job.cancelled = True
+        try:
+            while not job.cancelled and not job.cap_reached:
+                try:
+                    video_ids, total = next(job.pages)
+                except StopIteration:
+                    break
+                job.total_results = total
+
+                summary = self.pipeline.run(
+                    video_ids, job.donation, job.filters, job.api_key,
+                    on_accept=lambda index, video: self._accept(job, video),
+                    job_id=job.job_id, limit=job.remaining
+                )
+                job.pages_done += 1
+                job.rejected += len(summary["rejected"])
+
+                if job.cap_reached:
+                    break
+
+                # Let the UI know what this page produced, then wait for the queue to drain
+                self.send('onValidationDone', self._summary(job, has_more=True, page=summary))
+                job.paused = True
+                resumed = job.resume.wait(job.resume_timeout)
+                job.resume.clear()
+                job.paused = False
+                if not resumed:
+                    # Nobody resumed or cancelled it (UI closed, queue never drained) - free the thread
+                    self.logger.info(f"Playlist job {job.job_id} expired after {job.resume_timeout} s paused")
+                    job.expired = True
+                    break
+        except Exception as e:
+            self.logger.error(f"Playlist job {job.job_id} failed: {e}")
+            error = str(e)
+        finally:
+            job.pages.close()
+            with self._lock:
+                self.jobs.pop(job.job_id, None)
+
+        summary = self._summary(job, has_more=False)
+        if error:
+            summary["error"] = error
+        if rejection:
+            summary["rejected"] = [dict(rejection, index=None, id=job.playlist_id)]
+        self.logger.info(
+            f"Playlist job {job.job_id} finished: {job.accepted} accepted over {job.pages_done} page(s), "
+            f"first video after {summary['timings']['first_video_ms']} ms"
+        )
+        self.send('onValidationDone', summary)
+
+    def _accept(self, job, video):
+        if job.cancelled or job.cap_reached:
+            return
+        job.accepted += 1
+        if job.first_video_ms is None:
+            job.first_video_ms = (time.perf_counter() - job.started_at) * 1000
+        self.send('onValidatedVideo', {"job_id": job.job_id, "video": video})
+
+    @staticmethod
+    def _summary(job, has_more, page=None):
+        return {
+            "job_id": job.job_id,
+            "playlist_id": job.playlist_id,
+            "playlist_total": job.total_results,
+            "total": job.accepted + job.rejected,
+            "accepted": job.accepted,
+            "rejected": page["rejected"] if page else [],
+            "has_more": has_more,
+            "expired": job.expired,
+            "cap": job.cap,
+            "pages": job.pages_done,
+            "timings": {
+                "first_video_ms": round(job.first_video_ms, 2) if job.first_video_ms is not None else None,
+                "total_ms": round((time.perf_counter() - job.started_at) * 1000, 2),
+                **({"page": page["timings"]} if page else {}),
+            },
+        }
+
+    def notify_queue_length(self, length):
+        """Resumes paused jobs (oldest first, one page each) once the queue is short enough"""
+        with self._lock:
+            if length > int(self.limits.get("low_watermark") or 0):
+                return 0
+            paused = [job for job in self.jobs.values() if job.paused and not job.resume.is_set()]
+        if paused:
+            paused[0].resume.set()
+        return len(paused)
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if not job:
+            return False
+        job.cancelled = True
+        job.resume.set()
+        return True
+
+
+validation_pipeline = VideoValidationPipeline(video_metadata)
+
+
+def start_validation_job(video_ids, donation, filters, api_key):
+    job_id = uuid.uuid4().hex[:12]
+
+    def on_accept(index, video):
+        send_to_ui('onValidatedVideo', {"job_id": job_id, "index": index, "video": video})
+
+    def worker():
+        try:
+            summary = validation_pipeline.run(video_ids, donation, filters, api_key, on_accept=on_accept, job_id=job_id)
+        except Exception as e:
+            logger.error(f"Validation job {job_id} failed: {e}")
+            summary = {"job_id": job_id, "total": len(video_ids), "accepted": 0, "rejected": [], "error": str(e)}
+        send_to_ui('onValidationDone', summary)
+
+    Thread(target=worker, daemon=True).start()
+    return job_id
+
+
+@eel.expose
+def validate_videos(video_ids, donation, filters, api_key):
+    """Starts a background validation job; results arrive via onValidatedVideo / onValidationDone"""
+    if not api_key:
+        return {"success": False, "message": "Missing YouTube API key"}
+    job_id = start_validation_job(video_ids, donation or {}, filters or {}, api_key)
+    return {"success": True, "job_id": job_id}
+
+
+@eel.expose
+def validate_video(video_id, donation, filters, api_key):
+    """Single video: runs the full rule plan and returns the verdict directly"""
+    if not api_key:
+        return {"accepted": False, "rejection": {"reason": "missing_api_key"}}
+    try:
+        return runtime.call_blocking(validation_pipeline.validate_one, video_id, donation or {}, filters or {}, api_key)
+    except Exception as e:
+        logger.error(f"Validation of {video_id} failed: {e}")
+        return {"accepted": False, "rejection": {"reason": "error", "detail": str(e)}}
+
+@eel.expose
+def get_validation_rule_stats(filters):
+    return validation_pipeline.get_rule_stats(filters or {})
+
+
+playlist_ingestor = PlaylistIngestor(validation_pipeline, youtube_data_client, send_to_ui)
+
+
+@eel.expose
+def ingest_playlist(playlist_id, donation, filters, api_key, limits=None):
+    """Starts lazy playlist ingestion; first page is validated right away"""
+    if not api_key:
+        return {"success": False, "message": "Missing YouTube API key"}
+    job_id = playlist_ingestor.start(playlist_id, donation or {}, filters or {}, api_key, limits)
+    return {"success": True, "job_id": job_id}
+
+@eel.expose
+def notify_queue_length(length):
+    return {"resumed": playlist_ingestor.notify_queue_length(int(length))}
+
+@eel.expose
+def configure_playlist_limits(limits):
+    return {"success": True, "limits": playlist_ingestor.configure(limits or {})}
+
+@eel.expose
+def cancel_playlist_ingestion(job_id):
+    return {"success": playlist_ingestor.cancel(job_id)}
@@ -1,46 +1,301 @@
 import eel
 import logging
-from youtube_transcript_api import YouTubeTranscriptApi
+import re
+import time
+from contextlib import closing
+from html import unescape
+from threading import Lock
+from xml.etree.ElementTree import XMLPullParser
+from providers.transcript_cache import transcript_cache
+from providers.metrics import tracer
+from providers.runtime import AsyncProvider, runtime
 
 logger = logging.getLogger("YOUTUBE_CAPTION")
 
-class YoutubeCaptionProvider:
-    def __init__(self):
+DEFAULT_LANGUAGES = ('ru', 'en')
+STREAM_CHUNK = 16 * 1024
+_TAG_RE = re.compile(r"<[^>]*>")
+
+
+def _positive_or_none(value, cast):
+    if value is None or value == '':
+        return None
+    value = cast(value)
+    return value if value > 0 else None
+
+
+class YoutubeCaptionProvider(AsyncProvider):
+    provider_id = 'YC'
+
+    def __init__(self, cache=None):
         self.logger = logger
-        self.ytt_api = YouTubeTranscriptApi()
+        self._ytt_api = None
+        self._ytt_lock = Lock()
+        self.cache = cache
+
+        # Порядок выбора дорожки: ручные субтитры по цепочке языков -> автосубтитры -> перевод
+        self.languages = list(DEFAULT_LANGUAGES)
+        self.allow_generated = True
+        self.allow_translated = True
+        # Ограничения для модерации (None = без ограничения)
+        self.max_minutes = None
+        self.max_chars = None
+        self._stream_warned = False
+
+    @property
+    def ytt_api(self):
+        """youtube_transcript_api is imported and its client built on the first uncached fetch"""
+        if self._ytt_api is None:
+            with self._ytt_lock:
+                if self._ytt_api is None:
+                    from youtube_transcript_api import YouTubeTranscriptApi
+                    self._ytt_api = YouTubeTranscriptApi()
+        return self._ytt_api
+
+    @ytt_api.setter
+    def ytt_api(self, client):
+        self._ytt_api = client
+
+    def configure(self, languages=None, allow_generated=None, allow_translated=None,
+                  max_minutes=False, max_chars=False):
+        """False leaves a limit unchanged, None/0 removes it"""
+        if languages is not None:
+            languages = [str(code).strip() for code in languages if str(code).strip()]
+            if not languages:
+                raise ValueError("At least one transcript language is required")
+            self.languages = languages
+        if allow_generated is not None:
+            self.allow_generated = bool(allow_generated)
+        if allow_translated is not None:
+            self.allow_translated = bool(allow_translated)
+        if max_minutes is not False:
+            self.max_minutes = _positive_or_none(max_minutes, float)
+        if max_chars is not False:
+            self.max_chars = _positive_or_none(max_chars, int)
+
+    def get_settings(self):
+        return {
+            "languages": list(self.languages),
+            "allow_generated": self.allow_generated,
+            "allow_translated": self.allow_translated,
+            "max_minutes": self.max_minutes,
+            "max_chars": self.max_chars,
+        }
+
+    def _limits(self, bounded):
+        if not bounded:
+            return None, None
+        max_seconds = self.max_minutes * 60 if self.max_minutes else None
+        return max_seconds, self.max_chars
 
-    def get_transcript(self, video_id, languages=['ru', 'en']):
+    def _cache_languages(self, languages, max_seconds, max_chars):
+        """The cache key covers everything that changes the result, not just the language chain"""
+        parts = list(languages)
+        parts.append(f"+auto={int(self.allow_generated)}")
+        parts.append(f"+tr={int(self.allow_translated)}")
+        if max_seconds:
+            parts.append(f"<{max_seconds:g}s")
+        if max_chars:
+            parts.append(f"<{max_chars}c")
+        return parts
+
+    def get_transcript(self, video_id, languages=None, bounded=False):
         """
         Fetches the transcript for a given YouTube video ID.
-        Tries to get the transcript in Russian first, then English.
+        Languages are tried in the configured order (manual tracks, then auto-generated, then
+        translated). bounded=True reads only the first max_minutes / max_chars (moderation).
+        Results (including "disabled"/"not found") are served from the cache when possible.
+        """
+        languages = list(languages or self.languages)
+        max_seconds, max_chars = self._limits(bounded)
+        cache_languages = self._cache_languages(languages, max_seconds, max_chars)
+        if self.cache:
+            cached = self.cache.get(video_id, cache_languages)
+            if cached is not None:
+                self.logger.info(f"Transcript cache hit for video: {video_id}")
+                return cached
+
+        started = time.perf_counter()
+        try:
+            return self._fetch_uncached(video_id, languages, cache_languages, max_seconds, max_chars)
+        finally:
+            tracer.observe("transcript_fetch", (time.perf_counter() - started) * 1000)
+
+    def select_transcript(self, transcripts, languages):
+        """
+        Picks a track from the available ones: (transcript, kind) or (None, None).
+        kind is "manual", "generated" or "translated".
+        """
+        transcripts = list(transcripts)
+        manual = {t.language_code: t for t in transcripts if not t.is_generated}
+        generated = {t.language_code: t for t in transcripts if t.is_generated}
+
+        for code in languages:
+            if code in manual:
+                return manual[code], "manual"
+        if self.allow_generated:
+            for code in languages:
+                if code in generated:
+                    return generated[code], "generated"
+        if self.allow_translated:
+            # Ручные дорожки переводятся лучше автосубтитров
+            sources = [t for t in transcripts if t.is_translatable]
+            sources.sort(key=lambda t: t.is_generated)
+            for code in languages:
+                for source in sources:
+                    if any(lang.language_code == code for lang in source.translation_languages):
+                        return source.translate(code), "translated"
+        return None, None
+
+    def _stream_snippets(self, transcript):
+        """
+        Yields (start_seconds, text) while the timedtext XML is still downloading, so a bounded
+        read can stop and drop the connection early. Falls back to a full fetch when the
+        track cannot be streamed (PO token required, other clients).
         """
+        url = getattr(transcript, "_url", None)
+        http = getattr(transcript, "_http_client", None)
+        if (not url or http is None) and not self._stream_warned:
+            # Private attributes of youtube-transcript-api (pinned in requirements.txt): after an
+            # update every bounded read silently becomes a full download, so say it once
+            self._stream_warned = True
+            self.logger.warning(
+                "Transcript streaming unavailable with this youtube-transcript-api version, "
+                "bounded reads fall back to full fetches"
+            )
+        if not url or http is None or "&exp=xpe" in url:
+            for snippet in transcript.fetch():
+                yield getattr(snippet, "start", 0.0), snippet.text
+            return
+
+        with closing(http.get(url, stream=True)) as response:
+            response.raise_for_status()
+            parser = XMLPullParser(events=("end",))
+            for chunk in response.iter_content(chunk_size=STREAM_CHUNK):
+                parser.feed(chunk)
+                for _, element in parser.read_events():
+                    if element.tag != "text":
+                        continue
+                    if element.text is not None:
+                        yield float(element.attrib.get("start", 0.0)), _TAG_RE.sub("", unescape(element.text))
+                    element.clear()
+
+    def _read_transcript(self, transcript, max_seconds, max_chars):
+        """Joined text and whether it was cut by a limit"""
+        if not max_seconds and not max_chars:
+            return ' '.join(snippet.text for snippet in transcript.fetch()), False
+
+        parts, length = [], 0
+        with closing(self._stream_snippets(transcript)) as snippets:
+            for start, text in snippets:
+                if max_seconds and start >= max_seconds:
+                    return ' '.join(parts), True
+                if max_chars and length + len(text) > max_chars:
+                    if max_chars > length:
+                        parts.append(text[:max_chars - length])
+                    return ' '.join(parts), True
+                parts.append(text)
+                length += len(text) + 1
+        return ' '.join(parts), False
+
+    def _fetch_uncached(self, video_id, languages, cache_languages, max_seconds=None, max_chars=None):
+        from youtube_transcript_api import TranscriptsDisabled, NoTranscriptFound
+
         self.logger.info(f"Fetching transcript for video: {video_id}")
         try:
-            transcript_list = self.ytt_api.fetch(video_id, languages=languages)
-            
-            full_text = ''
-            
-            for snippet in transcript_list:
-                full_text += snippet.text + ' '
+            available = list(self.ytt_api.list(video_id))
+            transcript, kind = self.select_transcript(available, languages)
+            if transcript is None:
+                codes = ', '.join(sorted({t.language_code for t in available})) or 'none'
+                self.logger.warning(f"No transcript for video {video_id} in {languages} (available: {codes})")
+                result = {"success": False, "message": f"No transcript found for requested languages (available: {codes})"}
+                if self.cache:
+                    self.cache.put(video_id, cache_languages, result, negative=True)
+                return result
+
+            full_text, truncated = self._read_transcript(transcript, max_seconds, max_chars)
 
-            self.logger.info(f"Successfully fetched transcript for {video_id} ({len(full_text)} chars)")
-            return {
+            self.logger.info(
+                f"Successfully fetched {kind} '{transcript.language_code}' transcript for {video_id} "
+                f"({len(full_text)} chars{', truncated' if truncated else ''})"
+            )
+            result = {
                 "success": True,
-                "transcript": full_text
+                "transcript": full_text,
+                "language": transcript.language_code,
+                "kind": kind,
+                "truncated": truncated
             }
+            if self.cache:
+                self.cache.put(video_id, cache_languages, result)
+            return result
             
         except TranscriptsDisabled:
             self.logger.warning(f"Transcripts are disabled for video: {video_id}")
-            return {"success": False, "message": "Subtitles are disabled"}
+            result = {"success": False, "message": "Subtitles are disabled"}
+            if self.cache:
+                self.cache.put(video_id, cache_languages, result, negative=True)
+            return result
         except NoTranscriptFound:
             self.logger.warning(f"No transcript found for video: {video_id} in languages {languages}")
-            return {"success": False, "message": "No transcript found for requested languages"}
+            result = {"success": False, "message": "No transcript found for requested languages"}
+            if self.cache:
+                self.cache.put(video_id, cache_languages, result, negative=True)
+            return result
         except Exception as e:
+            # Network errors etc. are not cached - the next request should retry
             self.logger.error(f"Error fetching transcript: {e}")
             return {"success": False, "message": str(e)}
 
-caption_provider = YoutubeCaptionProvider()
+    async def connect(self, config):
+        return {"success": True, "message": "Transcript provider is always available"}
+
+    def get_status(self):
+        return {'status': 'connected'}
+
+    async def fetch_transcript(self, video_id, languages=None, bounded=False):
+        """Awaitable variant for code running on the provider runtime"""
+        return await runtime.run_blocking(self.get_transcript, video_id, languages, bounded)
+
+caption_provider = YoutubeCaptionProvider(cache=transcript_cache)
 
 @eel.expose
 def get_video_transcript(video_id):
-    return caption_provider.get_transcript(video_id)
\ No newline at end of file
+    return runtime.call(caption_provider.fetch_transcript(video_id))
+
+@eel.expose
+def get_transcript_cache_stats():
+    return transcript_cache.get_stats()
+
+@eel.expose
+def configure_transcript_cache(config):
+    transcript_cache.configure(
+        memory_limit=config.get('memory_limit'),
+        ttl=config.get('ttl'),
+        negative_ttl=config.get('negative_ttl'),
+        disk_limit=config.get('disk_limit')
+    )
+    return {"success": True, "stats": transcript_cache.get_stats()}
+
+@eel.expose
+def configure_transcripts(config):
+    try:
+        caption_provider.configure(
+            languages=config.get('languages'),
+            allow_generated=config.get('allow_generated'),
+            allow_translated=config.get('allow_translated'),
+            max_minutes=config.get('max_minutes', False),
+            max_chars=config.get('max_chars', False)
+        )
+    except (TypeError, ValueError) as e:
+        return {"success": False, "message": str(e)}
+    return {"success": True, "settings": caption_provider.get_settings()}
+
+@eel.expose
+def get_transcript_settings():
+    return caption_provider.get_settings()
+
+@eel.expose
+def clear_transcript_cache():
+    transcript_cache.clear()
+    return {"success": True}
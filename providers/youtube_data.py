@@ -0,0 +1,94 @@
+import logging
+from providers.http_client import http_client
+
+logger = logging.getLogger("YOUTUBE_DATA")
+
+API_BASE = "https://www.googleapis.com/youtube/v3"
+MAX_IDS_PER_CALL = 50  # hard limit of videos?id= in the Data API
+
+
+def chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class YoutubeDataClient:
+    """Thin client for the YouTube Data API v3 used by the backend validation pipeline"""
+
+    def __init__(self, http=http_client):
+        self.logger = logger
+        self.http = http
+
+    def fetch_videos(self, video_ids, api_key, part="snippet,statistics,contentDetails"):
+        """
+        Fetches metadata for up to MAX_IDS_PER_CALL ids in one request.
+        Returns a dict video_id -> item; ids missing from the response are simply absent.
+        """
+        if not video_ids:
+            return {}
+        if len(video_ids) > MAX_IDS_PER_CALL:
+            raise ValueError(f"At most {MAX_IDS_PER_CALL} ids per call, got {len(video_ids)}")
+
+        response = self.http.get(
+            f"{API_BASE}/videos",
+            params={"part": part, "id": ",".join(video_ids), "key": api_key},
+            endpoint="yt.videos"
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"videos.list failed: HTTP {response.status_code}: {response.text[:200]}")
+
+        items = response.json().get("items", [])
+        self.logger.info(f"Fetched metadata for {len(items)}/{len(video_ids)} videos")
+        return {item["id"]: item for item in items}
+
+    def resolve_handle(self, handle, api_key):
+        """@handle -> channel id via channels.list forHandle; None if no channel has that handle"""
+        response = self.http.get(
+            f"{API_BASE}/channels",
+            params={"part": "id", "forHandle": handle, "key": api_key},
+            endpoint="yt.channels"
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"channels.list failed: HTTP {response.status_code}: {response.text[:200]}")
+        items = response.json().get("items") or []
+        channel_id = items[0]["id"] if items else None
+        self.logger.info(f"Handle {handle} -> {channel_id or 'no channel'}")
+        return channel_id
+
+    def iter_playlist_pages(self, playlist_id, api_key, page_size=MAX_IDS_PER_CALL):
+        """
+        Generator over playlistItems.list pages.
+        Yields (video_ids, total_results) per page and follows nextPageToken lazily -
+        the next HTTP call only happens when the consumer asks for the next page.
+        """
+        page_token = None
+        while True:
+            params = {
+                "part": "contentDetails",
+                "maxResults": page_size,
+                "playlistId": playlist_id,
+                "key": api_key
+            }
+            if page_token:
+                params["pageToken"] = page_token
+
+            response = self.http.get(f"{API_BASE}/playlistItems", params=params, endpoint="yt.playlist_items")
+            if response.status_code != 200:
+                raise RuntimeError(f"playlistItems.list failed: HTTP {response.status_code}: {response.text[:200]}")
+
+            data = response.json()
+            video_ids = [
+                item["contentDetails"]["videoId"]
+                for item in data.get("items", [])
+                if item.get("contentDetails", {}).get("videoId")
+            ]
+            total = data.get("pageInfo", {}).get("totalResults")
+            self.logger.info(f"Playlist {playlist_id}: page with {len(video_ids)} videos (total {total})")
+            yield video_ids, total
+
+            page_token = data.get("nextPageToken")
+            if not page_token:
+                return
+
+
+youtube_data_client = YoutubeDataClient()
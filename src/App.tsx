@@ -10,23 +10,33 @@ import QueueList from './components/QueueList';
 import SettingsDashboard from './components/SettingsDashboard';
 import StatusIndicator from './components/StatusIndicator';
 import i18n from './i18n';
-import { connectDonateX } from './lib/apiDonateX';
-import { addYoutubeVideoToQueue } from './lib/apiYoutube';
+import { connectDonateX, onDXConnectionStatus } from './lib/apiDonateX';
+import { configurePrefetch, onPrefetchReady, onPreloadNext, onQueueOps, syncQueue } from './lib/apiQueue';
+import { addYoutubeVideoToQueue, onValidatedVideo, onValidationDone } from './lib/apiYoutube';
 import type { Donation } from './lib/interfaces';
 import { useStore } from './store/useStore';
 import packageJson from '../package.json';
 
 // --- Global Eel Exposure ---
 
+// Journal offsets already handled in this page session (a replay can overlap with live delivery)
+const handledDonationOffsets = new Set<number>();
+
 // Define callbacks globally so Eel can find them during initialization
 // @ts-ignore
 window.onNewDonation = async (donation: Donation) => {
+    const offset = donation.journal_offset;
+    if (offset !== undefined) {
+        if (handledDonationOffsets.has(offset)) return;
+        handledDonationOffsets.add(offset);
+    }
+
     console.log('[App] 💰 New donation received:', donation);
     const store = useStore.getState();
     const { donationAlertsNotifications } = store;
 
-    // 1. Show notification
-    if (donationAlertsNotifications) {
+    // 1. Show notification (replayed donations were already announced before the restart)
+    if (donationAlertsNotifications && !donation.replayed) {
         toast.success(
             i18n.t('notifications.new_donation', {
                 username: donation.username,
@@ -40,11 +50,18 @@ window.onNewDonation = async (donation: Donation) => {
     }
 
     await addYoutubeVideoToQueue(donation);
+
+    // Acknowledge to the backend journal so it is not replayed again
+    if (offset !== undefined && window.eel) {
+        window.eel.ack_donations(offset)();
+    }
 };
 
 // @ts-ignore
-window.onDAConnectionStatus = (data: { status: string; channel?: string }) => {
+window.onDAConnectionStatus = (data: { status: string; channel?: string; account_id?: string }) => {
     console.log('[App] 🔌 DA Connection status changed:', data);
+    // Extra accounts (co-streams) are managed from the backend registry; the UI tracks the main one
+    if (data.account_id && data.account_id !== 'main') return;
 
     // Access store outside of component
     const store = useStore.getState();
@@ -60,12 +77,63 @@ window.onDAConnectionStatus = (data: { status: string; channel?: string }) => {
     }
 };
 
+// @ts-ignore
+window.onDATokenRefreshed = (data: { access_token: string; refresh_token: string; expires_at: number; account_id?: string }) => {
+    console.log('[App] 🔑 DA token refreshed by backend');
+    if (data.account_id && data.account_id !== 'main') return;
+    useStore.getState().setSettings({
+        donationAlertsToken: data.access_token,
+        donationAlertsRefreshToken: data.refresh_token,
+        donationAlertsTokenExpiry: data.expires_at,
+    });
+};
+
+// @ts-ignore
+window.onDXConnectionStatus = onDXConnectionStatus;
+
+// @ts-ignore
+window.onQueueOps = onQueueOps;
+// @ts-ignore
+window.onPrefetchReady = onPrefetchReady;
+// @ts-ignore
+window.onPreloadNext = onPreloadNext;
+
+// @ts-ignore
+window.onValidatedVideo = onValidatedVideo;
+// @ts-ignore
+window.onValidationDone = onValidationDone;
+
+// Backend events arrive batched: one onEvents call per flush window (providers/event_bus.py)
+let lastEventSeq = 0;
+
+// @ts-ignore
+window.onEvents = (batch: { events: { seq: number; type: string; data: any }[] }) => {
+    for (const event of batch.events) {
+        if (lastEventSeq && event.seq > lastEventSeq + 1) {
+            console.warn(`[App] ⚠️ Missed ${event.seq - lastEventSeq - 1} backend event(s) before #${event.seq}`);
+        }
+        lastEventSeq = Math.max(lastEventSeq, event.seq);
+
+        // @ts-ignore
+        const handler = window[event.type];
+        if (typeof handler === 'function') {
+            try {
+                handler(event.data);
+            } catch (error) {
+                console.error(`[App] Error in ${event.type} handler:`, error);
+            }
+        } else {
+            console.warn(`[App] No handler for backend event ${event.type}`);
+        }
+    }
+    // Returned value acknowledges the batch (backpressure on the Python side)
+    return lastEventSeq;
+};
+
 // Expose to Eel immediately if available
 if (window.eel) {
     // @ts-ignore
-    window.eel.expose(window.onNewDonation, 'onNewDonation');
-    // @ts-ignore
-    window.eel.expose(window.onDAConnectionStatus, 'onDAConnectionStatus');
+    window.eel.expose(window.onEvents, 'onEvents');
 } else {
     console.warn(
         '[App] window.eel not found during initial load. Callbacks might not be registered correctly if not using global window functions.'
@@ -115,6 +183,11 @@ function App() {
                 console.log('[App] ✅ Eel is ready');
                 setIsEelReady(true);
                 setHasWindow(true);
+
+                syncQueue();
+
+                // Donations received while the UI was closed or restarting
+                window.eel.replay_donations()().catch(console.error);
             })
             .catch(() => {
                 console.error('[App] ❌ Eel failed to load');
@@ -150,6 +223,10 @@ function App() {
                         if (result.success) {
                             store.setSettings({
                                 donationAlertsToken: result.access_token,
+                                donationAlertsRefreshToken: result.refresh_token || '',
+                                donationAlertsTokenExpiry: result.expires_in
+                                    ? Date.now() + result.expires_in * 1000
+                                    : 0,
                                 donationAlertsUserId: String(result.user_id),
                             });
                             toast.success('Подключено успешно!');
@@ -166,7 +243,7 @@ function App() {
             }
 
             if (store.donatexToken && store.isDXEnabled) {
-                console.log('[App] 🔄 DX connecting via SignalR...');
+                console.log('[App] 🔄 DX connecting via backend SignalR client...');
                 await connectDonateX(store.donatexToken);
             }
         };
@@ -174,6 +251,12 @@ function App() {
         initProviders();
     }, [isEelReady]);
 
+    // The prefetcher needs the API key to refresh metadata of upcoming videos
+    useEffect(() => {
+        if (!isEelReady) return;
+        configurePrefetch(store.youtubeApiKey);
+    }, [isEelReady, store.youtubeApiKey]);
+
     // Get current DA connection status on Eel ready
     useEffect(() => {
         if (!isEelReady) return;
@@ -205,7 +288,8 @@ function App() {
                         store.donationAlertsToken,
                         store.donationAlertsRefreshToken,
                         store.donationAlertsClientId,
-                        store.donationAlertsClientSecret
+                        store.donationAlertsClientSecret,
+                        store.donationAlertsTokenExpiry || undefined
                     )();
 
                     if (result.success) {
@@ -19,6 +19,7 @@ export default function FiltersDashboard({
     const store = useStore();
     const { t } = useTranslation();
     const [newKeyword, setNewKeyword] = useState('');
+    const [newUrl, setNewUrl] = useState('');
 
     const handleSave = () => {
         onClose();
@@ -49,8 +50,8 @@ export default function FiltersDashboard({
                         <h3 className="text-lg font-semibold text-zinc-800 dark:text-zinc-200">
                             {t('filters.title')}
                         </h3>
-                        <div className="grid gap-4 md:grid-cols-3">
-                            {/* <div className="space-y-2">
+                        <div className="grid gap-4 md:grid-cols-2">
+                            <div className="space-y-2">
                                 <label className="text-sm font-medium text-zinc-600 dark:text-zinc-400">
                                     {t('filters.min_donation')}
                                 </label>
@@ -66,7 +67,7 @@ export default function FiltersDashboard({
                                     }
                                     className="w-full bg-zinc-100 dark:bg-zinc-900 border border-zinc-200 dark:border-zinc-800 rounded-lg px-4 py-2 text-zinc-900 dark:text-white focus:outline-none focus:ring-2 focus:ring-indigo-500/50 transition-all"
                                 />
-                            </div> */}
+                            </div>
                             <div className="space-y-2">
                                 <label className="text-sm font-medium text-zinc-600 dark:text-zinc-400">
                                     {t('filters.min_views')}
@@ -101,6 +102,24 @@ export default function FiltersDashboard({
                                     className="w-full bg-zinc-100 dark:bg-zinc-900 border border-zinc-200 dark:border-zinc-800 rounded-lg px-4 py-2 text-zinc-900 dark:text-white focus:outline-none focus:ring-2 focus:ring-indigo-500/50 transition-all"
                                 />
                             </div>
+                            <div className="space-y-2">
+                                <label className="text-sm font-medium text-zinc-600 dark:text-zinc-400">
+                                    {t('filters.max_duration')}
+                                </label>
+                                <input
+                                    type="number"
+                                    min={0}
+                                    value={store.maxVideoDuration}
+                                    onChange={(e) =>
+                                        store.setSettings({
+                                            maxVideoDuration: Number(
+                                                e.target.value
+                                            ),
+                                        })
+                                    }
+                                    className="w-full bg-zinc-100 dark:bg-zinc-900 border border-zinc-200 dark:border-zinc-800 rounded-lg px-4 py-2 text-zinc-900 dark:text-white focus:outline-none focus:ring-2 focus:ring-indigo-500/50 transition-all"
+                                />
+                            </div>
                         </div>
                     </section>
 
@@ -184,6 +203,62 @@ export default function FiltersDashboard({
                             )}
                         </div>
                     </section>
+
+                    <div className="h-px bg-zinc-200 dark:bg-zinc-800" />
+
+                    {/* Blacklisted videos / channels */}
+                    <section className="space-y-4">
+                        <h3 className="text-lg font-semibold text-zinc-900 dark:text-white">
+                            {t('filters.blacklistUrls.title')}
+                        </h3>
+                        <p className="text-xs text-zinc-500 dark:text-zinc-400">
+                            {t('filters.blacklistUrls.subtitle')}
+                        </p>
+
+                        <div className="flex gap-2">
+                            <input
+                                className="w-full bg-zinc-100 dark:bg-zinc-900 border border-zinc-200 dark:border-zinc-800 rounded-lg px-4 py-2 text-zinc-900 dark:text-white focus:outline-none focus:ring-2 focus:ring-indigo-500/50 transition-all"
+                                placeholder="https://youtube.com/@channel, https://youtu.be/..."
+                                value={newUrl}
+                                onChange={(e) => setNewUrl(e.target.value)}
+                                onKeyDown={(e) => {
+                                    if (e.key === 'Enter' && newUrl) {
+                                        store.addBlacklistedUrl(newUrl.trim());
+                                        setNewUrl('');
+                                    }
+                                }}
+                            />
+                            <button
+                                onClick={() => {
+                                    if (newUrl) {
+                                        store.addBlacklistedUrl(newUrl.trim());
+                                        setNewUrl('');
+                                    }
+                                }}
+                                className="bg-indigo-600 hover:bg-indigo-700 text-white rounded-lg px-4 py-2 transition-colors"
+                            >
+                                <Plus className="w-5 h-5" />
+                            </button>
+                        </div>
+                        <div className="flex flex-wrap gap-2">
+                            {store.blacklistedUrls.map((url) => (
+                                <span
+                                    key={url}
+                                    className="inline-flex items-center gap-1 px-3 py-1 bg-zinc-100 dark:bg-zinc-900 border border-zinc-200 dark:border-zinc-800 rounded-full text-sm text-zinc-900 dark:text-white max-w-full"
+                                >
+                                    <span className="truncate">{url}</span>
+                                    <button
+                                        onClick={() =>
+                                            store.removeBlacklistedUrl(url)
+                                        }
+                                        className="hover:text-red-400"
+                                    >
+                                        <X className="w-3 h-3" />
+                                    </button>
+                                </span>
+                            ))}
+                        </div>
+                    </section>
                 </div>
 
                 <div className="p-6 border-t border-zinc-200 dark:border-zinc-800 flex justify-end">
@@ -26,7 +26,8 @@ export default function Player() {
     setIsPlaying, 
     volume, 
     setVolume,
-    history 
+    history,
+    preloadNext
   } = useStore();
   
   const [hasWindow, setHasWindow] = useState(false);
@@ -35,6 +36,8 @@ export default function Player() {
   
   // Guard against volume resets to 100% during track switches
   const volInitGuardRef = useRef<boolean>(false);
+  // Time-to-first-frame of the current switch, reported to the backend (providers/prefetch.py)
+  const switchTimingRef = useRef<{ queueId: string; startedAt: number; prefetched: boolean } | null>(null);
 
   useEffect(() => {
     // We defer this to avoid "setState in effect" lint error during hydration
@@ -62,6 +65,33 @@ export default function Player() {
     }
   }, [currentVideo?.url, volume]);
 
+  useEffect(() => {
+    const queueId = currentVideo?.queueId;
+    if (!queueId) {
+      switchTimingRef.current = null;
+      return;
+    }
+    // Read at switch time: the backend announces the following item a moment later
+    const preloaded = useStore.getState().preloadNext;
+    switchTimingRef.current = {
+      queueId,
+      startedAt: performance.now(),
+      prefetched: preloaded?.queueId === queueId,
+    };
+  }, [currentVideo?.queueId]);
+
+  const reportFirstFrame = () => {
+    const timing = switchTimingRef.current;
+    if (!timing || timing.queueId !== currentVideo?.queueId) return;
+    switchTimingRef.current = null;
+    const ttff = Math.round(performance.now() - timing.startedAt);
+    console.log(`[Player] ⏱️ First frame after ${ttff} ms (${timing.prefetched ? 'preloaded' : 'cold'})`);
+    window.eel?.report_playback_timing(timing.queueId, ttff, timing.prefetched)();
+  };
+
+  const preloadTarget =
+    preloadNext && preloadNext.url && preloadNext.queueId !== currentVideo?.queueId ? preloadNext : null;
+
   if (!hasWindow) return <div className="w-full h-full bg-black rounded-xl animate-pulse" />;
 
   if (!currentVideo) {
@@ -100,6 +130,7 @@ export default function Player() {
             onPlay={() => {
                 setIsPlaying(true);
             }}
+            onPlaying={reportFirstFrame}
             onPause={() => {
                 setIsPlaying(false);
             }}
@@ -143,6 +174,22 @@ export default function Player() {
             />
           </MediaPlayer>
 
+          {/* Warms up the next embed (player scripts, manifest) so the switch starts faster */}
+          {preloadTarget && (
+            <MediaPlayer
+              key={preloadTarget.queueId}
+              src={preloadTarget.url}
+              muted
+              paused
+              load="eager"
+              playsinline
+              aria-hidden
+              className="absolute -z-10 w-px h-px opacity-0 pointer-events-none"
+            >
+              <MediaProvider />
+            </MediaPlayer>
+          )}
+
           {error && (
               <div className="absolute inset-0 z-50 bg-black/80 flex items-center justify-center text-white px-6 text-center flex-col gap-3">
                   <AlertCircle className="w-12 h-12 text-red-500" />
@@ -4,6 +4,7 @@ import { useSortable } from '@dnd-kit/sortable';
 import { CSS } from '@dnd-kit/utilities';
 import { Clock, GripVertical, Trash2 } from 'lucide-react';
 import type { VideoItem } from '../lib/interfaces';
+import { useStore } from '../store/useStore';
 
 interface SortableQueueItemProps {
   video: VideoItem;
@@ -19,6 +20,8 @@ export default function SortableQueueItem({ video, onRemove }: SortableQueueItem
     transition,
     isDragging,
   } = useSortable({ id: video.queueId! });
+  // Local copy served by the backend once the prefetcher has downloaded it
+  const prefetched = useStore((state) => state.prefetched[video.queueId!]);
 
   const style = {
     transform: CSS.Transform.toString(transform),
@@ -46,9 +49,11 @@ export default function SortableQueueItem({ video, onRemove }: SortableQueueItem
 
       <div className="w-24 aspect-video bg-black rounded overflow-hidden flex-shrink-0 relative">
         <img
-          src={video.thumbnail}
+          src={prefetched?.thumbnail || video.thumbnail}
           alt={video.title}
-          className="w-full h-full object-cover opacity-80 group-hover:opacity-100 transition-opacity"
+          className={`w-full h-full object-cover opacity-80 group-hover:opacity-100 transition-opacity ${
+            prefetched && !prefetched.available ? 'grayscale' : ''
+          }`}
         />
       </div>
 
@@ -1,91 +1,58 @@
-import {
-  HubConnection,
-  HubConnectionBuilder,
-  LogLevel,
-} from '@microsoft/signalr';
 import { toast } from 'react-toastify';
 import i18n from '../i18n';
 import { useStore } from '../store/useStore';
-import { addYoutubeVideoToQueue } from './apiYoutube';
-import type { Donation } from './interfaces';
 
-// Base URL for DonateX SignalR
-const DX_HUB_URL = 'https://donatex.gg/api/public-donations-hub';
-
-let connection: HubConnection | null = null;
+// The DonateX SignalR client runs in the Python backend (providers/dx_provider.py).
+// Donations arrive through the same onNewDonation callback as DonationAlerts.
 
 export async function connectDonateX(token: string) {
     const store = useStore.getState();
 
-    // If connection already exists and is active, do not reconnect unnecessarily
-    if (connection && connection.state === 'Connected') {
-        return { status: true };
+    if (!window.eel) {
+        console.error('[DX] Eel is not initialized');
+        return { status: false, success: false };
     }
 
     try {
         store.setDXConnectionStatus('connecting');
+        const result = await window.eel.connect_dx(token)();
 
-        // Create SignalR connection
-        connection = new HubConnectionBuilder()
-            .withUrl(`${DX_HUB_URL}?access_token=${token}`)
-            .withAutomaticReconnect() // Automatic reconnection on disconnect
-            .configureLogging(LogLevel.Information)
-            .build();
-
-        // Listen for new donation event
-        connection.on('DonationCreated', (donation: any) => {
-            handleIncomingDXDonation(donation);
-        });
-
-        // Handle connection lifecycle events
-        connection.onreconnecting(() => {
-            store.setDXConnectionStatus('connecting');
-        });
-
-        connection.onreconnected(() => {
-            store.setDXConnectionStatus('connected');
-        });
-
-        connection.onclose(() => {
+        if (!result.success) {
             store.setDXConnectionStatus('disconnected');
-        });
-
-        // Start connection
-        await connection.start();
-
-        store.setDXConnectionStatus('connected');
-        toast.success(i18n.t('status.connected'), { autoClose: 3000 });
-        return { success: true };
+            toast.error(`DonateX Error: ${result.message || 'Unknown'}`);
+        }
+        return { status: result.success, success: result.success };
     } catch (error) {
-        console.error('[DX] SignalR Connection Error:', error);
+        console.error('[DX] Backend connection error:', error);
         store.setDXConnectionStatus('disconnected');
         toast.error(
-            `DonateX SignalR Error: ${
+            `DonateX Error: ${
                 error instanceof Error ? error.message : 'Unknown'
             }`
         );
-    } 
+        return { status: false, success: false };
+    }
 }
 
-
 export async function disconnectDonateX() {
-    if (connection) {
-        await connection.stop();
-        connection = null;
-        useStore.getState().setDXConnectionStatus('disconnected');
+    if (window.eel) {
+        await window.eel.disconnect_dx()();
     }
+    useStore.getState().setDXConnectionStatus('disconnected');
 }
 
-async function handleIncomingDXDonation(data: any) {
-    const donation: Donation = {
-        id: data.id || Date.now().toString(),
-        username: data.nickname || data.username || 'Anonymous',
-        amount: parseFloat(data.amount),
-        currency: data.currency || 'RUB',
-        message: data.message || '',
-        timestamp: new Date(data.createdAt).getTime(),
-        is_test: data.isTest || false,
-    };
+// Called by Python whenever the hub connection state changes
+export function onDXConnectionStatus(data: { status: string }) {
+    const store = useStore.getState();
 
-    await addYoutubeVideoToQueue(donation);
+    if (data.status === 'connected') {
+        if (store.dxConnectionStatus !== 'connected') {
+            toast.success(i18n.t('status.connected'), { autoClose: 3000 });
+        }
+        store.setDXConnectionStatus('connected');
+    } else if (data.status === 'connecting') {
+        store.setDXConnectionStatus('connecting');
+    } else {
+        store.setDXConnectionStatus('disconnected');
+    }
 }
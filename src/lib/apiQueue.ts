@@ -0,0 +1,60 @@
+import type { PrefetchedItem, PreloadTarget, QueueOp, QueueSnapshot } from './interfaces';
+import { useStore } from '../store/useStore';
+
+// The play queue and history are owned by the Python backend (providers/queue_store.py).
+// The store keeps a mirror that is updated from incremental ops; every window gets the same ops.
+
+let isSyncing = false;
+
+export async function syncQueue() {
+    if (!window.eel || isSyncing) return;
+    isSyncing = true;
+
+    try {
+        const store = useStore.getState();
+        let snapshot: QueueSnapshot = await window.eel.get_queue_snapshot()();
+
+        // One-time migration: the queue used to be persisted in localStorage
+        const backendEmpty = snapshot.queue.length === 0 && !snapshot.current;
+        if (backendEmpty && (store.queue.length > 0 || store.currentVideo)) {
+            console.log(`[Queue] Moving ${store.queue.length} local item(s) to the backend`);
+            await window.eel.queue_import(store.queue, store.currentVideo, store.history)();
+            snapshot = await window.eel.get_queue_snapshot()();
+        }
+
+        useStore.getState().setQueueSnapshot(snapshot);
+    } catch (error) {
+        console.error('[Queue] Failed to load queue from backend:', error);
+    } finally {
+        isSyncing = false;
+    }
+}
+
+// Called by Python after every queue mutation
+export function onQueueOps(data: { version: number; ops: QueueOp[] }) {
+    const { queueVersion, applyQueueOps } = useStore.getState();
+
+    // Out of order (missed batch, reload mid-stream) or a bulk reset: take a fresh snapshot
+    if (data.version !== queueVersion + 1 || data.ops.some((op) => op.op === 'reset')) {
+        if (data.version > queueVersion) syncQueue();
+        return;
+    }
+    applyQueueOps(data.version, data.ops);
+}
+
+// Prefetch scheduler (providers/prefetch.py): a queued item got its metadata refreshed and thumbnail cached
+export function onPrefetchReady(data: PrefetchedItem & { queueId: string }) {
+    const { queueId, ...item } = data;
+    useStore.getState().setPrefetched(queueId, item);
+}
+
+// The item that will play next; the player keeps a hidden instance loading it
+export function onPreloadNext(target: PreloadTarget) {
+    useStore.getState().setPreloadNext(target);
+}
+
+// Passes the API key/lookahead so the backend can refresh metadata of upcoming items
+export function configurePrefetch(apiKey: string, lookahead?: number) {
+    if (!window.eel) return;
+    window.eel.configure_prefetch({ api_key: apiKey, lookahead })().catch(console.error);
+}
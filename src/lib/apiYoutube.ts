@@ -3,31 +3,6 @@ import i18n from '../i18n';
 import { useStore } from '../store/useStore';
 import type { Donation, VideoItem } from './interfaces';
 
-async function fetchTranscript(videoId: string): Promise<string | null> {
-    try {
-        if (!window.eel) {
-            console.error("Eel is not initialized");
-            return null;
-        }
-
-        console.log(`[YouTube] Requesting transcript from Python for: ${videoId}`);
-
-        // @ts-ignore
-        const result = await window.eel.get_video_transcript(videoId)();
-        
-        if (result && result.success) {
-            console.log(`[YouTube] Transcript received from backend`);
-            return result.transcript;
-        } else {
-            console.warn(`[YouTube] Backend failed to get transcript: ${result?.message}`);
-            return null;
-        }
-    } catch (error) {
-        console.warn(`[YouTube] Transcript not found or disabled for video: ${videoId}`);
-        return null;
-    }
-}
-
 export async function checkYoutubeConnection(apiKey: string) {
     if (!apiKey) return false;
     try {
@@ -58,126 +33,187 @@ export const extractYoutubeIds = (
     return result
 };
 
-async function fetchYoutubeVideoDetails(
-    videoId: string,
-    youtubeApiKey: string
-) {
-    try {
-        const response = await fetch(
-            `https://www.googleapis.com/youtube/v3/videos?part=snippet,statistics,contentDetails&id=${videoId}&key=${youtubeApiKey}`
-        );
+// --- Backend validation pipeline (playlists) ---
+
+interface ValidationSummary {
+    job_id: string;
+    total: number;
+    accepted: number;
+    rejected: { index: number; id: string; reason: string }[];
+    has_more?: boolean;
+    // Playlist paused too long without the queue draining; the rest of it is dropped
+    expired?: boolean;
+    skipped?: number;
+    playlist_total?: number | null;
+    error?: string;
+    timings?: Record<string, unknown>;
+}
 
-        if (!response.ok) {
-            throw new Error('Failed to fetch video details');
-        }
+interface ValidationJobHandlers {
+    // Resolved with the first summary (first page for playlists), later pages keep streaming in
+    resolve: ((summary: ValidationSummary) => void) | null;
+    hasMore: boolean;
+}
 
-        const data = await response.json();
-        if (!data.items || data.items.length === 0) {
-            toast.error(i18n.t('errors.video_not_found'));
-            return null;
-        }
+const validationJobs = new Map<string, ValidationJobHandlers>();
 
-        console.log("data", data.items[0])
-        return data.items[0];
-    } catch (error) {
-        console.error('[App] Video processing error:', error);
-        toast.error('Error processing video');
-        return null;
-    }
+// Called by Python for every accepted video, in playlist order
+export function onValidatedVideo(data: { job_id: string; index?: number; video: Omit<VideoItem, 'addedAt'> }) {
+    if (!validationJobs.has(data.job_id)) return;
+    useStore.getState().addToQueue({ ...data.video, addedAt: Date.now() });
 }
 
-async function fetchPlaylistVideoIds(playlistId: string, youtubeApiKey: string): Promise<string[]> {
-    try {
-        const response = await fetch(
-            `https://www.googleapis.com/youtube/v3/playlistItems?part=contentDetails&maxResults=50&playlistId=${playlistId}&key=${youtubeApiKey}`
-        );
-        if (!response.ok) throw new Error('Failed to fetch playlist');
-        const data = await response.json();
-        return data.items?.map((item: any) => item.contentDetails.videoId) || [];
-    } catch (error) {
-        console.error('[YouTube API] Playlist fetch error:', error);
-        toast.error(i18n.t('errors.error_fetch_playlist'));
-        return [];
+// Called by Python when a job (or one page of a playlist job) has been processed
+export function onValidationDone(summary: ValidationSummary) {
+    const job = validationJobs.get(summary.job_id);
+    if (!job) return;
+
+    job.hasMore = !!summary.has_more;
+    if (!job.hasMore) validationJobs.delete(summary.job_id);
+
+    console.log(`[YouTube] Validation job ${summary.job_id}: ${summary.accepted}/${summary.total} accepted`, summary.timings);
+    if (summary.expired) {
+        console.warn(`[YouTube] Playlist job ${summary.job_id} expired before the queue drained`);
+    }
+    if (summary.rejected.length > 0) {
+        console.warn('[YouTube] Rejected videos:', summary.rejected);
+    }
+    if (job.resolve) {
+        job.resolve(summary);
+        job.resolve = null;
     }
 }
 
-async function processAndAddVideo(videoId: string, donation: Donation, apiKey: string) {
+// Filter settings in the shape the backend rule engine compiles; manual adds skip the amount rule
+function getFilterSettings(isManual = false) {
     const store = useStore.getState();
-    const { minViewCount, minLikeCount, blacklistedKeywords, addToQueue, youtubeVideoNotifications } = store;
+    return {
+        min_amount: isManual ? 0 : store.minDonationAmount,
+        min_views: store.minViewCount,
+        min_likes: store.minLikeCount,
+        max_duration: store.maxVideoDuration * 60,
+        keywords: store.blacklistedKeywords,
+        blacklisted_urls: store.blacklistedUrls,
+        captions_enabled: store.isCaptionsEnabled,
+    };
+}
 
-    const video = await fetchYoutubeVideoDetails(videoId, apiKey);
-    console.log("Fetched video details:", video);
-    if (!video) return false;
+function waitForJob(jobId: string): Promise<ValidationSummary> {
+    return new Promise((resolve) => {
+        validationJobs.set(jobId, { resolve, hasMore: true });
+    });
+}
 
+async function ingestPlaylistOnBackend(playlistId: string, donation: Donation, apiKey: string, isManual = false): Promise<number> {
+    const result = await window.eel.ingest_playlist(playlistId, donation, getFilterSettings(isManual), apiKey)();
 
-    let caption = ''
+    if (!result.success || !result.job_id) {
+        console.error('[YouTube] Failed to start playlist ingestion:', result.message);
+        toast.error(i18n.t('errors.error_fetch_playlist'));
+        return 0;
+    }
 
-    if (store.isCaptionsEnabled) {
-        console.log(`[YouTube] Fetching transcript for video: ${videoId}`);
-        const fetchedTranscript = await fetchTranscript(videoId);
-        if (fetchedTranscript) {
-            caption = fetchedTranscript;
-        }
+    const summary = await waitForJob(result.job_id);
+    if (summary.error) {
+        console.error('[YouTube API] Playlist fetch error:', summary.error);
+        toast.error(i18n.t('errors.error_fetch_playlist'));
+    } else if (summary.playlist_total && useStore.getState().youtubeVideoNotifications) {
+        toast.info(i18n.t('notifications.processing_playlist', { count: summary.playlist_total }));
+    }
+    return summary.accepted;
+}
+
+// Remaining playlist pages are fetched lazily: tell the backend whenever the queue gets shorter
+useStore.subscribe((state, prevState) => {
+    if (state.queue.length >= prevState.queue.length) return;
+    const hasPausedJobs = Array.from(validationJobs.values()).some((job) => job.hasMore);
+    if (!hasPausedJobs || !window.eel) return;
+    window.eel.notify_queue_length(state.queue.length)();
+});
+
+interface VideoVerdict {
+    accepted: boolean;
+    video: Omit<VideoItem, 'addedAt'> | null;
+    rejection: { rule?: string; reason: string; detail?: any } | null;
+    timings?: Record<string, unknown>;
+}
+
+// Toast for a rejection coming from the backend rule engine (providers/validation_rules.py)
+function notifyRejection(rejection: NonNullable<VideoVerdict['rejection']>) {
+    const { reason, detail } = rejection;
+    switch (reason) {
+        case 'views':
+            toast.info(i18n.t('notifications.video_rejected_views', { current: detail.current, min: detail.min }));
+            break;
+        case 'likes':
+            toast.info(i18n.t('notifications.video_rejected_likes', { current: detail.current, min: detail.min }));
+            break;
+        case 'amount':
+            toast.info(i18n.t('notifications.video_rejected_amount', { current: detail.current, min: detail.min }));
+            break;
+        case 'duration':
+            toast.info(i18n.t('notifications.video_rejected_duration'));
+            break;
+        case 'blacklisted_url':
+        case 'blacklisted_channel':
+            toast.info(i18n.t('notifications.video_rejected_url'));
+            break;
+        case 'blacklist':
+            toast.info(i18n.t('notifications.video_rejected_blacklist'));
+            break;
+        case 'duplicate':
+            toast.info(i18n.t('notifications.video_rejected_duplicate'));
+            break;
+        case 'not_found':
+            toast.error(i18n.t('errors.video_not_found'));
+            break;
+        default:
+            toast.error(i18n.t('notifications.processing_error'));
     }
+}
 
-    const stats = video.statistics;
-    const snippet = video.snippet;
-    const viewCount = parseInt(stats.viewCount || '0', 10);
-    const likeCount = parseInt(stats.likeCount || '0', 10);
-    const title = snippet.title;
+async function processAndAddVideo(videoId: string, donation: Donation, apiKey: string, isManual = false) {
+    const store = useStore.getState();
+    const { addToQueue, youtubeVideoNotifications } = store;
 
-    // Check view count
-    if (viewCount < minViewCount) {
-        if (youtubeVideoNotifications) {
-            toast.info(i18n.t('notifications.video_rejected_views', { current: viewCount, min: minViewCount }));
-        }
-        console.warn(`Skipped: ${title} (Views: ${viewCount} < ${minViewCount})`);
+    if (!window.eel) {
+        console.error("Eel is not initialized");
         return false;
     }
 
-    // Check like count
-    if (likeCount < minLikeCount) {
-        if (youtubeVideoNotifications) {
-            toast.info(i18n.t('notifications.video_rejected_likes', { current: likeCount, min: minLikeCount }));
-        }
-        console.warn(`Skipped: ${title} (Likes: ${likeCount} < ${minLikeCount})`);
+    let verdict: VideoVerdict;
+    try {
+        verdict = await window.eel.validate_video(videoId, donation, getFilterSettings(isManual), apiKey)();
+    } catch (error) {
+        console.error('[App] Video processing error:', error);
+        toast.error(i18n.t('notifications.processing_error'));
         return false;
     }
-    
-   
-
-    // Check blacklisted keywords
-    const isTitleBlacklisted = blacklistedKeywords.some((keyword) =>
-        title.toLowerCase().includes(keyword.toLowerCase())
-    );
 
-    const isCaptionsBlacklisted = store.isCaptionsEnabled ? blacklistedKeywords.some((keyword) =>
-        caption.toLowerCase().includes(keyword.toLowerCase())
-    ) : false;
+    if (!verdict.accepted || !verdict.video) {
+        const rejection = verdict.rejection || { reason: 'error' };
+        console.warn(`Skipped: ${videoId} (${rejection.rule || rejection.reason})`, rejection.detail, verdict.timings);
+        if (youtubeVideoNotifications || rejection.reason === 'not_found') {
+            notifyRejection(rejection);
+        }
+        return false;
+    }
 
+    const videoItem: VideoItem = { ...verdict.video, addedAt: Date.now() };
 
-    if (isTitleBlacklisted || isCaptionsBlacklisted) {
-        toast.info(i18n.t('notifications.video_rejected_blacklist'));
-        console.warn(`Skipped: ${title} (Blacklisted)`);
+    const queued = await addToQueue(videoItem);
+    if (!queued.success) {
+        if (queued.reason === 'queue_cap') {
+            toast.info(i18n.t('notifications.video_rejected_queue_cap', { requester: videoItem.requester }));
+        } else {
+            toast.error(i18n.t('notifications.processing_error'));
+        }
         return false;
     }
 
-    const videoItem: VideoItem = {
-        id: videoId,
-        url: `https://www.youtube.com/watch?v=${videoId}`,
-        title: title,
-        requester: donation.username,
-        amount: donation.amount,
-        duration: video.contentDetails.duration,
-        thumbnail: snippet.thumbnails?.high?.url || snippet.thumbnails?.default?.url,
-        addedAt: Date.now(),
-    };
-
     if (youtubeVideoNotifications) {
         toast.success(i18n.t('notifications.video_added', { title: videoItem.title }));
     }
-
-    addToQueue(videoItem);
     return true;
 }
 
@@ -199,23 +235,13 @@ export async function addYoutubeVideoToQueueManual(url: string) {
 
     // CASE 1: It's a playlist
     if (playlistId) {
-        const videoIds = await fetchPlaylistVideoIds(playlistId, youtubeApiKey);
-        
-        if (youtubeVideoNotifications) {
-            toast.info(i18n.t('notifications.processing_playlist', { count: videoIds.length }));
-        }
-        console.log("Playlist video IDs:", videoIds);
-        
-        for (const id of videoIds) {    
-            const success = await processAndAddVideo(id, {
-                username: 'Streamer',
-                amount: 0,
-                currency: '',
-                id: 0,
-                timestamp: Date.now()
-            }, youtubeApiKey);
-            if (success) videosAdded++;
-        }
+        videosAdded = await ingestPlaylistOnBackend(playlistId, {
+            username: 'Streamer',
+            amount: 0,
+            currency: '',
+            id: 0,
+            timestamp: Date.now()
+        }, youtubeApiKey, true);
     } 
     // CASE 2: It's a single video
     else if (videoId) {
@@ -225,7 +251,7 @@ export async function addYoutubeVideoToQueueManual(url: string) {
             currency: '',
             id: 0,
             timestamp: Date.now()
-        }, youtubeApiKey);
+        }, youtubeApiKey, true);
         if (success) videosAdded++;
     }
 
@@ -261,15 +287,7 @@ export async function addYoutubeVideoToQueue(donation: Donation) {
 
     // CASE 1: It's a playlist
     if (playlistId) {
-        const videoIds = await fetchPlaylistVideoIds(playlistId, youtubeApiKey);
-        if (youtubeVideoNotifications) {
-            toast.info(i18n.t('notifications.processing_playlist', { count: videoIds.length }));
-        }
-        
-        for (const id of videoIds) {
-            const success = await processAndAddVideo(id, donation, youtubeApiKey);
-            if (success) videosAdded++;
-        }
+        videosAdded = await ingestPlaylistOnBackend(playlistId, donation, youtubeApiKey);
     } 
     // CASE 2: It's a single video
     else if (videoId) {
@@ -6,6 +6,12 @@ export interface Donation {
     id: number;
     timestamp: number;
     is_test?: boolean;
+    source?: string;
+    journal_offset?: number;
+    replayed?: boolean;
+    trace_id?: string;
+    account_id?: string;
+    stream_seq?: number;
 }
 
 export interface VideoItem {
@@ -19,12 +25,14 @@ export interface VideoItem {
     thumbnail: string;
     addedAt: number;
     caption?: string;
+    trace_id?: string;
 }
 
 export interface YoutubeVideoFilter {
     minDonationAmount: number;
     minViewCount: number;
     minLikeCount: number;
+    maxVideoDuration: number; // minutes, 0 = no limit
     blacklistedKeywords: string[];
     blacklistedUrls: string[];
 }
@@ -60,6 +68,8 @@ export interface SettingsState extends DonationAlertsState, DonateXState, Youtub
     setDonationAlertsNotificationsStatus: (enabled: boolean) => void;
     setYoutubeVideoNotificationsStatus: (enabled: boolean) => void;
     removeBlacklistedKeyword: (keyword: string) => void;
+    addBlacklistedUrl: (url: string) => void;
+    removeBlacklistedUrl: (url: string) => void;
     setDAConnectionStatus: (
         status: 'connected' | 'disconnected' | 'connecting'
     ) => void;
@@ -69,19 +79,62 @@ export interface SettingsState extends DonationAlertsState, DonateXState, Youtub
     setTheme: (theme: 'dark' | 'light') => void;
 }
 
+export type QueueOp =
+    | { op: 'insert'; item: VideoItem; after: string | null }
+    | { op: 'remove'; queueId: string }
+    | { op: 'move'; queueId: string; after: string | null }
+    | { op: 'clear' }
+    | { op: 'reset' }
+    | { op: 'current'; item: VideoItem | null }
+    | { op: 'history_push'; item: VideoItem }
+    | { op: 'history_pop' };
+
+export interface QueueSnapshot {
+    version: number;
+    queue: VideoItem[];
+    current: VideoItem | null;
+    history: VideoItem[];
+}
+
+export interface PrefetchedItem {
+    video_id: string;
+    thumbnail: string;
+    available: boolean;
+}
+
+export interface PreloadTarget {
+    queueId: string;
+    id: string;
+    url?: string;
+}
+
+export interface QueueAddResult {
+    success: boolean;
+    reason?: string;
+    message?: string;
+}
+
 export interface QueueState {
     queue: VideoItem[];
     currentVideo: VideoItem | null;
     history: VideoItem[];
+    queueVersion: number;
+    prefetched: Record<string, PrefetchedItem>;
+    preloadNext: PreloadTarget | null;
     isPlaying: boolean;
     volume: number;
-    addToQueue: (video: VideoItem) => void;
+    // Resolves with the backend verdict: the scheduling policy may refuse the item (per-donor cap)
+    addToQueue: (video: VideoItem) => Promise<QueueAddResult>;
     removeFromQueue: (id: string) => void;
     playNext: () => void;
     playPrevious: () => void;
     clearQueue: () => void;
     reorderQueue: (oldIndex: number, newIndex: number) => void;
     setCurrentVideo: (video: VideoItem | null) => void;
+    setQueueSnapshot: (snapshot: QueueSnapshot) => void;
+    applyQueueOps: (version: number, ops: QueueOp[]) => void;
+    setPrefetched: (queueId: string, item: PrefetchedItem) => void;
+    setPreloadNext: (target: PreloadTarget | null) => void;
     setIsPlaying: (playing: boolean) => void;
     setVolume: (volume: number) => void;
 }
@@ -1,6 +1,6 @@
 import { create } from 'zustand';
 import { createJSONStorage, persist } from 'zustand/middleware';
-import type { AppState } from '../lib/interfaces';
+import type { AppState, PrefetchedItem, VideoItem } from '../lib/interfaces';
 
 
 export const useStore = create<AppState>()(
@@ -31,6 +31,7 @@ export const useStore = create<AppState>()(
             minDonationAmount: 1,
             minViewCount: 0,
             minLikeCount: 0,
+            maxVideoDuration: 0,
             blacklistedUrls: [],
             blacklistedKeywords: [],
 
@@ -38,6 +39,9 @@ export const useStore = create<AppState>()(
             queue: [],
             currentVideo: null,
             history: [],
+            queueVersion: 0,
+            prefetched: {},
+            preloadNext: null,
             isPlaying: false,
             volume: 80,
 
@@ -94,90 +98,115 @@ export const useStore = create<AppState>()(
                     ),
                 })),
 
-            addToQueue: (video) =>
-                set((state) => {
-                    const videoWithQueueId = {
-                        ...video,
-                        queueId: `${video.id}-${Date.now()}-${Math.random()
-                            .toString(36)
-                            .substr(2, 9)}`,
-                    };
-                    // If no video is playing, automatically play the added one
-                    if (!state.currentVideo && state.queue.length === 0) {
-                        return {
-                            currentVideo: videoWithQueueId,
-                            isPlaying: true,
-                        };
-                    }
-                    return { queue: [...state.queue, videoWithQueueId] };
-                }),
-
-            removeFromQueue: (queueId) =>
-                set((state) => ({
-                    queue: state.queue.filter((v) => v.queueId !== queueId),
-                })),
+            // Queue mutations are owned by the backend (providers/queue_store.py):
+            // actions send a command, the resulting ops come back through onQueueOps
+            addToQueue: async (video) => {
+                if (!window.eel) return { success: false, message: 'Eel is not initialized' };
+                const result = await window.eel.queue_add(video)();
+                // Refused by the scheduling policy (per-donor cap)
+                if (!result.success) console.warn('[Queue] Not queued:', result.message);
+                return result;
+            },
 
-            playNext: () =>
-                set((state) => {
-                    const nextVideo = state.queue[0];
-                    const newHistory = state.currentVideo
-                        ? [state.currentVideo, ...state.history].slice(0, 10)
-                        : state.history;
-
-                    if (!nextVideo) {
-                        return {
-                            currentVideo: null,
-                            isPlaying: false,
-                            history: newHistory,
-                        };
-                    }
+            removeFromQueue: (queueId) => {
+                window.eel?.queue_remove(queueId)();
+            },
 
-                    return {
-                        currentVideo: nextVideo,
-                        queue: state.queue.slice(1),
-                        history: newHistory,
-                        isPlaying: true,
-                    };
-                }),
+            playNext: () => {
+                window.eel?.queue_play_next()();
+            },
 
-            playPrevious: () =>
-                set((state) => {
-                    if (state.history.length === 0) return state;
-
-                    const prevVideo = state.history[0];
-                    const newHistory = state.history.slice(1);
-                    const newQueue = state.currentVideo
-                        ? [state.currentVideo, ...state.queue]
-                        : state.queue;
-
-                    return {
-                        currentVideo: prevVideo,
-                        history: newHistory,
-                        queue: newQueue,
-                        isPlaying: true,
-                    };
-                }),
+            playPrevious: () => {
+                window.eel?.queue_play_previous()();
+            },
 
-            clearQueue: () => set({ queue: [] }),
+            clearQueue: () => {
+                window.eel?.queue_clear()();
+            },
 
             reorderQueue: (oldIndex, newIndex) =>
                 set((state) => {
+                    // Applied locally right away so drag&drop doesn't jump back, the backend echo is idempotent
                     const newQueue = [...state.queue];
                     const [movedItem] = newQueue.splice(oldIndex, 1);
                     newQueue.splice(newIndex, 0, movedItem);
+                    const afterId = newIndex > 0 ? newQueue[newIndex - 1].queueId : null;
+                    window.eel?.queue_move(movedItem.queueId!, afterId)();
                     return { queue: newQueue };
                 }),
 
             setCurrentVideo: (video) => {
-                set((state) => ({ 
-                    history: state.currentVideo 
-                        ? [state.currentVideo, ...state.history].slice(0, 10) 
-                        : state.history,
-                    currentVideo: video, 
-                    isPlaying: !!video,
-                }));
+                window.eel?.queue_set_current(video)();
             },
 
+            setQueueSnapshot: (snapshot) =>
+                set({
+                    queue: snapshot.queue,
+                    currentVideo: snapshot.current,
+                    history: snapshot.history,
+                    queueVersion: snapshot.version,
+                    isPlaying: !!snapshot.current,
+                }),
+
+            applyQueueOps: (version, ops) =>
+                set((state) => {
+                    let queue = state.queue;
+                    let history = state.history;
+                    let currentVideo = state.currentVideo;
+                    let isPlaying = state.isPlaying;
+
+                    const insertAfter = (item: VideoItem, afterId: string | null) => {
+                        const index = afterId === null ? 0 : queue.findIndex((v) => v.queueId === afterId) + 1;
+                        queue.splice(index, 0, item);
+                    };
+
+                    queue = [...queue];
+                    for (const op of ops) {
+                        switch (op.op) {
+                            case 'insert':
+                                insertAfter(op.item, op.after);
+                                break;
+                            case 'remove':
+                                queue = queue.filter((v) => v.queueId !== op.queueId);
+                                break;
+                            case 'move': {
+                                const index = queue.findIndex((v) => v.queueId === op.queueId);
+                                if (index === -1) break;
+                                const [item] = queue.splice(index, 1);
+                                insertAfter(item, op.after);
+                                break;
+                            }
+                            case 'clear':
+                                queue = [];
+                                break;
+                            case 'current':
+                                currentVideo = op.item;
+                                isPlaying = !!op.item;
+                                break;
+                            case 'history_push':
+                                history = [op.item, ...history].slice(0, 10);
+                                break;
+                            case 'history_pop':
+                                history = history.slice(1);
+                                break;
+                        }
+                    }
+                    return { queue, history, currentVideo, isPlaying, queueVersion: version };
+                }),
+
+            setPrefetched: (queueId, item) =>
+                set((state) => {
+                    // Drop entries of items that already left the queue
+                    const prefetched: Record<string, PrefetchedItem> = { [queueId]: item };
+                    for (const video of state.queue) {
+                        const entry = state.prefetched[video.queueId!];
+                        if (entry && video.queueId !== queueId) prefetched[video.queueId!] = entry;
+                    }
+                    return { prefetched };
+                }),
+
+            setPreloadNext: (target) => set({ preloadNext: target }),
+
             setIsPlaying: (playing) => {
                 set({ isPlaying: playing });
             },
@@ -203,7 +232,17 @@ export const useStore = create<AppState>()(
             name: 'streamer-player-storage',
             storage: createJSONStorage(() => localStorage),
             partialize: (state) => {
-                const { daConnectionStatus, ...rest } = state;
+                // Queue and history live in the backend SQLite store, not in localStorage
+                const {
+                    daConnectionStatus,
+                    queue,
+                    currentVideo,
+                    history,
+                    queueVersion,
+                    prefetched,
+                    preloadNext,
+                    ...rest
+                } = state;
                 return rest;
             },
         }
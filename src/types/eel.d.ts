@@ -1,5 +1,7 @@
 // Type definitions for Eel (Python-JavaScript bridge)
 
+import type { QueueSnapshot, VideoItem } from '../lib/interfaces';
+
 interface EelCallbackResult {
     success: boolean;
     message: string;
@@ -19,10 +21,22 @@ interface EelTokenResult {
     expires_in?: number;
     user_id?: number;
     user_name?: string;
+    account_id?: string;
+    shared_with?: string;
     message: string;
     error?: string;
 }
 
+interface DAAccountStats {
+    donations: number;
+    amounts: Record<string, number>;
+    last_donation_at: number | null;
+    user_id: number | null;
+    user_name: string;
+    shared_with: string | null;
+    connection: Record<string, any>;
+}
+
 interface EelDonation {
     id: number;
     username: string;
@@ -32,6 +46,32 @@ interface EelDonation {
     timestamp: string;
 }
 
+interface EelTranscriptCacheStats {
+    memory_hits: number;
+    disk_hits: number;
+    negative_hits: number;
+    misses: number;
+    expired: number;
+    evictions: number;
+    stores: number;
+    memory_entries: number;
+    memory_bytes: number;
+    memory_limit: number;
+    purged: number;
+    disk_evictions: number;
+    disk_bytes: number | null;
+    disk_limit: number;
+    hit_ratio: number;
+}
+
+interface EelTranscriptSettings {
+    languages: string[];
+    allow_generated: boolean;
+    allow_translated: boolean;
+    max_minutes: number | null;
+    max_chars: number | null;
+}
+
 interface Eel {
     // Python -> JavaScript exposed functions
     expose: (fn: Function, name: string) => void;
@@ -39,13 +79,100 @@ interface Eel {
     // JavaScript -> Python exposed functions
     start_da_auth: (credentials: { client_id: string; client_secret: string }) => () => Promise<void>;
     test_da_connection: (credentials: EelCredentials) => () => Promise<EelCallbackResult>;
-    exchange_da_code: (code: string, client_id: string, client_secret: string, redirect_uri?: string) => () => Promise<EelTokenResult>;
-    connect_with_token: (access_token: string, refresh_token: string, client_id: string, client_secret: string) => () => Promise<EelTokenResult>;
-    get_da_status: () => () => Promise<{status: string}>;
+    exchange_da_code: (code: string, client_id: string, client_secret: string, redirect_uri?: string, account_id?: string) => () => Promise<EelTokenResult>;
+    connect_with_token: (access_token: string, refresh_token: string, client_id: string, client_secret: string, token_expiry?: number, account_id?: string) => () => Promise<EelTokenResult>;
+    disconnect_da: (account_id?: string) => () => Promise<{ success: boolean; accounts: string[] }>;
+    remove_da_account: (account_id: string) => () => Promise<{ success: boolean }>;
+    get_da_metrics: (account_id?: string) => () => Promise<Record<string, any>>;
+    get_da_accounts: () => () => Promise<{ accounts: Record<string, DAAccountStats>; stream_seq: number; connections: number; max_connections: number }>;
+    get_da_status: () => () => Promise<{status: string; accounts: Record<string, string>}>;
     connect_dx: (access_token: string) => () => Promise<EelCallbackResult>;
+    disconnect_dx: () => () => Promise<{ success: boolean }>;
     get_dx_status: () => () => Promise<{status: string}>;
     connect_provider: (provider_id: string, config: any) => () => Promise<EelCallbackResult>;
+    disconnect_provider: (provider_id: string) => () => Promise<EelCallbackResult>;
     get_all_statuses: () => () => Promise<Record<string, {status: string}>>;
+    get_video_transcript: (video_id: string) => () => Promise<{
+        success: boolean;
+        transcript?: string;
+        language?: string;
+        kind?: 'manual' | 'generated' | 'translated';
+        truncated?: boolean;
+        message?: string;
+    }>;
+    set_blacklist_keywords: (keywords: string[]) => () => Promise<{ success: boolean; terms: number }>;
+    match_blacklist: (text: string, keywords?: string[], first_only?: boolean) => () => Promise<{ matched: boolean; matches: { term: string; start: number; end: number }[] }>;
+    validate_videos: (
+        video_ids: string[],
+        donation: any,
+        filters: { min_views: number; min_likes: number; keywords: string[]; captions_enabled: boolean },
+        api_key: string
+    ) => () => Promise<{ success: boolean; job_id?: string; message?: string }>;
+    ingest_playlist: (
+        playlist_id: string,
+        donation: any,
+        filters: { min_views: number; min_likes: number; keywords: string[]; captions_enabled: boolean },
+        api_key: string,
+        limits?: { max_per_donation?: number | null; tiers?: { min_amount: number; max_videos: number }[]; low_watermark?: number; resume_timeout?: number | null }
+    ) => () => Promise<{ success: boolean; job_id?: string; message?: string }>;
+    notify_queue_length: (length: number) => () => Promise<{ resumed: number }>;
+    configure_playlist_limits: (limits: { max_per_donation?: number | null; tiers?: { min_amount: number; max_videos: number }[]; low_watermark?: number; resume_timeout?: number | null }) => () => Promise<{ success: boolean; limits: any }>;
+    cancel_playlist_ingestion: (job_id: string) => () => Promise<{ success: boolean }>;
+    get_http_stats: () => () => Promise<Record<string, any>>;
+    get_event_bus_stats: () => () => Promise<Record<string, number>>;
+    configure_event_bus: (config: { window_ms?: number; max_pending?: number; max_in_flight?: number; ack_timeout?: number }) => () => Promise<{ success: boolean; stats: Record<string, number> }>;
+    replay_donations: (consumer?: string) => () => Promise<{ success: boolean; replayed: number }>;
+    ack_donations: (offsets: number | number[], consumer?: string) => () => Promise<{ success: boolean; acked_offset: number }>;
+    get_journal_stats: () => () => Promise<Record<string, any>>;
+    get_queue_snapshot: () => () => Promise<QueueSnapshot>;
+    queue_add: (video: VideoItem) => () => Promise<{ success: boolean; item?: VideoItem; reason?: string; message?: string }>;
+    queue_reprioritize: (queue_id: string, amount: number) => () => Promise<{ success: boolean }>;
+    configure_queue_scheduler: (config: {
+        policy: 'fifo' | 'priority' | 'fair';
+        tiers?: [number, number][];
+        max_per_donor?: number;
+    }) => () => Promise<{ success: boolean; stats?: Record<string, any>; message?: string }>;
+    get_queue_scheduler_stats: () => () => Promise<Record<string, any>>;
+    queue_remove: (queue_id: string) => () => Promise<{ success: boolean }>;
+    queue_move: (queue_id: string, after_id: string | null) => () => Promise<{ success: boolean }>;
+    queue_clear: () => () => Promise<{ success: boolean }>;
+    queue_play_next: () => () => Promise<{ success: boolean; current: VideoItem | null }>;
+    queue_play_previous: () => () => Promise<{ success: boolean; current: VideoItem | null }>;
+    queue_set_current: (video: VideoItem | null) => () => Promise<{ success: boolean; current: VideoItem | null }>;
+    queue_import: (queue: VideoItem[], current: VideoItem | null, history: VideoItem[]) => () => Promise<{ success: boolean }>;
+    get_video_details: (video_id: string, api_key: string, allow_duplicates?: boolean) => () => Promise<{
+        success: boolean;
+        item?: any;
+        duplicate?: 'current' | 'queue' | 'history';
+        not_found?: boolean;
+        message?: string;
+    }>;
+    get_video_metadata_stats: () => () => Promise<Record<string, number>>;
+    validate_video: (video_id: string, donation: any, filters: Record<string, any>, api_key: string) => () => Promise<{
+        accepted: boolean;
+        video: any;
+        rejection: { rule?: string; reason: string; detail?: any } | null;
+        timings?: Record<string, unknown>;
+    }>;
+    get_validation_rule_stats: (filters: Record<string, any>) => () => Promise<{ plan: Record<string, string[]>; rules: Record<string, { calls: number; rejected: number; errors: number; total_ms: number }>; unresolved_handles: string[] }>;
+    configure_video_metadata_cache: (config: { static_ttl?: number; stats_ttl?: number; max_entries?: number }) => () => Promise<{ success: boolean; stats: Record<string, number> }>;
+    configure_prefetch: (config: { lookahead?: number; api_key?: string }) => () => Promise<{ success: boolean; lookahead: number }>;
+    report_playback_timing: (queue_id: string, ttff_ms: number, prefetched?: boolean) => () => Promise<{ success: boolean }>;
+    get_prefetch_stats: () => () => Promise<Record<string, any>>;
+    set_debug_logging: (enabled: boolean, loggers?: string[]) => () => Promise<{ success: boolean; stats: Record<string, any> }>;
+    configure_log_limits: (category: string, rate?: number | null, burst?: number | null, sample?: number | null) => () => Promise<{ success: boolean; limits: Record<string, { rate: number; burst: number; sample: number }> }>;
+    get_logging_stats: () => () => Promise<Record<string, any>>;
+    get_metrics: () => () => Promise<{
+        spans: Record<string, { count: number; avg_ms: number | null; p50_ms: number | null; p99_ms: number | null; max_ms: number }>;
+        counters: Record<string, number>;
+        recent_traces: { trace_id: string; source: string; spans_ms: Record<string, number>; total_ms: number; accepted: boolean }[];
+        http: Record<string, any>;
+    }>;
+    get_transcript_cache_stats: () => () => Promise<EelTranscriptCacheStats>;
+    configure_transcript_cache: (config: { memory_limit?: number; ttl?: number; negative_ttl?: number; disk_limit?: number }) => () => Promise<{ success: boolean; stats: EelTranscriptCacheStats }>;
+    configure_transcripts: (config: Partial<EelTranscriptSettings>) => () => Promise<{ success: boolean; settings?: EelTranscriptSettings; message?: string }>;
+    get_transcript_settings: () => () => Promise<EelTranscriptSettings>;
+    clear_transcript_cache: () => () => Promise<{ success: boolean }>;
 }
 
 declare global {
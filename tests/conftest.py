@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Backend modules write caches and journals to the data dir; keep test runs out of the user's one
+os.environ["STREAMPLAYER_DATA_DIR"] = tempfile.mkdtemp(prefix="streamplayer-tests-")
@@ -0,0 +1,235 @@
+import asyncio
+import base64
+import hashlib
+import struct
+
+import pytest
+
+from providers.async_ws import (
+    AsyncWebSocket, WebSocketClosed, WS_GUID, OP_BINARY, OP_CLOSE, OP_CONT, OP_PING, OP_PONG, OP_TEXT, apply_mask
+)
+
+
+def server_frame(opcode, payload=b"", fin=True, mask=None):
+    """Server -> client frame; mask= only to test that masked server frames are tolerated"""
+    header = bytearray([(0x80 if fin else 0) | opcode])
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 1 << 16:
+        header.append(mask_bit | 126)
+        header += struct.pack("!H", length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack("!Q", length)
+    if mask:
+        return bytes(header) + mask + apply_mask(payload, mask)
+    return bytes(header) + payload
+
+
+async def read_client_frame(reader):
+    """Returns (opcode, payload, masked)"""
+    head = await reader.readexactly(2)
+    opcode = head[0] & 0x0F
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    masked = bool(head[1] & 0x80)
+    mask = await reader.readexactly(4) if masked else b"\0\0\0\0"
+    return opcode, apply_mask(await reader.readexactly(length), mask), masked
+
+
+def run_with_server(handler, client_test, **connect_kwargs):
+    """
+    Starts a one-connection stub server running handler(reader, writer) after the HTTP upgrade,
+    connects an AsyncWebSocket to it and runs client_test(ws). Returns (client result, server result).
+    """
+    async def main():
+        server_result = asyncio.get_running_loop().create_future()
+
+        async def on_connect(reader, writer):
+            request = await reader.readuntil(b"\r\n\r\n")
+            key = next(line.split(":", 1)[1].strip() for line in request.decode().split("\r\n")
+                       if line.lower().startswith("sec-websocket-key"))
+            accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+            writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                          f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+            try:
+                server_result.set_result(await handler(reader, writer))
+            except Exception as e:
+                server_result.set_exception(e)
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(on_connect, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            ws = await AsyncWebSocket.connect(f"ws://127.0.0.1:{port}/connection", **connect_kwargs)
+            try:
+                client_result = await asyncio.wait_for(client_test(ws), 5)
+            finally:
+                await ws.close()
+            return client_result, await asyncio.wait_for(server_result, 5)
+        finally:
+            server.close()
+
+    return asyncio.run(main())
+
+
+def test_apply_mask_round_trip():
+    payload = bytes(range(256)) * 3 + b"tail"
+    mask = b"\x12\x34\x56\x78"
+    masked = apply_mask(payload, mask)
+    assert masked != payload
+    assert masked[:4] == bytes(b ^ m for b, m in zip(payload[:4], mask))
+    assert apply_mask(masked, mask) == payload
+    assert apply_mask(b"", mask) == b""
+
+
+def test_client_frames_are_masked():
+    async def handler(reader, writer):
+        frames = [await read_client_frame(reader) for _ in range(3)]
+        writer.write(server_frame(OP_CLOSE, struct.pack("!H", 1000)))
+        return frames
+
+    async def client(ws):
+        await ws.send("привет")
+        await ws.send(b"\x00\x01" * 100)
+        await ws.send("x" * 70000)
+
+    _, frames = run_with_server(handler, client, ping_interval=None)
+    assert [(opcode, masked) for opcode, _, masked in frames] == [(OP_TEXT, True), (OP_BINARY, True), (OP_TEXT, True)]
+    assert frames[0][1].decode() == "привет"
+    assert frames[1][1] == b"\x00\x01" * 100
+    assert frames[2][1] == b"x" * 70000
+
+
+def test_fragmented_message_with_interleaved_ping():
+    async def handler(reader, writer):
+        writer.write(server_frame(OP_TEXT, "hel".encode(), fin=False))
+        writer.write(server_frame(OP_PING, b"keepalive"))
+        writer.write(server_frame(OP_CONT, "lo ".encode(), fin=False))
+        writer.write(server_frame(OP_CONT, "мир".encode()))
+        writer.write(server_frame(OP_BINARY, b"\xff\x00", mask=b"\x01\x02\x03\x04"))
+        return await read_client_frame(reader)
+
+    async def client(ws):
+        return [await ws.recv(), await ws.recv()]
+
+    messages, pong = run_with_server(handler, client, ping_interval=None)
+    assert messages == ["hello мир", b"\xff\x00"]
+    assert pong == (OP_PONG, b"keepalive", True)
+
+
+def test_client_initiated_close_handshake():
+    async def handler(reader, writer):
+        opcode, payload, _ = await read_client_frame(reader)
+        writer.write(server_frame(OP_CLOSE, payload[:2]))
+        return opcode, payload
+
+    async def client(ws):
+        await ws.close(1000, "done")
+        with pytest.raises(WebSocketClosed):
+            await ws.send("late")
+        with pytest.raises(WebSocketClosed):
+            await ws.recv()
+        return ws.close_code, ws._reader_task.done()
+
+    (code, reader_done), (opcode, payload) = run_with_server(handler, client, ping_interval=None)
+    assert opcode == OP_CLOSE
+    assert payload == struct.pack("!H", 1000) + b"done"
+    assert code == 1000
+    assert reader_done
+
+
+def test_server_initiated_close_is_echoed():
+    async def handler(reader, writer):
+        writer.write(server_frame(OP_TEXT, b"last"))
+        writer.write(server_frame(OP_CLOSE, struct.pack("!H", 1001) + b"going away"))
+        return await read_client_frame(reader)
+
+    async def client(ws):
+        messages = [message async for message in ws]
+        return messages, ws.close_code, ws.close_reason
+
+    (messages, code, reason), echo = run_with_server(handler, client, ping_interval=None)
+    assert messages == ["last"]
+    assert (code, reason) == (1001, "going away")
+    assert echo == (OP_CLOSE, struct.pack("!H", 1001), True)
+
+
+def test_connection_loss_ends_iteration_with_1006():
+    async def handler(reader, writer):
+        writer.write(server_frame(OP_TEXT, b"one"))
+        await writer.drain()
+
+    async def client(ws):
+        first = await ws.recv()
+        with pytest.raises(WebSocketClosed) as closed:
+            await ws.recv()
+        return first, closed.value.code
+
+    (first, code), _ = run_with_server(handler, client, ping_interval=None)
+    assert (first, code) == ("one", 1006)
+
+
+def test_unexpected_continuation_is_a_protocol_error():
+    async def handler(reader, writer):
+        writer.write(server_frame(OP_CONT, b"orphan"))
+        return await read_client_frame(reader)
+
+    async def client(ws):
+        with pytest.raises(WebSocketClosed) as closed:
+            await ws.recv()
+        return closed.value.code
+
+    code, (opcode, payload, _) = run_with_server(handler, client, ping_interval=None)
+    assert code == 1002
+    assert opcode == OP_CLOSE and payload[:2] == struct.pack("!H", 1002)
+
+
+def test_pongs_are_read_while_the_consumer_is_busy():
+    """A consumer blocked between recv() calls (subscribe HTTP request) must not trip the pong deadline"""
+    async def handler(reader, writer):
+        pings = 0
+        while True:
+            opcode, payload, _ = await read_client_frame(reader)
+            if opcode == OP_PING:
+                pings += 1
+                writer.write(server_frame(OP_PONG, payload))
+            elif opcode == OP_CLOSE:
+                writer.write(server_frame(OP_CLOSE, payload[:2]))
+                return pings
+
+    async def client(ws):
+        await asyncio.sleep(0.5)  # never calls recv()
+        return ws.closed
+
+    closed, pings = run_with_server(handler, client, ping_interval=0.05, ping_timeout=0.05)
+    assert closed is False
+    assert pings >= 3
+
+
+def test_missing_pong_closes_and_keepalive_stops():
+    async def handler(reader, writer):
+        pings = 0
+        try:
+            while True:
+                opcode, _, _ = await read_client_frame(reader)
+                pings += 1 if opcode == OP_PING else 0
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return pings
+
+    async def client(ws):
+        with pytest.raises(WebSocketClosed) as closed:
+            await ws.recv()
+        await asyncio.sleep(0.2)
+        return closed.value.code, ws._keepalive_task.done()
+
+    (code, keepalive_done), pings = run_with_server(handler, client, ping_interval=0.05, ping_timeout=0.05)
+    assert code == 1006
+    assert keepalive_done
+    assert pings == 1
@@ -0,0 +1,98 @@
+import json
+
+from providers.centrifugo import CentrifugoDecoder, PROTOCOL_PROTOBUF, Publication, Reply, unwrap_donation
+
+
+def varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def field(number, value):
+    if isinstance(value, int):
+        return varint(number << 3) + varint(value)
+    return varint(number << 3 | 2) + varint(len(value)) + value
+
+
+def delimited(*messages):
+    return b"".join(varint(len(message)) + message for message in messages)
+
+
+def publication_line(donation, offset=7, channel="$alerts:donation_1"):
+    return json.dumps({"result": {"channel": channel, "data": {"offset": offset, "data": donation}}})
+
+
+def test_batched_json_frame_yields_every_record():
+    decoder = CentrifugoDecoder(loads=json.loads)
+    frame = "\n".join([
+        json.dumps({"id": 1, "result": {"client": "abc"}}),
+        "{}",
+        '{"result":{"type":1,"channel":"x"}}',
+        publication_line({"id": 5, "username": "bob", "amount": 100}),
+    ])
+    records = decoder.decode(frame)
+    assert isinstance(records[0], Reply) and records[0].result == {"client": "abc"}
+    assert isinstance(records[1], Publication)
+    assert (records[1].offset, records[1].donation["username"]) == (7, "bob")
+    assert decoder.stats["pings"] == 1
+    assert decoder.stats["skipped"] == 1
+
+
+def test_bad_lines_do_not_abort_the_frame():
+    decoder = CentrifugoDecoder(loads=json.loads)
+    frame = "\n".join(["[1, 2]", "42", '"text"', "not json", publication_line({"id": 6, "amount": 1})])
+    records = decoder.decode(frame)
+    assert [record.donation["id"] for record in records] == [6]
+    assert decoder.stats["errors"] == 4
+
+
+def test_connection_info_is_not_a_donation():
+    assert unwrap_donation({"data": {"info": {"user": 1}}}) is None
+    assert unwrap_donation({"data": {"id": 1}}) == {"id": 1}
+    assert unwrap_donation(["not", "a", "dict"]) is None
+
+
+def test_protobuf_frame_with_a_broken_payload_keeps_the_rest():
+    def push(payload, offset):
+        publication = field(4, payload) + field(6, offset)
+        return field(3, field(2, b"$alerts:donation_1") + field(3, publication))
+
+    decoder = CentrifugoDecoder(loads=json.loads, protocol=PROTOCOL_PROTOBUF)
+    frame = delimited(
+        field(1, 1) + field(3, b"raw"),
+        push(b"{broken", 8),
+        push(json.dumps({"id": 9, "amount": 50}).encode(), 9),
+    )
+    records = decoder.decode(frame)
+    assert isinstance(records[0], Reply) and records[0].id == 1
+    assert [(record.offset, record.donation["id"]) for record in records[1:]] == [(9, 9)]
+    assert decoder.stats["errors"] == 1
+
+
+def test_protobuf_reply_length_is_not_mistaken_for_json():
+    decoder = CentrifugoDecoder(loads=json.loads, protocol=PROTOCOL_PROTOBUF)
+    # 10-byte Reply{id=1}: the length prefix is "\n"; 123 would be "{"
+    reply = field(1, 1) + field(3, b"result")
+    assert len(reply) == 10
+    for frame in (delimited(reply), delimited(reply + field(3, b"x" * 111))):
+        assert frame[:1] in (b"\n", b"{")
+        records = decoder.decode(frame)
+        assert [(type(record), record.id) for record in records] == [(Reply, 1)]
+    assert decoder.decode(b"\x00") == []
+    assert decoder.stats["errors"] == 0
+    assert decoder.stats["pings"] == 1
+
+
+def test_binary_json_frame_that_is_not_utf8_is_one_error():
+    decoder = CentrifugoDecoder(loads=json.loads)
+    assert decoder.decode(b'{"result": "\xff"}') == []
+    assert decoder.stats["errors"] == 1
+    records = decoder.decode(publication_line({"id": 7, "amount": 1}).encode())
+    assert records[0].donation["id"] == 7
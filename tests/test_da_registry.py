@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+import providers.da_registry as da_registry_module
+from providers.da_registry import DonationAlertsRegistry
+
+
+class Running:
+    def __init__(self):
+        self.stopped = False
+
+    def done(self):
+        return self.stopped
+
+
+class FakeProvider:
+    """Just what the registry touches: user id, supervisor state, start/stop and the donation callback"""
+
+    def __init__(self, logger, account_id, on_donation):
+        self.account_id = account_id
+        self.on_donation = on_donation
+        self.user_id = 42
+        self.user_name = "streamer"
+        self._supervisor = None
+        self.starts = 0
+
+    def _start_websocket(self):
+        self.starts += 1
+        self._supervisor = Running()
+
+    async def disconnect(self):
+        if self._supervisor is not None:
+            self._supervisor.stopped = True
+        return {"success": True}
+
+    def receive(self, donation):
+        """A donation arriving on this provider's socket"""
+        assert self._supervisor is not None and not self._supervisor.done(), "no connection"
+        self.on_donation(self.account_id, donation)
+
+    def get_status(self):
+        running = self._supervisor is not None and not self._supervisor.done()
+        return {"status": "connected" if running else "disconnected"}
+
+    def get_metrics(self):
+        return {}
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    sent = []
+    monkeypatch.setattr(da_registry_module, "send_to_ui", lambda name, data: sent.append((name, data)))
+    return sent
+
+
+@pytest.fixture
+def registry(sent):
+    registry = DonationAlertsRegistry(max_connections=2, provider_factory=FakeProvider)
+    for account_id in ("owner", "rider1", "rider2"):
+        registry.account(account_id)
+        registry._attach(account_id)
+    return registry
+
+
+def test_same_user_accounts_share_one_connection(registry):
+    assert registry.shared == {"rider1": "owner", "rider2": "owner"}
+    assert [registry.accounts[a].starts for a in ("owner", "rider1", "rider2")] == [1, 0, 0]
+
+
+def test_removing_the_owner_hands_riders_over(registry, sent):
+    result = asyncio.run(registry.remove_account("owner"))
+    assert result == {"success": True}
+    assert "owner" not in registry.accounts
+    # rider1 opened its own connection, rider2 moved onto it
+    assert registry.accounts["rider1"].starts == 1
+    assert registry.shared == {"rider2": "rider1"}
+    assert registry.get_status()["accounts"] == {"rider1": "connected", "rider2": "connected"}
+
+    registry.accounts["rider1"].receive({"id": 1, "amount": 100, "currency": "RUB"})
+    donations = [data for name, data in sent if name == "onNewDonation"]
+    assert [(d["id"], d["account_id"]) for d in donations] == [(1, "rider1")]
+
+
+def test_disconnecting_everything_hands_nothing_over(registry):
+    result = asyncio.run(registry.disconnect())
+    assert result["handed_over"] == {}
+    assert registry.shared == {}
+    assert registry.get_status()["status"] == "disconnected"
+
+
+def test_riders_that_cannot_reconnect_are_reported(sent):
+    registry = DonationAlertsRegistry(max_connections=1, provider_factory=FakeProvider)
+    for account_id in ("owner", "rider", "other"):
+        registry.account(account_id)
+    registry.accounts["other"].user_id = 7
+    registry._attach("owner")
+    registry._attach("rider")
+    # The only slot is taken by another DA user once the owner goes away
+    registry.accounts["other"]._start_websocket()
+
+    result = asyncio.run(registry.disconnect("owner"))
+    assert result["handed_over"]["rider"]["success"] is False
+    assert ("onDAConnectionStatus", {"status": "disconnected", "account_id": "rider"}) in sent
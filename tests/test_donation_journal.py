@@ -0,0 +1,120 @@
+import pytest
+
+import providers.donation_journal as journal_module
+from providers.donation_journal import DonationJournal
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "donations.sqlite3")
+
+
+@pytest.fixture
+def journal(db_path):
+    journal = DonationJournal(db_path=db_path, flush_interval=0.001)
+    journal.start()
+    yield journal
+    journal.close()
+
+
+def donation(donation_id, amount=100):
+    return {"id": donation_id, "username": f"donor{donation_id}", "amount": amount}
+
+
+def test_offsets_are_sequential_and_duplicates_dropped(journal):
+    first = journal.record("DA", donation(10))
+    second = journal.record("DA", donation(11))
+    assert (first["journal_offset"], second["journal_offset"]) == (1, 2)
+    assert first["source"] == "DA"
+
+    assert journal.record("DA", donation(10)) is None
+    # The same id from another provider is a different donation
+    assert journal.record("DX", donation(10))["journal_offset"] == 3
+    assert journal.get_stats()["duplicates"] == 1
+
+
+def test_donations_without_id_are_never_deduplicated(journal):
+    assert journal.record("DA", {"amount": 1}) is not None
+    assert journal.record("DA", {"amount": 1}) is not None
+
+
+def test_pending_skips_acknowledged(journal):
+    for donation_id in range(1, 5):
+        journal.record("DA", donation(donation_id))
+    assert journal.ack("ui", [1, 2]) == 2
+    assert [entry["journal_offset"] for entry in journal.pending("ui")] == [3, 4]
+    # Other consumers keep their own position
+    assert len(journal.pending("overlay")) == 4
+
+
+def test_out_of_order_acks_wait_for_the_gap(journal):
+    for donation_id in range(1, 6):
+        journal.record("DA", donation(donation_id))
+
+    assert journal.ack("ui", [2, 3]) == 0
+    # 2 and 3 are handled, 1 is not: only 1 (and the rest) is pending
+    assert [entry["journal_offset"] for entry in journal.pending("ui")] == [1, 4, 5]
+
+    assert journal.ack("ui", 1) == 3
+    assert [entry["journal_offset"] for entry in journal.pending("ui")] == [4, 5]
+    # Re-acking old offsets does not move the position back
+    assert journal.ack("ui", [1, 2]) == 3
+
+
+def test_state_survives_restart(db_path):
+    journal = DonationJournal(db_path=db_path, flush_interval=0.001)
+    journal.start()
+    for donation_id in range(1, 4):
+        journal.record("DA", donation(donation_id))
+    journal.ack("ui", [1])
+    journal.flush()
+    journal.close()
+
+    reopened = DonationJournal(db_path=db_path, flush_interval=0.001)
+    reopened.start()
+    try:
+        assert [entry["journal_offset"] for entry in reopened.pending("ui")] == [2, 3]
+        # Offsets continue and already journaled ids are still recognized
+        assert reopened.record("DA", donation(3)) is None
+        assert reopened.record("DA", donation(4))["journal_offset"] == 4
+        assert reopened.get_stats()["consumers"] == {"ui": 1}
+    finally:
+        reopened.close()
+
+
+def test_replay_resends_unacknowledged(journal, monkeypatch):
+    sent = []
+    monkeypatch.setattr(journal_module, "send_to_ui", lambda name, data: sent.append((name, data)))
+    for donation_id in range(1, 4):
+        journal.record("DA", donation(donation_id))
+    journal.ack("ui", [1])
+
+    assert journal.replay("ui") == 2
+    assert [name for name, _ in sent] == ["onNewDonation", "onNewDonation"]
+    assert [data["journal_offset"] for _, data in sent] == [2, 3]
+    assert all(data["replayed"] for _, data in sent)
+    assert journal.replay("ui") == 2  # still unacknowledged
+    journal.ack("ui", [2, 3])
+    assert journal.replay("ui") == 0
+
+
+def test_offsets_continue_after_everything_was_pruned(db_path):
+    journal = DonationJournal(db_path=db_path, flush_interval=0.001, retention=0)
+    journal.start()
+    for donation_id in range(1, 6):
+        journal.record("DA", donation(donation_id))
+    journal.ack("ui", [1, 2, 3, 4, 5])
+    journal.flush()
+    journal._last_prune = 0.0
+    journal._maybe_prune()
+    assert journal._db.execute("SELECT COUNT(*) FROM donations").fetchone()[0] == 0
+    journal.close()
+
+    reopened = DonationJournal(db_path=db_path, flush_interval=0.001)
+    reopened.start()
+    try:
+        assert reopened.pending("ui") == []
+        assert reopened.record("DA", donation(6))["journal_offset"] == 6
+        assert [entry["id"] for entry in reopened.pending("ui")] == [6]
+    finally:
+        reopened.close()
@@ -0,0 +1,141 @@
+import json
+import socket
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+import pytest
+import requests
+
+from providers.http_client import HttpClient, LatencyHistogram, parse_retry_after
+
+
+class StubServer:
+    """
+    Local HTTP/1.1 server with keep-alive. script[path] is a list of (status, headers) answers
+    served in order (the last one repeats); every connection and request is counted.
+    """
+
+    def __init__(self):
+        self.script = {}
+        self.requests = defaultdict(list)
+        self.connections = set()
+        self._lock = Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _answer(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with stub._lock:
+                    stub.connections.add(self.client_address)
+                    calls = stub.requests[self.path]
+                    calls.append((self.command, body))
+                    answers = stub.script.get(self.path, [(200, {})])
+                    status, headers = answers[min(len(calls), len(answers)) - 1]
+                payload = json.dumps({"path": self.path, "attempt": len(calls)}).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _answer
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    with StubServer() as server:
+        yield server
+
+
+@pytest.fixture
+def client():
+    client = HttpClient(max_retries=3, backoff_base=0.001, backoff_max=0.01)
+    yield client
+    client.session.close()
+
+
+def test_keep_alive_reuses_one_connection(stub, client):
+    for _ in range(5):
+        assert client.get(f"{stub.url}/ping").json()["path"] == "/ping"
+    assert len(stub.requests["/ping"]) == 5
+    assert len(stub.connections) == 1
+
+
+def test_idempotent_request_is_retried_on_5xx(stub, client):
+    stub.script["/flaky"] = [(503, {}), (502, {}), (200, {})]
+    response = client.get(f"{stub.url}/flaky", endpoint="test.flaky")
+    assert response.status_code == 200
+    assert response.json()["attempt"] == 3
+    assert client.get_stats()["test.flaky"]["outcomes"] == {"503": 1, "502": 1, "200": 1}
+
+
+def test_retries_stop_after_max_retries(stub, client):
+    stub.script["/down"] = [(500, {})]
+    assert client.get(f"{stub.url}/down").status_code == 500
+    assert len(stub.requests["/down"]) == 4
+
+
+def test_post_is_not_retried_on_5xx_but_is_on_429(stub, client):
+    stub.script["/charge"] = [(500, {}), (200, {})]
+    assert client.post(f"{stub.url}/charge", json={"n": 1}).status_code == 500
+    assert len(stub.requests["/charge"]) == 1
+
+    stub.script["/limited"] = [(429, {"Retry-After": "0"}), (200, {})]
+    assert client.post(f"{stub.url}/limited", json={"n": 2}).status_code == 200
+    assert [json.loads(body) for _, body in stub.requests["/limited"]] == [{"n": 2}, {"n": 2}]
+
+
+def test_connection_errors_are_retried_then_raised(client):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    # Nothing listens on the port any more
+    with pytest.raises(requests.ConnectionError):
+        client.get(f"http://127.0.0.1:{port}/", endpoint="test.refused")
+    assert client.get_stats()["test.refused"]["outcomes"] == {"error": 4}
+
+
+def test_retry_after_forms():
+    assert parse_retry_after("2.5") == 2.5
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+
+def test_backoff_honours_retry_after_and_cap():
+    client = HttpClient(backoff_base=1.0, backoff_max=4.0)
+    assert client._backoff(0, retry_after=2.0) == 2.0
+    assert client._backoff(0, retry_after=60.0) == 4.0
+    assert all(0 <= client._backoff(10) <= 4.0 for _ in range(100))
+
+
+def test_latency_histogram_quantiles():
+    histogram = LatencyHistogram(buckets=(10, 100))
+    for value in (1, 2, 3, 50, 500):
+        histogram.observe(value)
+    assert histogram.counts == [3, 1, 1]
+    assert histogram.quantile(0.5) == 10
+    assert histogram.quantile(0.99) == 500
+    assert histogram.to_dict()["buckets"] == {"10": 3, "100": 1, "+Inf": 1}
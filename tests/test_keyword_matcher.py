@@ -0,0 +1,73 @@
+import random
+
+from providers.keyword_matcher import AhoCorasick, KeywordMatcher, normalize_text
+
+
+def brute_force(keywords, text):
+    text = normalize_text(text)
+    found = set()
+    for keyword in keywords:
+        pattern = normalize_text(keyword).strip()
+        if not pattern:
+            continue
+        start = text.find(pattern)
+        while start != -1:
+            found.add((pattern, start, start + len(pattern)))
+            start = text.find(pattern, start + 1)
+    return found
+
+
+def automaton_matches(keywords, text):
+    automaton = AhoCorasick(keywords)
+    return {
+        (normalize_text(automaton.terms[idx]).strip(), start, end)
+        for idx, start, end in automaton.iter_matches(normalize_text(text))
+    }
+
+
+def test_overlapping_and_suffix_patterns():
+    keywords = ["he", "she", "his", "hers"]
+    assert automaton_matches(keywords, "ushers") == {("she", 1, 4), ("he", 2, 4), ("hers", 2, 6)}
+
+
+def test_matches_brute_force_on_random_texts():
+    rng = random.Random(3)
+    alphabet = "abcб "
+    for _ in range(200):
+        keywords = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 8))]
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        assert automaton_matches(keywords, text) == brute_force(keywords, text)
+
+
+def test_normalization_is_case_and_width_insensitive():
+    keywords = ["Спойлер", "STRASSE", "ｆｕｌｌ"]
+    matches = automaton_matches(keywords, "Большой СПОЙЛЕР на straße, full width")
+    assert {pattern for pattern, _, _ in matches} == {"спойлер", "strasse", "full"}
+
+
+def test_blank_and_repeated_keywords_are_skipped():
+    automaton = AhoCorasick(["", "  ", "word", "WORD", " word "])
+    assert len(automaton) == 1
+    assert automaton.terms == ["word"]
+
+
+def test_matcher_reports_original_terms_and_limits():
+    matcher = KeywordMatcher()
+    text = "bad, Bad, BAD and worse"
+    assert [m["term"] for m in matcher.match(text, ["Bad", "worse"])] == ["Bad", "Bad", "Bad", "worse"]
+    assert matcher.match(text, ["Bad", "worse"], first_only=True) == [{"term": "Bad", "start": 0, "end": 3}]
+    assert len(matcher.match(text, ["Bad", "worse"], max_matches=2)) == 2
+    assert matcher.match("", ["Bad"]) == []
+    assert matcher.match("clean text", []) == []
+
+
+def test_automaton_is_rebuilt_only_when_keywords_change():
+    matcher = KeywordMatcher()
+    matcher.match("a", ["x", "y"])
+    matcher.match("b", ["x", "y"])
+    assert matcher.builds == 1
+    matcher.match("c", ["x"])
+    assert matcher.builds == 2
+    # keywords=None reuses the last automaton
+    assert matcher.match("x marks", None) == [{"term": "x", "start": 0, "end": 1}]
+    assert matcher.builds == 2
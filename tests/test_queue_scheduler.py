@@ -0,0 +1,134 @@
+import random
+
+import pytest
+
+import providers.queue_store as queue_store_module
+from providers.queue_scheduler import FairScheduler, QueueRejected
+from providers.queue_store import QueueStore
+
+
+def item(n, requester, amount=0):
+    return {"id": f"vid{n}", "queueId": f"q{n}", "requester": requester, "amount": amount}
+
+
+def play_order(scheduler):
+    order = []
+    while True:
+        queue_id = scheduler.pop()
+        if queue_id is None:
+            return order
+        order.append(queue_id)
+
+
+def test_fair_policy_interleaves_requesters():
+    scheduler = FairScheduler("fair", tiers=[[0, 1]])
+    for n in range(1, 4):
+        scheduler.push(item(n, "alice"))
+    scheduler.push(item(4, "bob"))
+    scheduler.push(item(5, "carol"))
+    assert play_order(scheduler) == ["q1", "q4", "q5", "q2", "q3"]
+
+
+def test_bigger_tiers_overtake_and_priority_ignores_requesters():
+    scheduler = FairScheduler("priority", tiers=[[0, 1], [500, 4]])
+    for n in range(1, 4):
+        scheduler.push(item(n, "alice"))
+    scheduler.push(item(4, "alice", amount=500))
+    assert play_order(scheduler) == ["q4", "q1", "q2", "q3"]
+
+
+def test_tags_are_stable_and_reprioritize_moves_one_item():
+    scheduler = FairScheduler("fair", tiers=[[0, 1], [100, 2]])
+    tags = {f"q{n}": scheduler.push(item(n, f"donor{n}")) for n in range(1, 4)}
+    assert tags["q1"] == tags["q2"] == tags["q3"] == 1.0
+    assert scheduler.reprioritize("q3", amount=100) == 0.5
+    assert scheduler.tag("q1") == 1.0
+    assert scheduler.reprioritize("missing", amount=100) is None
+    assert play_order(scheduler)[0] == "q3"
+
+
+def test_per_donor_cap_counts_queued_items_only():
+    scheduler = FairScheduler("fair", max_per_donor=2)
+    for n in (1, 2):
+        assert scheduler.admit(item(n, "Alice")) == (True, None)
+        scheduler.push(item(n, "Alice"))
+    admitted, reason = scheduler.admit(item(3, "alice "))
+    assert not admitted and "2 video(s)" in reason
+    # Items added by hand have no requester and are never capped
+    assert scheduler.admit(item(4, ""))[0]
+    scheduler.pop()
+    assert scheduler.admit(item(3, "alice"))[0]
+    assert scheduler.get_stats()["rejected"] == 1
+
+
+def test_removed_entries_are_compacted():
+    scheduler = FairScheduler("fair")
+    for n in range(200):
+        scheduler.push(item(n, f"donor{n % 7}"))
+    for n in range(190):
+        scheduler.remove(f"q{n}")
+    assert len(scheduler) == 10
+    assert scheduler.get_stats()["compactions"] >= 1
+    assert sorted(play_order(scheduler)) == sorted(f"q{n}" for n in range(190, 200))
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(queue_store_module, "send_to_ui", lambda name, data: None)
+    store = QueueStore(db_path=str(tmp_path / "queue.sqlite3"))
+    store.configure_scheduler({"policy": "fair", "tiers": [[0, 1], [500, 4]], "max_per_donor": 3})
+    return store
+
+
+def queue_ids(store):
+    return [entry["queueId"] for entry in store.snapshot()["queue"]]
+
+
+def test_store_rejects_over_the_donor_cap(store, monkeypatch):
+    monkeypatch.setattr(queue_store_module, "queue_store", store)
+    for n in range(1, 5):
+        store.add(item(n, "alice"))
+    with pytest.raises(QueueRejected):
+        store.add(item(5, "alice"))
+    assert queue_ids(store) == ["q2", "q3", "q4"]
+    assert queue_store_module.queue_add(item(6, "alice"))["reason"] == "queue_cap"
+
+
+def test_store_list_follows_tag_order(store):
+    store.add(item(0, "streamer-start"))
+    for n in range(1, 4):
+        store.add(item(n, "alice"))
+    store.add(item(4, "bob"))
+    store.add(item(5, "carol", amount=500))
+    assert queue_ids(store) == ["q5", "q1", "q4", "q2", "q3"]
+    assert store.play_next()["queueId"] == "q5"
+
+
+def test_tag_index_matches_the_list_after_random_operations(store):
+    rng = random.Random(11)
+    next_id = 0
+    for _ in range(400):
+        ids = queue_ids(store)
+        action = rng.random()
+        if action < 0.45 or not ids:
+            next_id += 1
+            try:
+                store.add(item(next_id, f"donor{rng.randrange(6)}", amount=rng.choice([0, 0, 100, 500, 1000])))
+            except QueueRejected:
+                pass
+        elif action < 0.6:
+            store.move(rng.choice(ids), rng.choice(ids + [None]))
+        elif action < 0.7:
+            store.reprioritize(rng.choice(ids), rng.choice([0, 500, 1000]))
+        elif action < 0.8:
+            store.remove(rng.choice(ids))
+        elif action < 0.95:
+            store.play_next()
+        else:
+            store.play_previous()
+
+        tags = [store._nodes[queue_id].tag for queue_id in queue_ids(store)]
+        assert tags == sorted(tags)
+        assert store._index_tags == tags
+        assert sorted(store._index_ids) == sorted(queue_ids(store))
+        assert [store.scheduler.tag(queue_id) for queue_id in queue_ids(store)] == tags
@@ -0,0 +1,186 @@
+import random
+
+import pytest
+
+import providers.queue_store as queue_store_module
+from providers.queue_store import QueueStore
+
+
+class Mirror:
+    """The UI side of the diff sync: applies onQueueOps the way useStore.applyQueueOps does"""
+
+    def __init__(self):
+        self.version = 0
+        self.queue = []
+        self.current = None
+        self.history = []
+        self.gaps = 0
+
+    def apply(self, version, ops):
+        if version != self.version + 1:
+            self.gaps += 1
+        self.version = version
+        for op in ops:
+            kind = op["op"]
+            if kind == "insert":
+                self._insert_after(op["item"], op["after"])
+            elif kind == "remove":
+                self.queue = [v for v in self.queue if v["queueId"] != op["queueId"]]
+            elif kind == "move":
+                item = next(v for v in self.queue if v["queueId"] == op["queueId"])
+                self.queue.remove(item)
+                self._insert_after(item, op["after"])
+            elif kind == "clear":
+                self.queue = []
+            elif kind == "current":
+                self.current = op["item"]
+            elif kind == "history_push":
+                self.history = [op["item"]] + self.history
+            elif kind == "history_pop":
+                self.history = self.history[1:]
+
+    def _insert_after(self, item, after):
+        index = 0 if after is None else next(i for i, v in enumerate(self.queue) if v["queueId"] == after) + 1
+        self.queue.insert(index, item)
+
+    def ids(self):
+        return [v["queueId"] for v in self.queue]
+
+
+@pytest.fixture
+def mirror(monkeypatch):
+    mirror = Mirror()
+    monkeypatch.setattr(queue_store_module, "send_to_ui", lambda name, data: mirror.apply(data["version"], data["ops"]))
+    return mirror
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "queue.sqlite3")
+
+
+@pytest.fixture
+def store(db_path, mirror):
+    return QueueStore(db_path=db_path)
+
+
+def video(n, **extra):
+    return dict({"id": f"vid{n}", "queueId": f"q{n}", "title": f"Video {n}"}, **extra)
+
+
+def queue_ids(store):
+    return [item["queueId"] for item in store.snapshot()["queue"]]
+
+
+def test_first_video_starts_playing_then_queues(store, mirror):
+    store.add(video(1))
+    store.add(video(2))
+    store.add(video(3))
+    assert store.current["queueId"] == "q1"
+    assert queue_ids(store) == ["q2", "q3"]
+    assert mirror.current["queueId"] == "q1"
+    assert mirror.ids() == ["q2", "q3"]
+
+
+def test_every_mutation_is_one_version(store, mirror):
+    for n in range(1, 5):
+        store.add(video(n))
+    store.move("q4", None)
+    store.remove("q3")
+    store.play_next()
+    store.play_previous()
+    store.clear()
+    assert store.version == 9
+    assert mirror.version == 9
+    assert mirror.gaps == 0
+    # No-op mutations do not bump the version
+    assert store.remove("missing") is False
+    assert store.move("missing", None) is False
+    assert store.version == 9
+
+
+def test_play_next_and_previous_keep_history(store, mirror):
+    for n in range(1, 4):
+        store.add(video(n))
+    assert store.play_next()["queueId"] == "q2"
+    assert store.play_next()["queueId"] == "q3"
+    assert [item["queueId"] for item in store.history] == ["q2", "q1"]
+    assert queue_ids(store) == []
+
+    assert store.play_previous()["queueId"] == "q2"
+    assert queue_ids(store) == ["q3"]
+    assert [item["queueId"] for item in mirror.history] == ["q1"]
+    assert mirror.ids() == ["q3"]
+
+
+def test_move_rewrites_one_position(store):
+    for n in range(1, 6):
+        store.add(video(n))
+    before = {queue_id: node.position for queue_id, node in store._nodes.items()}
+    store.move("q5", "q2")
+    after = {queue_id: node.position for queue_id, node in store._nodes.items()}
+    assert queue_ids(store) == ["q2", "q5", "q3", "q4"]
+    assert [queue_id for queue_id in before if before[queue_id] != after[queue_id]] == ["q5"]
+    assert before["q2"] < after["q5"] < before["q3"]
+
+
+def test_dense_positions_are_renumbered(store):
+    for n in range(1, 4):
+        store.add(video(n))
+    # Keep moving into the same gap until the midpoint runs out of precision
+    for n in range(4, 64):
+        store.add(video(n))
+        store.move(f"q{n}", "q2")
+    positions = [store._nodes[queue_id].position for queue_id in queue_ids(store)]
+    assert positions == sorted(positions)
+    assert len(set(positions)) == len(positions)
+    assert queue_ids(store)[:2] == ["q2", "q63"]
+
+
+def test_order_survives_reload(db_path, store):
+    for n in range(1, 7):
+        store.add(video(n))
+    store.move("q6", None)
+    store.move("q2", "q4")
+    store.remove("q5")
+    store.play_next()
+    expected = store.snapshot()
+    store._db.close()
+
+    reloaded = QueueStore(db_path=db_path)
+    snapshot = reloaded.snapshot()
+    assert snapshot["queue"] == expected["queue"]
+    assert snapshot["current"] == expected["current"]
+    assert snapshot["version"] == expected["version"]
+
+
+def test_random_operations_keep_the_mirror_in_sync(store, mirror):
+    rng = random.Random(7)
+    next_id = 0
+    for _ in range(500):
+        ids = queue_ids(store)
+        action = rng.random()
+        if action < 0.4 or not ids:
+            next_id += 1
+            store.add(video(next_id))
+        elif action < 0.6:
+            store.move(rng.choice(ids), rng.choice(ids + [None]))
+        elif action < 0.75:
+            store.remove(rng.choice(ids))
+        elif action < 0.9:
+            store.play_next()
+        else:
+            store.play_previous()
+        assert mirror.ids() == queue_ids(store)
+    assert mirror.current == store.current
+    assert mirror.gaps == 0
+
+
+def test_find_video_reports_where_a_duplicate_is(store):
+    for n in range(1, 4):
+        store.add(video(n))
+    store.play_next()
+    assert store.find_video("vid2") == "current"
+    assert store.find_video("vid3") == "queue"
+    assert store.find_video("vid1") == "history"
+    assert store.find_video("vid9") is None
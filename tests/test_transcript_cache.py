@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+from providers.transcript_cache import TranscriptCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TranscriptCache(db_path=str(tmp_path / "transcripts.sqlite3"))
+
+
+def result(text):
+    return {"success": True, "transcript": text}
+
+
+def disk_keys(cache):
+    return {key for key, in cache._get_db().execute("SELECT key FROM transcripts")}
+
+
+def test_disk_tier_serves_after_memory_eviction(cache):
+    cache.configure(memory_limit=200)
+    cache.put("a", ["ru"], result("x" * 100))
+    cache.put("b", ["ru"], result("y" * 100))
+    assert cache.get("a", ["ru"]) == result("x" * 100)
+    stats = cache.get_stats()
+    assert stats["evictions"] >= 1
+    assert stats["disk_hits"] == 1
+
+
+def test_purge_removes_expired_rows(cache):
+    cache.put("fresh", ["ru"], result("text"))
+    cache.configure(negative_ttl=-1)
+    cache.put("gone", ["ru"], {"success": False, "message": "Subtitles are disabled"}, negative=True)
+    assert disk_keys(cache) == {"fresh|ru", "gone|ru"}
+
+    assert cache.purge_expired() == 1
+    assert disk_keys(cache) == {"fresh|ru"}
+    assert cache.get_stats()["purged"] == 1
+
+
+def test_disk_limit_drops_rows_closest_to_expiry(cache):
+    for index in range(5):
+        cache.configure(ttl=1000 + index)
+        cache.put(f"v{index}", ["ru"], result(f"transcript {index} " * 50))
+    sizes = [size for size, in cache._get_db().execute("SELECT LENGTH(payload) FROM transcripts")]
+
+    cache.configure(disk_limit=sum(sizes) - 1)
+    assert cache.purge_expired() == 1
+    assert disk_keys(cache) == {"v1|ru", "v2|ru", "v3|ru", "v4|ru"}
+    stats = cache.get_stats()
+    assert stats["disk_evictions"] == 1
+    assert stats["disk_bytes"] <= stats["disk_limit"]
+
+
+def test_start_purges_on_the_runtime(cache):
+    cache.configure(ttl=-1)
+    cache.put("old", ["ru"], result("text"))
+    cache.start(interval=3600)
+    deadline = time.monotonic() + 5
+    while disk_keys(cache) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert disk_keys(cache) == set()
+    cache._maintenance.cancel()
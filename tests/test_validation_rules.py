@@ -0,0 +1,160 @@
+from providers.validation_rules import (
+    RuleEngine, RulePlan, RuleTrace, STAGE_CONTENT, STAGE_DONATION, STAGE_METADATA, parse_duration
+)
+
+ALL_FILTERS = {
+    "min_amount": 100,
+    "min_views": 1000,
+    "min_likes": 10,
+    "max_duration": 600,
+    "keywords": ["spoiler"],
+    "blacklisted_urls": ["https://youtu.be/AAAAAAAAAAA", "https://www.youtube.com/channel/UC" + "b" * 22],
+    "captions_enabled": True,
+}
+
+
+def item(title="Fine video", views=5000, likes=50, duration="PT5M", channel="Good Channel"):
+    return {
+        "snippet": {"title": title, "channelId": "UC" + "x" * 22, "channelTitle": channel},
+        "statistics": {"viewCount": str(views), "likeCount": str(likes)},
+        "contentDetails": {"duration": duration},
+    }
+
+
+def ctx(video_id="BBBBBBBBBBB", amount=500, **item_fields):
+    return {"video_id": video_id, "donation": {"amount": amount}, "item": item(**item_fields)}
+
+
+def test_rules_are_grouped_by_stage_and_sorted_by_cost():
+    plan = RulePlan(ALL_FILTERS, duplicate_lookup=lambda video_id: None)
+    assert plan.describe() == {
+        STAGE_DONATION: ["min_amount", "blacklisted_video", "duplicate"],
+        STAGE_METADATA: ["blacklisted_channel", "duration", "min_views", "min_likes", "title_keywords"],
+        STAGE_CONTENT: ["transcript_keywords"],
+    }
+
+
+def test_disabled_filters_compile_to_no_rules():
+    plan = RulePlan({"captions_enabled": True})
+    assert not any(plan.has_stage(stage) for stage in (STAGE_DONATION, STAGE_METADATA, STAGE_CONTENT))
+    # Transcripts are only scanned when there are keywords and captions are enabled
+    assert not RulePlan({"keywords": ["x"], "captions_enabled": False}).has_stage(STAGE_CONTENT)
+
+
+def test_first_failing_rule_stops_the_stage():
+    plan = RulePlan(ALL_FILTERS)
+    trace = RuleTrace()
+    # Too short on views and likes, and a blacklisted title: only the cheapest failure is reported
+    outcome = plan.evaluate(STAGE_METADATA, ctx(views=10, likes=0, title="huge SPOILER"), trace)
+    assert outcome == ("views", {"current": 10, "min": 1000})
+    assert trace.rejection["rule"] == "min_views"
+    stats = plan.get_stats()
+    assert stats["min_views"]["rejected"] == 1
+    assert stats["min_likes"]["calls"] == 0
+    assert stats["title_keywords"]["calls"] == 0
+
+
+def test_passing_video_runs_every_rule():
+    plan = RulePlan(ALL_FILTERS)
+    trace = RuleTrace()
+    assert plan.evaluate(STAGE_METADATA, ctx(), trace) is None
+    assert trace.rejection is None
+    assert set(trace.timings) == {"blacklisted_channel", "duration", "min_views", "min_likes", "title_keywords"}
+
+
+def test_failing_rule_is_isolated():
+    def broken_lookup(video_id):
+        raise RuntimeError("store unavailable")
+
+    plan = RulePlan({"blacklisted_urls": ["AAAAAAAAAAA"]}, duplicate_lookup=broken_lookup)
+    trace = RuleTrace()
+    # The broken duplicate check counts as passed, but is recorded; the rules around it still run
+    assert plan.evaluate(STAGE_DONATION, ctx(), trace) is None
+    assert set(trace.timings) == {"blacklisted_video", "duplicate"}
+    assert trace.errors == {"duplicate": "store unavailable"}
+    assert plan.get_stats()["duplicate"]["errors"] == 1
+    assert plan.evaluate(STAGE_DONATION, ctx(video_id="AAAAAAAAAAA")) == ("blacklisted_url", {"video_id": "AAAAAAAAAAA"})
+
+
+def test_donation_only_rules_run_before_any_video_is_known():
+    plan = RulePlan(ALL_FILTERS, duplicate_lookup=lambda video_id: "queue")
+    trace = RuleTrace()
+    assert plan.evaluate(STAGE_DONATION, {"donation": {"amount": 500}}, trace, per_video=False) is None
+    assert list(trace.timings) == ["min_amount"]
+    assert plan.evaluate(STAGE_DONATION, {"donation": {"amount": 50}}, per_video=False)[0] == "amount"
+
+
+def test_transcript_rule_uses_the_transcript_source():
+    plan = RulePlan(ALL_FILTERS)
+    fetched = []
+
+    def transcript_source(video_id):
+        fetched.append(video_id)
+        return {"success": True, "transcript": "no Spoiler warnings here"}
+
+    outcome = plan.evaluate(STAGE_CONTENT, dict(ctx(), transcript_source=transcript_source))
+    assert outcome == ("blacklist", {"source": "transcript", "term": "spoiler"})
+    assert fetched == ["BBBBBBBBBBB"]
+    # No captions is not a rejection
+    assert plan.evaluate(STAGE_CONTENT, dict(ctx(), transcript_source=lambda video_id: {"success": False})) is None
+
+
+def test_duration_rule_leaves_live_streams_alone():
+    plan = RulePlan({"max_duration": 600})
+    assert plan.evaluate(STAGE_METADATA, ctx(duration="PT1H")) == ("duration", {"current": 3600, "max": 600})
+    assert plan.evaluate(STAGE_METADATA, ctx(duration="P0D")) is None
+    assert parse_duration("P1DT2H3M4S") == 93784
+    assert parse_duration("garbage") is None
+
+
+def test_engine_reuses_compiled_plans():
+    engine = RuleEngine(cache_size=2)
+    first = engine.compile({"min_views": 10, "keywords": ["a"]})
+    assert engine.compile({"keywords": ["a"], "min_views": 10}) is first
+    engine.compile({"min_views": 20})
+    engine.compile({"min_views": 30})
+    assert engine.compile({"min_views": 10, "keywords": ["a"]}) is not first
+
+
+def test_failing_blacklist_rule_rejects():
+    def broken_source(video_id):
+        raise RuntimeError("caption service down")
+
+    plan = RulePlan({"keywords": ["spoiler"], "captions_enabled": True})
+    trace = RuleTrace()
+    outcome = plan.evaluate(STAGE_CONTENT, dict(ctx(), transcript_source=broken_source), trace)
+    assert outcome == ("rule_error", {"error": "caption service down"})
+    assert trace.rejection["rule"] == "transcript_keywords"
+    assert trace.errors == {"transcript_keywords": "caption service down"}
+
+
+def test_handles_match_by_resolved_channel_id():
+    channels = {"@badchannel": "UC" + "x" * 22, "@gone": None}
+    plan = RulePlan({"blacklisted_urls": ["https://www.youtube.com/@BadChannel", "@gone"]},
+                    handle_resolver=channels.get)
+    assert plan.unresolved_handles == ["@gone"]
+    outcome = plan.evaluate(STAGE_METADATA, ctx(channel="Totally Different Title"))
+    assert outcome == ("blacklisted_channel", {"channel_id": "UC" + "x" * 22, "channel": "Totally Different Title",
+                                               "handle": "@badchannel"})
+    # The display title is not a handle
+    plan = RulePlan({"blacklisted_urls": ["@goodchannel"]}, handle_resolver=lambda handle: "UC" + "y" * 22)
+    assert plan.evaluate(STAGE_METADATA, ctx(channel="Good Channel")) is None
+
+
+def test_engine_retries_handles_it_could_not_look_up():
+    lookups = []
+
+    def resolver(handle, api_key):
+        lookups.append((handle, api_key))
+        if api_key == "flaky":
+            raise RuntimeError("quota")
+        return "UC" + "z" * 22
+
+    engine = RuleEngine(handle_resolver=resolver)
+    filters = {"blacklisted_urls": ["@someone"]}
+    assert engine.compile(filters).unresolved_handles == ["@someone"]  # no API key yet
+    assert engine.compile(filters, "flaky").unresolved_handles == ["@someone"]
+    plan = engine.compile(filters, "key")
+    assert plan.unresolved_handles == []
+    assert engine.compile(filters, "key") is plan
+    assert lookups == [("@someone", "flaky"), ("@someone", "key")]
@@ -0,0 +1,106 @@
+import time
+from threading import Lock
+
+import pytest
+
+from providers.video_pipeline import PlaylistIngestor, VideoValidationPipeline
+
+
+def item(title="Fine video"):
+    return {"snippet": {"title": title, "channelId": "UC" + "x" * 22, "channelTitle": "Channel"},
+            "statistics": {"viewCount": "5000", "likeCount": "50"},
+            "contentDetails": {"duration": "PT5M"}}
+
+
+class FakeDataClient:
+    def __init__(self, pages=()):
+        self.pages = list(pages)
+        self.fetched = []
+
+    def fetch_videos(self, video_ids, api_key):
+        self.fetched.extend(video_ids)
+        return {video_id: item() for video_id in video_ids}
+
+    def resolve_handle(self, handle, api_key):
+        return None
+
+    def iter_playlist_pages(self, playlist_id, api_key):
+        for page in self.pages:
+            yield page, sum(len(p) for p in self.pages)
+
+
+class FakeCaptions:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.fetched = []
+        self._lock = Lock()
+
+    def get_transcript(self, video_id, bounded=False):
+        with self._lock:
+            self.fetched.append(video_id)
+        time.sleep(self.delay)
+        return {"success": True, "transcript": "nothing to see"}
+
+
+FILTERS = {"keywords": ["spoiler"], "captions_enabled": True}
+
+
+def ids(prefix, count):
+    return [f"{prefix}{n:08d}" for n in range(count)]
+
+
+@pytest.fixture
+def captions():
+    return FakeCaptions(delay=0.01)
+
+
+@pytest.fixture
+def pipeline(captions):
+    pipeline = VideoValidationPipeline(FakeDataClient(), captions, max_workers=4, transcript_concurrency=1)
+    yield pipeline
+    pipeline.executor.shutdown(wait=True)
+
+
+def test_accepted_videos_keep_input_order(pipeline):
+    accepted = []
+    summary = pipeline.run(ids("ord", 20), {"amount": 100}, FILTERS, "key",
+                           on_accept=lambda index, video: accepted.append(index))
+    assert accepted == list(range(20))
+    assert summary["accepted"] == 20
+    assert summary["skipped"] == 0
+
+
+def test_limit_stops_transcript_fetches(pipeline, captions):
+    accepted = []
+    summary = pipeline.run(ids("cap", 30), {"amount": 100}, FILTERS, "key",
+                           on_accept=lambda index, video: accepted.append(index), limit=3)
+    assert accepted[:3] == [0, 1, 2]
+    # Only fetches already picked up by a worker can go past the limit
+    assert len(captions.fetched) <= 3 + pipeline.executor._max_workers
+    assert summary["skipped"] >= 30 - 3 - pipeline.executor._max_workers
+    assert summary["accepted"] + summary["skipped"] == 30
+
+
+def test_limit_skips_metadata_batches_behind_it(pipeline):
+    summary = pipeline.run(ids("met", 60), {"amount": 100}, {}, "key", limit=0)
+    assert summary["skipped"] == 60
+    assert pipeline.data_client.fetched == []
+
+
+def test_paused_playlist_expires(pipeline):
+    sent = []
+    data_client = FakeDataClient(pages=[ids("pla", 2), ids("plb", 2)])
+    ingestor = PlaylistIngestor(pipeline, data_client, lambda name, data: sent.append((name, data)))
+    ingestor.configure({"resume_timeout": 0.1, "max_per_donation": None})
+    ingestor.start("PL1", {"amount": 100}, {}, "key")
+
+    deadline = time.monotonic() + 5
+    while not any(name == "onValidationDone" and not data["has_more"] for name, data in sent):
+        assert time.monotonic() < deadline, "paused job never expired"
+        time.sleep(0.02)
+
+    final = sent[-1][1]
+    assert final["expired"] is True
+    assert final["accepted"] == 2
+    assert final["pages"] == 1
+    assert ingestor.jobs == {}
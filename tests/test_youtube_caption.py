@@ -0,0 +1,67 @@
+import logging
+from types import SimpleNamespace
+
+from youtube_transcript_api._transcripts import Transcript
+
+from providers.youtube_caption import YoutubeCaptionProvider
+
+TIMEDTEXT = (
+    b'<?xml version="1.0" encoding="utf-8" ?><transcript>'
+    b'<text start="0.0" dur="2">first &amp;amp; line</text>'
+    b'<text start="30.0" dur="2">second</text>'
+    b'<text start="90.0" dur="2">third</text>'
+    b'</transcript>'
+)
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+        self.closed = False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for pos in range(0, len(self.body), 16):
+            yield self.body[pos:pos + 16]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeHttp:
+    def __init__(self):
+        self.responses = []
+
+    def get(self, url, stream=False):
+        self.responses.append(FakeResponse(TIMEDTEXT))
+        return self.responses[-1]
+
+
+class LegacyTranscript:
+    """A transcript without the private attributes streaming relies on"""
+
+    def fetch(self):
+        return [SimpleNamespace(start=0.0, text="full"), SimpleNamespace(start=90.0, text="fetch")]
+
+
+def test_pinned_library_still_has_the_streaming_attributes():
+    transcript = Transcript(FakeHttp(), "vid", "https://example/timedtext", "English", "en", False, [])
+    assert transcript._url and transcript._http_client is not None
+
+
+def test_bounded_read_streams_and_stops_early():
+    http = FakeHttp()
+    transcript = Transcript(http, "vid", "https://example/timedtext", "English", "en", False, [])
+    text, truncated = YoutubeCaptionProvider()._read_transcript(transcript, max_seconds=60, max_chars=None)
+    assert (text, truncated) == ("first & line second", True)
+    assert http.responses[0].closed
+
+
+def test_missing_streaming_attributes_are_logged_once(caplog):
+    provider = YoutubeCaptionProvider()
+    with caplog.at_level(logging.WARNING, logger="YOUTUBE_CAPTION"):
+        for _ in range(3):
+            assert provider._read_transcript(LegacyTranscript(), max_seconds=60, max_chars=None) == ("full", True)
+    assert len([r for r in caplog.records if "streaming unavailable" in r.getMessage()]) == 1